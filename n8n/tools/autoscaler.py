@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+autoscaler.py
+
+Scales n8n-worker replicas with the depth of n8n's Bull job queue.
+
+Every AUTOSCALE_INTERVAL seconds the waiting/active job counts are read from
+Redis (bull:jobs:wait / bull:jobs:active); if Redis cannot be reached, the
+n8n_scaling_mode_queue_jobs_* series from n8n's /metrics are used instead (the
+same series as the Grafana "Queue Jobs Waiting" panel; n8n publishes them because
+the x-n8n environment sets N8N_METRICS_INCLUDE_QUEUE_METRICS=true). Load is the
+number of jobs per available job slot (replicas x AUTOSCALE_JOBS_PER_WORKER).
+
+- Scale up when load stays above AUTOSCALE_UP_LOAD for AUTOSCALE_UP_SAMPLES
+  samples in a row, straight to the replica count the queue needs.
+- Scale down by one replica when load stays below AUTOSCALE_DOWN_LOAD for
+  AUTOSCALE_DOWN_SAMPLES samples; n8n workers finish running jobs on SIGTERM.
+- After a change, no scale-up for AUTOSCALE_UP_COOLDOWN and no scale-down for
+  AUTOSCALE_DOWN_COOLDOWN seconds.
+- Replicas stay within AUTOSCALE_MIN..AUTOSCALE_MAX; no scale-up while host
+  MemAvailable minus AUTOSCALE_WORKER_MB per new worker would drop below
+  AUTOSCALE_MIN_FREE_MB.
+
+Scaling runs `docker compose up -d --no-deps --no-recreate --scale n8n-worker=N
+n8n-worker` for the "localai" project through the mounted Docker socket.
+
+Compose must see the project at its host path: relative bind mounts are sent to
+the Docker daemon as <project dir>/..., and relative files (.env, env_file) are
+read by the compose client from the same path. The project is mounted at
+/project; at start the autoscaler looks up the host path of that mount and links
+it to /project inside its container, then runs compose entirely on the host path.
+"""
+
+import argparse
+import math
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass, field
+
+PROJECT = os.environ.get("COMPOSE_PROJECT_NAME", "localai")
+SERVICE = "n8n-worker"
+PROJECT_MOUNT = "/project"  # project directory inside the autoscaler container
+METRIC_RE = re.compile(r"^n8n_scaling_mode_queue_jobs_(waiting|active)(?:\{[^}]*\})?\s+([0-9.eE+-]+)", re.M)
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name) or default)
+
+
+@dataclass
+class ScalePolicy:
+    """Hysteresis, cooldowns, bounds and memory guard; decide() is called once per sample."""
+
+    min_replicas: int = 1
+    max_replicas: int = 4
+    jobs_per_worker: float = 10
+    up_load: float = 0.8
+    down_load: float = 0.3
+    up_samples: int = 2
+    down_samples: int = 10
+    up_cooldown: float = 60
+    down_cooldown: float = 600
+    worker_mb: float = 512
+    min_free_mb: float = 1024
+    _above: int = field(default=0, repr=False)
+    _below: int = field(default=0, repr=False)
+    _changed_at: float = field(default=float("-inf"), repr=False)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            min_replicas=int(_env_float("AUTOSCALE_MIN", 1)),
+            max_replicas=int(_env_float("AUTOSCALE_MAX", 4)),
+            jobs_per_worker=_env_float("AUTOSCALE_JOBS_PER_WORKER", 10),
+            up_load=_env_float("AUTOSCALE_UP_LOAD", 0.8),
+            down_load=_env_float("AUTOSCALE_DOWN_LOAD", 0.3),
+            up_samples=int(_env_float("AUTOSCALE_UP_SAMPLES", 2)),
+            down_samples=int(_env_float("AUTOSCALE_DOWN_SAMPLES", 10)),
+            up_cooldown=_env_float("AUTOSCALE_UP_COOLDOWN", 60),
+            down_cooldown=_env_float("AUTOSCALE_DOWN_COOLDOWN", 600),
+            worker_mb=_env_float("AUTOSCALE_WORKER_MB", 512),
+            min_free_mb=_env_float("AUTOSCALE_MIN_FREE_MB", 1024),
+        )
+
+    def decide(self, now, waiting, active, replicas, mem_available_mb=None):
+        """Return (target replicas or None, reason)."""
+        if replicas < self.min_replicas or replicas > self.max_replicas:
+            self._changed_at = now
+            return min(max(replicas, self.min_replicas), self.max_replicas), "outside bounds"
+        jobs = waiting + active
+        load = jobs / (max(replicas, 1) * self.jobs_per_worker)
+        self._above = self._above + 1 if load > self.up_load and waiting > 0 else 0
+        self._below = self._below + 1 if load < self.down_load else 0
+
+        if self._above >= self.up_samples and replicas < self.max_replicas:
+            if now - self._changed_at < self.up_cooldown:
+                return None, "scale-up cooldown"
+            needed = math.ceil(jobs / (self.jobs_per_worker * self.up_load))
+            target = min(max(needed, replicas + 1), self.max_replicas)
+            if mem_available_mb is not None:
+                affordable = int((mem_available_mb - self.min_free_mb) // self.worker_mb)
+                target = min(target, replicas + max(affordable, 0))
+                if target <= replicas:
+                    return None, f"memory guard ({mem_available_mb:.0f} MB available)"
+            self._above, self._changed_at = 0, now
+            return target, f"load {load:.2f} ({waiting} waiting, {active} active)"
+
+        if self._below >= self.down_samples and replicas > self.min_replicas:
+            if now - self._changed_at < self.down_cooldown:
+                return None, "scale-down cooldown"
+            self._below, self._changed_at = 0, now
+            return replicas - 1, f"load {load:.2f} ({waiting} waiting, {active} active)"
+        return None, f"load {load:.2f}"
+
+
+def redis_command(host, port, *args, timeout=5):
+    """Send one command over RESP and return an integer reply."""
+    payload = f"*{len(args)}\r\n" + "".join(f"${len(str(a).encode())}\r\n{a}\r\n" for a in args)
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall(payload.encode())
+        reply = conn.makefile("rb").readline().decode().strip()
+    if not reply.startswith(":"):
+        raise RuntimeError(f"unexpected Redis reply: {reply}")
+    return int(reply[1:])
+
+
+def queue_counts(redis_host, redis_port, prefix="bull", metrics_url=None):
+    """(waiting, active) from Redis, falling back to n8n /metrics."""
+    try:
+        waiting = redis_command(redis_host, redis_port, "LLEN", f"{prefix}:jobs:wait")
+        active = redis_command(redis_host, redis_port, "LLEN", f"{prefix}:jobs:active")
+        return waiting, active
+    except (OSError, RuntimeError, ValueError) as e:
+        if not metrics_url:
+            raise RuntimeError(f"Redis unavailable: {e}") from e
+    with urllib.request.urlopen(metrics_url, timeout=5) as response:
+        text = response.read().decode()
+    values = {name: float(value) for name, value in METRIC_RE.findall(text)}
+    if "waiting" not in values:
+        raise RuntimeError("n8n /metrics has no queue series (needs EXECUTIONS_MODE=queue and N8N_METRICS_INCLUDE_QUEUE_METRICS=true)")
+    return int(values["waiting"]), int(values.get("active", 0))
+
+
+def mem_available_mb(path="/proc/meminfo"):
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def docker(args, check=True):
+    result = subprocess.run(["docker", *args], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if check and result.returncode != 0:
+        raise RuntimeError(f"docker {' '.join(args[:3])} failed: {result.stdout.strip()[-500:]}")
+    return result.stdout
+
+
+def running_replicas():
+    out = docker(["ps", "-q", "--filter", f"label=com.docker.compose.project={PROJECT}",
+                  "--filter", f"label=com.docker.compose.service={SERVICE}"])
+    return len(out.split())
+
+
+def host_project_dir():
+    """Host path of the project directory, so compose resolves relative bind mounts on the host."""
+    if os.environ.get("AUTOSCALE_PROJECT_DIR"):
+        return os.environ["AUTOSCALE_PROJECT_DIR"]
+    out = docker(["inspect", "--format",
+                  "{{range .Mounts}}{{if eq .Destination \"" + PROJECT_MOUNT + "\"}}{{.Source}}{{end}}{{end}}",
+                  socket.gethostname()])
+    if not out.strip():
+        raise RuntimeError(f"set AUTOSCALE_PROJECT_DIR or mount the project at {PROJECT_MOUNT}")
+    return out.strip()
+
+
+def link_project_dir(project_dir, mount=PROJECT_MOUNT):
+    """Make the host path of the project resolve to the mounted project inside this container."""
+    if os.path.realpath(project_dir) == os.path.realpath(mount) or \
+            os.path.isfile(os.path.join(project_dir, "docker-compose.yml")):
+        return  # linked already, or the project is mounted at its host path too
+    if os.path.lexists(project_dir):
+        raise RuntimeError(f"{project_dir} exists inside the autoscaler container; mount the project there instead of {mount}")
+    os.makedirs(os.path.dirname(project_dir), exist_ok=True)
+    os.symlink(mount, project_dir)
+
+
+def scale(replicas, project_dir, stop_timeout):
+    docker([
+        "compose", "-p", PROJECT, "--project-directory", project_dir,
+        "-f", os.path.join(project_dir, "docker-compose.yml"), "--env-file", os.path.join(project_dir, ".env"),
+        "up", "-d", "--no-deps", "--no-recreate", "--timeout", str(stop_timeout),
+        "--scale", f"{SERVICE}={replicas}", SERVICE,
+    ])
+
+
+def log(message):
+    print(f"{time.strftime('%Y-%m-%dT%H:%M:%S')} {message}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scale n8n-worker replicas with the Bull queue depth.")
+    parser.add_argument("--interval", type=float, default=_env_float("AUTOSCALE_INTERVAL", 15))
+    parser.add_argument("--dry-run", action="store_true", help="log decisions without scaling")
+    args = parser.parse_args(argv)
+
+    policy = ScalePolicy.from_env()
+    redis_host = os.environ.get("QUEUE_BULL_REDIS_HOST", "redis")
+    redis_port = int(os.environ.get("QUEUE_BULL_REDIS_PORT", "6379"))
+    prefix = os.environ.get("QUEUE_BULL_PREFIX", "bull")
+    metrics_url = os.environ.get("AUTOSCALE_METRICS_URL", "http://n8n:5678/metrics")
+    stop_timeout = int(_env_float("AUTOSCALE_STOP_TIMEOUT", 300))
+    project_dir = None if args.dry_run else host_project_dir()
+    if project_dir:
+        link_project_dir(project_dir)
+    log(f"autoscaler: {policy}")
+
+    while True:
+        try:
+            waiting, active = queue_counts(redis_host, redis_port, prefix, metrics_url)
+            replicas = running_replicas()
+            target, reason = policy.decide(time.monotonic(), waiting, active, replicas, mem_available_mb())
+            if target is not None and target != replicas:
+                log(f"scaling {SERVICE} {replicas} -> {target}: {reason}")
+                if not args.dry_run:
+                    scale(target, project_dir, stop_timeout)
+        except (OSError, RuntimeError, ValueError) as e:
+            log(f"ERROR: {e}")
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+binary_gc.py
+
+Garbage collector for n8n binary data stored with N8N_BINARY_DATA_MODE=filesystem.
+
+n8n keeps binary data per execution under
+    <binaryData>/workflows/<workflowId>/executions/<executionId>/...
+When executions are deleted without n8n's own pruning (manual SQL, n8n_prune.py,
+restored databases), these directories stay behind. This tool deletes execution
+directories whose execution id no longer exists in Postgres.
+
+- Incremental: an index of known execution directories is kept in a state file;
+  each run lists only executions/ directories modified since the last run.
+- Liveness is checked for indexed directories older than --grace seconds, with
+  one primary-key lookup per chunk of ids; ids below the smallest live id are
+  known dead without a lookup. Soft-deleted executions count as live.
+- Deletion is throttled (--files-per-second, pauses between directories) and
+  the process lowers its CPU and I/O priority, so n8n on the same host keeps
+  its disk bandwidth. "temp" directories are left to n8n.
+
+Only n8n-managed binary data is touched; ./shared holds user files that are not
+tied to executions and is never scanned.
+
+Runs once with --once, otherwise every --interval seconds (N8N_BINARY_GC_INTERVAL).
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from common import atomic_write_json, load_json, psql_rows
+
+DEFAULT_BINARY_DIR = "/home/node/.n8n/binaryData"
+DEFAULT_STATE = "/home/node/.n8n/binary-gc-state.json"
+STATE_VERSION = 1
+LOOKUP_CHUNK = 500
+# Directory mtimes are compared with this much slack (clock skew, coarse mtimes)
+MTIME_SLACK = 60
+
+
+def lower_priority():
+    """Run with idle I/O priority and low CPU priority where the platform allows it."""
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+    if shutil.which("ionice"):
+        subprocess.run(["ionice", "-c", "3", "-p", str(os.getpid())], stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+
+
+def scan_new(binary_dir, since, index):
+    """Add execution directories from executions/ dirs modified after `since`; return how many were added."""
+    root = os.path.join(binary_dir, "workflows")
+    added = 0
+    if not os.path.isdir(root):
+        return 0
+    for workflow in os.scandir(root):
+        executions = os.path.join(workflow.path, "executions")
+        try:
+            if os.stat(executions).st_mtime < since - MTIME_SLACK:
+                continue
+            entries = list(os.scandir(executions))
+        except OSError:
+            continue
+        for entry in entries:
+            key = f"{workflow.name}/{entry.name}"
+            if entry.is_dir() and entry.name.isdigit() and key not in index:
+                index[key] = entry.stat().st_mtime
+                added += 1
+    return added
+
+
+def live_ids(ids, query):
+    """Subset of execution ids that still exist (soft-deleted included)."""
+    ids = sorted(set(ids))
+    if not ids:
+        return set()
+    rows = query("SELECT json_build_object('min', min(id)) FROM {executions}")
+    if not rows:
+        raise RuntimeError("no answer from Postgres for the smallest execution id")
+    smallest = rows[0]["min"]
+    if smallest is None:  # no executions at all
+        return set()
+    candidates = [i for i in ids if i >= smallest]
+    alive = set()
+    for start in range(0, len(candidates), LOOKUP_CHUNK):
+        chunk = ",".join(str(i) for i in candidates[start:start + LOOKUP_CHUNK])
+        alive.update(row["id"] for row in query(
+            f"SELECT json_build_object('id', id) FROM {{executions}} WHERE id IN ({chunk})"
+        ))
+    return alive
+
+
+def dir_size_and_files(path):
+    size = files = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, name)).st_size
+                files += 1
+            except OSError:
+                pass
+    return size, files
+
+
+def collect(binary_dir, state_path, grace=3600, files_per_second=200, dry_run=False, query=None, prefix="",
+            stop=None, now=None):
+    """One GC pass; return a report dict."""
+    stop = stop or threading.Event()
+    executions_table = f"{prefix}execution_entity"
+    if query is None:
+        def query(sql):
+            return list(psql_rows(sql.format(executions=executions_table)))
+    now = now or time.time()
+    started = time.monotonic()
+    state = load_json(state_path, {}) or {}
+    if state.get("version") != STATE_VERSION:
+        state = {"version": STATE_VERSION, "last_scan": 0, "index": {}}
+    index = state["index"]
+    report = {"indexed": scan_new(binary_dir, state["last_scan"], index), "orphans": 0, "files": 0, "bytes": 0}
+    state["last_scan"] = now
+
+    old_enough = [key for key, mtime in index.items() if mtime < now - grace]
+    alive = live_ids([int(key.rsplit("/", 1)[1]) for key in old_enough], query)
+    orphans = [key for key in old_enough if int(key.rsplit("/", 1)[1]) not in alive]
+
+    for key in orphans:
+        if stop.is_set():
+            break
+        workflow_id, execution_id = key.rsplit("/", 1)
+        path = os.path.join(binary_dir, "workflows", workflow_id, "executions", execution_id)
+        size, files = dir_size_and_files(path)
+        if not dry_run:
+            shutil.rmtree(path, ignore_errors=True)
+            index.pop(key, None)
+            # Throttle by files removed, so large directories do not stall the disk
+            stop.wait(files / files_per_second if files_per_second else 0)
+        report["orphans"] += 1
+        report["files"] += files
+        report["bytes"] += size
+
+    # Forget directories that vanished by other means (n8n's own pruning)
+    for key in [k for k in index if not os.path.isdir(
+            os.path.join(binary_dir, "workflows", k.rsplit("/", 1)[0], "executions", k.rsplit("/", 1)[1]))]:
+        index.pop(key)
+    report["tracked"] = len(index)
+    if not dry_run:
+        atomic_write_json(state_path, state)
+    report["seconds"] = round(time.monotonic() - started, 2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete n8n binary data of executions that no longer exist.")
+    parser.add_argument("--binary-dir", default=os.environ.get("N8N_BINARY_DATA_STORAGE_PATH", DEFAULT_BINARY_DIR))
+    parser.add_argument("--state", default=os.environ.get("N8N_BINARY_GC_STATE", DEFAULT_STATE))
+    parser.add_argument("--grace", type=float, default=float(os.environ.get("N8N_BINARY_GC_GRACE", "3600")),
+                        help="ignore directories younger than this many seconds")
+    parser.add_argument("--files-per-second", type=float,
+                        default=float(os.environ.get("N8N_BINARY_GC_FILES_PER_SECOND", "200")))
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("N8N_BINARY_GC_INTERVAL", "3600")))
+    parser.add_argument("--once", action="store_true", help="collect once and exit")
+    parser.add_argument("--dry-run", action="store_true", help="only report orphans")
+    args = parser.parse_args(argv)
+
+    lower_priority()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    while True:
+        try:
+            report = collect(args.binary_dir, args.state, args.grace, args.files_per_second, args.dry_run,
+                             prefix=os.environ.get("DB_TABLE_PREFIX", ""), stop=stop)
+            stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            verb = "would delete" if args.dry_run else "deleted"
+            print(f"{stamp} binary-gc: {report['indexed']} new dirs, {verb} {report['orphans']} orphaned "
+                  f"({report['files']} files, {report['bytes'] / 1024 / 1024:.1f} MB), "
+                  f"tracking {report['tracked']} ({report['seconds']}s)", flush=True)
+        except (RuntimeError, OSError, ValueError) as e:
+            print(f"ERROR: binary GC failed: {e}", file=sys.stderr, flush=True)
+            if args.once:
+                return 1
+        if args.once or stop.wait(args.interval):
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+bundle.py
+
+Packed workflow bundle: all workflow exports in one compressed file with an
+offset index, so installs and n8n-import runs move and parse far fewer bytes
+than the pretty-printed n8n/backup/workflows tree.
+
+Layout:
+    header   MAGIC (8 bytes) | codec (1) | flags (1) | index length (8, little-endian)
+    index    compressed JSON list, one item per workflow: file name, sha256 and
+             ids, offset/length of its payload, and the catalog fields
+             (node/trigger/credential types, LLM providers, tags; see catalog.py)
+    payloads one independently compressed frame per workflow, canonical compact
+             JSON (sorted keys)
+
+Every payload is its own frame, so a reader seeks straight to the entries it
+needs and decodes them one at a time; the index alone answers "what changed"
+(sha256) and "what matches" (catalog fields) without touching payloads.
+
+Codecs: zstd (needs the zstandard module, py3-zstandard in the n8n image) or
+zlib from the standard library. --strip-notes drops sticky note nodes, which
+only carry canvas documentation.
+
+Usage:
+    python3 bundle.py pack n8n/backup/workflows n8n/backup/workflows.bundle --strip-notes
+    python3 bundle.py list n8n/backup/workflows.bundle
+    python3 bundle.py unpack n8n/backup/workflows.bundle /tmp/workflows
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+from catalog import describe_workflow
+from common import iter_backup_files
+
+try:
+    import zstandard
+except ImportError:  # zlib fallback
+    zstandard = None
+
+MAGIC = b"N8NBNDL1"
+HEADER = struct.Struct("<8sBBQ")
+CODECS = {"zlib": 1, "zstd": 2}
+FLAG_NOTES_STRIPPED = 1
+STICKY_NOTE = "n8n-nodes-base.stickyNote"
+
+
+def _compressor(codec, level=None):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd bundles need the zstandard module (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=level or 19).compress
+    return lambda data: zlib.compress(data, level or 9)
+
+
+def _decompressor(codec_id):
+    if codec_id == CODECS["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("this bundle is zstd-compressed; install the zstandard module")
+        return zstandard.ZstdDecompressor().decompress
+    if codec_id == CODECS["zlib"]:
+        return zlib.decompress
+    raise ValueError(f"unknown bundle codec {codec_id}")
+
+
+def canonical_bytes(workflow):
+    return json.dumps(workflow, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def strip_notes(workflow):
+    """Workflow without sticky note nodes (they have no connections)."""
+    return {**workflow, "nodes": [n for n in workflow.get("nodes", []) if n.get("type") != STICKY_NOTE]}
+
+
+def pack(source_dir, bundle_path, codec=None, notes=True, level=None):
+    """
+    Pack every workflow file of source_dir into bundle_path.
+
+    Returns (index, errors) where errors maps skipped file names to messages.
+    """
+    codec = codec or ("zstd" if zstandard else "zlib")
+    compress = _compressor(codec, level)
+    index, errors, offset = [], {}, 0
+    directory = os.path.dirname(os.path.abspath(bundle_path))
+    with tempfile.TemporaryFile(dir=directory) as payloads:
+        for name, path in iter_backup_files(source_dir):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    workflow = json.load(f)
+                if not notes:
+                    workflow = strip_notes(workflow)
+                raw = canonical_bytes(workflow)
+                item = {"file": name, **describe_workflow(workflow, len(raw))}
+            except (OSError, ValueError) as e:
+                errors[name] = str(e)
+                continue
+            frame = compress(raw)
+            payloads.write(frame)
+            item.update(
+                sha256=hashlib.sha256(raw).hexdigest(),
+                ids=[str(workflow["id"])] if workflow.get("id") else [],
+                offset=offset,
+                length=len(frame),
+            )
+            index.append(item)
+            offset += len(frame)
+
+        index_frame = compress(canonical_bytes(index))
+        flags = 0 if notes else FLAG_NOTES_STRIPPED
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".bundle")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(HEADER.pack(MAGIC, CODECS[codec], flags, len(index_frame)))
+                out.write(index_frame)
+                payloads.seek(0)
+                while chunk := payloads.read(1 << 20):
+                    out.write(chunk)
+            os.replace(tmp_path, bundle_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    return index, errors
+
+
+def _is_plain_name(name):
+    """True for a bare file name that cannot leave the directory it is extracted into."""
+    return (isinstance(name, str) and name not in ("", ".", "..") and "\0" not in name
+            and os.path.basename(name) == name and "\\" not in name)
+
+
+class Bundle:
+    """Reader: the index is loaded on open, payloads are decoded on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            magic, codec_id, self.flags, index_length = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a workflow bundle")
+            self._decompress = _decompressor(codec_id)
+            self.index = json.loads(self._decompress(self._file.read(index_length)))
+            for item in self.index:
+                if not _is_plain_name(item.get("file")):
+                    raise ValueError(f"{path}: bad entry name {item.get('file')!r} (must be a plain file name)")
+        except BaseException:
+            self._file.close()
+            raise
+        self._data_start = HEADER.size + index_length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def read(self, item):
+        """Canonical JSON bytes of one entry."""
+        self._file.seek(self._data_start + item["offset"])
+        return self._decompress(self._file.read(item["length"]))
+
+    def iter_entries(self, names=None):
+        """Yield (item, bytes) in file order, decoding only the selected names."""
+        for item in sorted(self.index, key=lambda i: i["offset"]):
+            if names is None or item["file"] in names:
+                yield item, self.read(item)
+
+    def extract(self, directory, names=None, pretty=False):
+        """Write selected entries as files; yield (name, path) as they are written."""
+        os.makedirs(directory, exist_ok=True)
+        for item, raw in self.iter_entries(names):
+            path = os.path.join(directory, item["file"])
+            with open(path, "wb") as f:
+                if pretty:
+                    f.write(json.dumps(json.loads(raw), indent=2, ensure_ascii=False).encode("utf-8") + b"\n")
+                else:
+                    f.write(raw)
+            yield item["file"], path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack, list and unpack n8n workflow bundles.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_pack = sub.add_parser("pack", help="pack a workflows directory")
+    p_pack.add_argument("source_dir")
+    p_pack.add_argument("bundle")
+    p_pack.add_argument("--codec", choices=CODECS, help="default: zstd if available, else zlib")
+    p_pack.add_argument("--level", type=int, help="compression level")
+    p_pack.add_argument("--strip-notes", action="store_true", help="drop sticky note nodes")
+    p_list = sub.add_parser("list", help="show the index")
+    p_list.add_argument("bundle")
+    p_unpack = sub.add_parser("unpack", help="write entries back as pretty-printed files")
+    p_unpack.add_argument("bundle")
+    p_unpack.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        index, errors = pack(args.source_dir, args.bundle, args.codec, notes=not args.strip_notes, level=args.level)
+        for name, error in sorted(errors.items()):
+            print(f"SKIPPED {name}: {error}", file=sys.stderr)
+        raw = sum(os.path.getsize(path) for _, path in iter_backup_files(args.source_dir))
+        packed = os.path.getsize(args.bundle)
+        print(f"{len(index)} workflows: {raw / 1024:.0f} KB -> {packed / 1024:.0f} KB ({packed / max(raw, 1):.1%})")
+    elif args.command == "list":
+        with Bundle(args.bundle) as bundle:
+            for item in bundle.index:
+                print(f"{item['size'] // 1024:>5} KB {item['length'] // 1024:>5} KB  {item['file']}")
+    else:
+        with Bundle(args.bundle) as bundle:
+            count = sum(1 for _ in bundle.extract(args.directory, pretty=True))
+        print(f"{count} workflows written to {args.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
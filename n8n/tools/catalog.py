@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+catalog.py
+
+Compact index of the bundled workflow exports and selectors over it, so an
+instance imports only the workflows it can actually use.
+
+For every file in the workflows directory the catalog keeps: workflow id and
+name, tags, node types, trigger types, required credential types, LLM providers
+and file size. Entries are keyed by file name and carry the file's SHA-256;
+rebuilding re-parses only files whose hash changed.
+
+Selectors (all terms must match; "|" separates alternatives, "!" negates):
+
+    llm:ollama                  uses an Ollama model or embedding node
+    credentials:available       every credential type it needs is available
+    credential:telegramApi      needs this credential type
+    node:n8n-nodes-base.slack   contains this node type (short name also works: slack)
+    trigger:webhook|schedule    started by one of these triggers
+    tag:Finance                 has this tag
+    name:invoice                name contains the text (case-insensitive)
+    maxsize:50                  file is at most 50 KB
+    !llm:openai                 does not use OpenAI
+
+Available credential types are the types of files in the credentials backup
+directory plus N8N_AVAILABLE_CREDENTIALS (comma-separated credential types).
+
+Usage:
+    python3 catalog.py build
+    python3 catalog.py list --select "llm:ollama,credentials:available"
+    python3 catalog.py stats
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+from common import atomic_write_json, iter_backup_files, load_json, sha256_file
+
+DEFAULT_WORKFLOWS_DIR = "/backup/workflows"
+DEFAULT_CREDENTIALS_DIR = "/backup/credentials"
+DEFAULT_CATALOG = "/home/node/.n8n/workflow-catalog.json"
+CATALOG_VERSION = 1
+
+# Model / embedding node suffix -> provider
+_PROVIDER_NAMES = {
+    "openai": "openai", "azureopenai": "azure-openai", "googlegemini": "google", "googlevertex": "google",
+    "googlepalm": "google", "mistralcloud": "mistral", "ollama": "ollama", "anthropic": "anthropic",
+    "groq": "groq", "openrouter": "openrouter", "deepseek": "deepseek", "cohere": "cohere",
+    "huggingface": "huggingface", "huggingfaceinference": "huggingface", "awsbedrock": "aws-bedrock", "xaigrok": "xai",
+}
+# Nodes that call a provider directly rather than through a model sub-node
+_PROVIDER_NODES = {
+    "@n8n/n8n-nodes-langchain.openAi": "openai",
+    "@n8n/n8n-nodes-langchain.openAiAssistant": "openai",
+    "n8n-nodes-base.openAi": "openai",
+    "@n8n/n8n-nodes-langchain.anthropic": "anthropic",
+    "@n8n/n8n-nodes-langchain.googleGemini": "google",
+    "@n8n/n8n-nodes-langchain.ollama": "ollama",
+}
+_MODEL_NODE_RE = re.compile(r"^@n8n/n8n-nodes-langchain\.(?:lmChat|lm|embeddings)(\w+)$")
+_TRIGGER_ALIASES = {"scheduleTrigger": "schedule", "cron": "schedule", "interval": "schedule", "webhook": "webhook"}
+
+
+def short_type(node_type):
+    """'n8n-nodes-base.telegramTrigger' -> 'telegramTrigger'."""
+    return node_type.rsplit(".", 1)[-1]
+
+
+def trigger_name(node_type):
+    """Trigger name for a trigger node type, else None ('telegramTrigger' -> 'telegram')."""
+    short = short_type(node_type)
+    if short in _TRIGGER_ALIASES:
+        return _TRIGGER_ALIASES[short]
+    if short.endswith("Trigger"):
+        return short[:-len("Trigger")] or short
+    return None
+
+
+def llm_provider(node_type):
+    if node_type in _PROVIDER_NODES:
+        return _PROVIDER_NODES[node_type]
+    match = _MODEL_NODE_RE.match(node_type)
+    if not match:
+        return None
+    key = match.group(1).lower()
+    return _PROVIDER_NAMES.get(key, key)
+
+
+def _tag_names(tags):
+    names = []
+    for tag in tags or []:
+        name = tag.get("name") if isinstance(tag, dict) else tag
+        if name:
+            names.append(str(name))
+    return sorted(set(names))
+
+
+def describe(path):
+    """Catalog fields of one workflow export file (raises ValueError on bad input)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return describe_workflow(data, os.path.getsize(path))
+
+
+def describe_workflow(data, size):
+    """Catalog fields of a parsed workflow export of `size` bytes."""
+    if not isinstance(data, dict) or not isinstance(data.get("nodes"), list):
+        raise ValueError("not a workflow export")
+    node_types, triggers, credentials, providers = set(), set(), set(), set()
+    for node in data["nodes"]:
+        node_type = node.get("type", "")
+        node_types.add(node_type)
+        trigger = trigger_name(node_type)
+        if trigger:
+            triggers.add(trigger)
+        provider = llm_provider(node_type)
+        if provider:
+            providers.add(provider)
+        credentials.update((node.get("credentials") or {}).keys())
+    return {
+        "id": data.get("id"),
+        "name": data.get("name", ""),
+        "tags": _tag_names(data.get("tags")),
+        "nodes": sorted(node_types),
+        "triggers": sorted(triggers),
+        "credentials": sorted(credentials),
+        "llm": sorted(providers),
+        "size": size,
+    }
+
+
+def build_catalog(workflows_dir, previous=None):
+    """
+    Index every workflow file; reuse entries whose SHA-256 did not change.
+
+    Returns (catalog, errors) where errors maps file names to messages.
+    """
+    old_entries = (previous or {}).get("workflows", {}) if (previous or {}).get("version") == CATALOG_VERSION else {}
+    entries, errors = {}, {}
+    for name, path in iter_backup_files(workflows_dir):
+        digest = sha256_file(path)
+        old = old_entries.get(name)
+        if old and old.get("sha256") == digest:
+            entries[name] = old
+            continue
+        try:
+            entries[name] = {**describe(path), "sha256": digest}
+        except (OSError, ValueError) as e:
+            errors[name] = str(e)
+    return {"version": CATALOG_VERSION, "workflows": entries}, errors
+
+
+def load_or_build(catalog_path, workflows_dir, save=True):
+    """Catalog from disk, refreshed for changed files (and saved if anything changed)."""
+    previous = load_json(catalog_path) if catalog_path else None
+    catalog, errors = build_catalog(workflows_dir, previous)
+    if save and catalog_path and catalog != previous:
+        atomic_write_json(catalog_path, catalog)
+    return catalog, errors
+
+
+def available_credential_types(credentials_dir, extra=None):
+    """Credential types present in the credentials backup plus extra (comma-separated)."""
+    types = {t.strip() for t in (extra or "").split(",") if t.strip()}
+    for _name, path in iter_backup_files(credentials_dir):
+        data = load_json(path)
+        for item in data if isinstance(data, list) else [data]:
+            if isinstance(item, dict) and item.get("type"):
+                types.add(item["type"])
+    return types
+
+
+def parse_selectors(text):
+    """'llm:ollama,!tag:x' -> [(negate, key, [values])]."""
+    selectors = []
+    for term in filter(None, (part.strip() for part in (text or "").split(","))):
+        negate = term.startswith("!")
+        key, _, value = term.lstrip("!").partition(":")
+        key = key.strip().lower()
+        if key not in MATCHERS or not value:
+            raise ValueError(f"unknown selector '{term}' (expected one of: {', '.join(sorted(MATCHERS))})")
+        values = [v.strip() for v in value.split("|") if v.strip()]
+        if not values:
+            raise ValueError(f"selector '{term}' has no values")
+        for v in values:
+            VALIDATORS.get(key, lambda _v: None)(v)
+        selectors.append((negate, key, values))
+    return selectors
+
+
+def _lower(values):
+    return {v.lower() for v in values}
+
+
+def _match_node(entry, value, _available):
+    value = value.lower()
+    return any(t.lower() == value or short_type(t).lower() == value for t in entry["nodes"])
+
+
+def _match_credentials(entry, _value, available):
+    return set(entry["credentials"]) <= available
+
+
+def _check_credentials(value):
+    if value.lower() != "available":
+        raise ValueError(f"credentials: only supports 'available', not '{value}'")
+
+
+def _check_maxsize(value):
+    try:
+        size = float(value)
+    except ValueError:
+        size = None
+    if size is None or not 0 <= size < float("inf"):
+        raise ValueError(f"maxsize: '{value}' is not a size in KB")
+
+
+MATCHERS = {
+    "llm": lambda entry, value, _a: value.lower() in _lower(entry["llm"]),
+    "credential": lambda entry, value, _a: value.lower() in _lower(entry["credentials"]),
+    "credentials": _match_credentials,
+    "node": _match_node,
+    "trigger": lambda entry, value, _a: value.lower() in _lower(entry["triggers"]),
+    "tag": lambda entry, value, _a: value.lower() in _lower(entry["tags"]),
+    "name": lambda entry, value, _a: value.lower() in entry["name"].lower(),
+    "maxsize": lambda entry, value, _a: entry["size"] <= float(value) * 1024,
+}
+# Checked by parse_selectors, so a bad value fails before any workflow is matched
+VALIDATORS = {
+    "credentials": _check_credentials,
+    "maxsize": _check_maxsize,
+}
+
+
+def select(catalog, selectors, available=frozenset()):
+    """File names of catalog entries matching all selectors (all files if none)."""
+    chosen = []
+    for name, entry in catalog["workflows"].items():
+        if all(
+            any(MATCHERS[key](entry, value, available) for value in values) != negate
+            for negate, key, values in selectors
+        ):
+            chosen.append(name)
+    return sorted(chosen)
+
+
+def stats(catalog):
+    """Counts per LLM provider, trigger and credential type."""
+    counters = {"llm": {}, "triggers": {}, "credentials": {}}
+    for entry in catalog["workflows"].values():
+        for field, counter in counters.items():
+            for value in entry[field]:
+                counter[value] = counter.get(value, 0) + 1
+    return {field: dict(sorted(counter.items(), key=lambda kv: -kv[1])) for field, counter in counters.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the n8n workflow catalog.")
+    parser.add_argument("command", choices=("build", "list", "stats"))
+    parser.add_argument("--workflows-dir", default=DEFAULT_WORKFLOWS_DIR)
+    parser.add_argument("--credentials-dir", default=DEFAULT_CREDENTIALS_DIR)
+    parser.add_argument("--catalog", default=os.environ.get("N8N_CATALOG", DEFAULT_CATALOG))
+    parser.add_argument("--select", default=os.environ.get("N8N_IMPORT_SELECT", ""))
+    args = parser.parse_args(argv)
+
+    catalog, errors = load_or_build(args.catalog, args.workflows_dir)
+    for name, error in sorted(errors.items()):
+        print(f"SKIPPED {name}: {error}", file=sys.stderr)
+
+    if args.command == "build":
+        total = sum(entry["size"] for entry in catalog["workflows"].values())
+        print(f"{len(catalog['workflows'])} workflows ({total / 1024 / 1024:.1f} MB) indexed in {args.catalog}")
+    elif args.command == "stats":
+        print(json.dumps(stats(catalog), indent=2))
+    else:
+        try:
+            selectors = parse_selectors(args.select)
+        except ValueError as e:
+            parser.error(str(e))
+        available = available_credential_types(args.credentials_dir, os.environ.get("N8N_AVAILABLE_CREDENTIALS"))
+        for name in select(catalog, selectors, available):
+            entry = catalog["workflows"][name]
+            print(f"{entry['size'] // 1024:>5} KB  {','.join(entry['llm']) or '-':<16} {entry['name']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+common.py
+
+Helpers shared by the n8n maintenance tools: scanning the backup directory,
+content hashing, atomic JSON writes, running the n8n CLI and querying n8n's
+Postgres through psql. Standard library
+only, so the tools run inside the n8n image with nothing but python3 installed.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+
+# Rows psql fetches per round trip (cursor), so results never sit in memory at once
+FETCH_COUNT = 100
+
+# Files in the backup directories that are never workflow/credential exports
+IGNORED_FILES = {".gitkeep", ".DS_Store"}
+
+
+def iter_backup_files(directory):
+    """Yield (name, path) for every export file in a backup directory, sorted by name."""
+    if not os.path.isdir(directory):
+        return
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_file() and entry.name not in IGNORED_FILES and not entry.name.startswith("."):
+            yield entry.name, entry.path
+
+
+def sha256_file(path, chunk_size=1 << 16):
+    """Hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_json(path, default=None):
+    """Parse a JSON file; return default if it is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def atomic_write_json(path, data):
+    """Write JSON via a temp file and rename, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def run_n8n(args, timeout=None):
+    """Run the n8n CLI; return (exit code, combined stdout/stderr)."""
+    try:
+        result = subprocess.run(
+            ["n8n", *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return 1, str(e)
+    return result.returncode, result.stdout or ""
+
+
+def env_flag(name, default=False):
+    """Boolean environment variable ("true"/"1"/"yes")."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def pg_env():
+    """psql connection environment from n8n's DB_POSTGRESDB_* settings."""
+    env = dict(os.environ, PGTZ="UTC")  # timestamps come back in UTC and compare as strings
+    for pg_name, n8n_name, default in (
+        ("PGHOST", "DB_POSTGRESDB_HOST", "postgres"),
+        ("PGPORT", "DB_POSTGRESDB_PORT", "5432"),
+        ("PGDATABASE", "DB_POSTGRESDB_DATABASE", "postgres"),
+        ("PGUSER", "DB_POSTGRESDB_USER", "postgres"),
+        ("PGPASSWORD", "DB_POSTGRESDB_PASSWORD", ""),
+    ):
+        env.setdefault(pg_name, os.environ.get(n8n_name, default))
+    return env
+
+
+def psql_rows(sql, fetch_count=FETCH_COUNT):
+    """
+    Yield one parsed JSON row at a time from psql (raises RuntimeError on failure).
+
+    The query must return a single JSON column, e.g. SELECT json_build_object(...).
+    Statements that modify data cannot run through a cursor: pass fetch_count=0.
+    """
+    proc = subprocess.Popen(
+        ["psql", "-X", "-q", "-A", "-t", "-v", "ON_ERROR_STOP=1", "-v", f"FETCH_COUNT={fetch_count}", "-c", sql],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=pg_env(),
+    )
+    try:
+        for line in proc.stdout:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        code = proc.wait()
+    if code != 0:
+        raise RuntimeError(f"psql exited with code {code}: {stderr.strip()}")
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+execution_metrics.py
+
+Prometheus exporter for per-workflow execution latency, read from n8n's Postgres.
+
+n8n's own /metrics covers the process (event loop lag, heap, queue counts) but
+not which workflows are slow. This exporter tails execution_entity and
+publishes, per workflow:
+    n8n_workflow_executions_total{status}        finished executions by status
+    n8n_workflow_execution_duration_seconds       histogram, startedAt -> stoppedAt
+    n8n_workflow_queue_wait_seconds               histogram, createdAt (enqueued) -> startedAt
+Error rate, e.g.:
+    sum by (workflow_name) (rate(n8n_workflow_executions_total{status!="success"}[5m]))
+      / sum by (workflow_name) (rate(n8n_workflow_executions_total[5m]))
+
+Polling is incremental: every --poll seconds only rows with an id above the
+cursor are read (a range scan on the primary key). Executions that were not
+finished yet are remembered and looked up again by id until they finish, up to
+--max-pending of them. Scrapes are answered from memory and never touch the
+database. Counting starts at the newest execution when the exporter starts.
+
+Serves http://<container>:--port/metrics (N8N_METRICS_EXPORTER_PORT, 9465).
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import psql_rows
+
+FINISHED = ("success", "error", "crashed", "canceled")
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+LOOKUP_CHUNK = 500
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    return "{" + ",".join(f'{name}="{_label_value(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name, self.help, self.label_names, self.buckets = name, help_text, label_names, buckets
+        self.series = {}  # labels -> [bucket counts..., count, sum]
+
+    def observe(self, labels, value):
+        series = self.series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, [('le', _number(bound))])} {count}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, [('le', '+Inf')])} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(round(series[-1], 6))}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name, self.help, self.label_names = name, help_text, label_names
+        self.series = {}
+
+    def inc(self, labels, value=1):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+                  for labels, value in sorted(self.series.items())]
+        return lines
+
+
+class ExecutionTail:
+    """Reads new and pending executions and feeds the metrics; query(sql) returns JSON rows."""
+
+    def __init__(self, prefix="", batch_size=1000, max_pending=5000, query=None):
+        self.executions, self.workflows = f"{prefix}execution_entity", f"{prefix}workflow_entity"
+        self.batch_size, self.max_pending = batch_size, max_pending
+        self.query = query or (lambda sql: list(psql_rows(sql)))
+        self.cursor = None
+        self.pending = set()
+        self.lock = threading.Lock()
+        workflow = ("workflow_id", "workflow_name")
+        self.executions_total = Counter("n8n_workflow_executions_total",
+                                        "Finished n8n executions by workflow and status.", (*workflow, "status"))
+        self.duration = Histogram("n8n_workflow_execution_duration_seconds",
+                                  "Execution run time from start to stop.", workflow, DURATION_BUCKETS)
+        self.queue_wait = Histogram("n8n_workflow_queue_wait_seconds",
+                                    "Time from enqueueing an execution to its start.", workflow, WAIT_BUCKETS)
+        self.polls = self.poll_errors = 0
+        self.last_poll_seconds = 0.0
+
+    def _select(self, where):
+        return f"""
+            SELECT json_build_object(
+                'id', e.id, 'workflow', e."workflowId", 'name', w.name, 'status', e.status,
+                'finished', e."stoppedAt" IS NOT NULL,
+                'wait', extract(epoch FROM e."startedAt" - e."createdAt"),
+                'duration', extract(epoch FROM e."stoppedAt" - COALESCE(e."startedAt", e."createdAt"))
+            )
+            FROM {self.executions} e LEFT JOIN {self.workflows} w ON w.id = e."workflowId"
+            WHERE {where}
+            ORDER BY e.id
+        """
+
+    def _record(self, row):
+        """Account a row; return False if it is still running."""
+        if not row["finished"] and row["status"] not in FINISHED:
+            return False
+        labels = (str(row["workflow"]), row["name"] or "")
+        with self.lock:
+            self.executions_total.inc((*labels, row["status"]))
+            if row["duration"] is not None:
+                self.duration.observe(labels, max(float(row["duration"]), 0.0))
+            if row["wait"] is not None:
+                self.queue_wait.observe(labels, max(float(row["wait"]), 0.0))
+        return True
+
+    def poll(self):
+        """Read executions above the cursor and re-check pending ones; return rows accounted."""
+        started = time.monotonic()
+        if self.cursor is None:
+            rows = self.query(f"SELECT json_build_object('max', max(id)) FROM {self.executions}")
+            self.cursor = int((rows[0]["max"] if rows else None) or 0)
+        recorded = 0
+        pending = sorted(self.pending)
+        for start in range(0, len(pending), LOOKUP_CHUNK):
+            chunk = pending[start:start + LOOKUP_CHUNK]
+            seen = set()
+            for row in self.query(self._select(f"e.id IN ({','.join(str(i) for i in chunk)})")):
+                seen.add(row["id"])
+                if self._record(row):
+                    recorded += 1
+                    self.pending.discard(row["id"])
+            self.pending.difference_update(set(chunk) - seen)  # deleted meanwhile
+        while True:
+            rows = self.query(self._select(f"e.id > {int(self.cursor)}") + f" LIMIT {int(self.batch_size)}")
+            for row in rows:
+                if self._record(row):
+                    recorded += 1
+                else:
+                    self.pending.add(row["id"])
+                self.cursor = row["id"]
+            if len(rows) < self.batch_size:
+                break
+        if len(self.pending) > self.max_pending:  # long-waiting executions: give up on the oldest
+            self.pending = set(sorted(self.pending)[-self.max_pending:])
+        self.polls += 1
+        self.last_poll_seconds = time.monotonic() - started
+        return recorded
+
+    def render(self):
+        with self.lock:
+            lines = self.executions_total.render() + self.duration.render() + self.queue_wait.render()
+        lines += [
+            "# HELP n8n_execution_exporter_cursor Highest execution id read.",
+            "# TYPE n8n_execution_exporter_cursor gauge",
+            f"n8n_execution_exporter_cursor {self.cursor or 0}",
+            "# HELP n8n_execution_exporter_pending Executions read before they finished, re-checked by id.",
+            "# TYPE n8n_execution_exporter_pending gauge",
+            f"n8n_execution_exporter_pending {len(self.pending)}",
+            "# HELP n8n_execution_exporter_poll_errors_total Failed polls of the execution table.",
+            "# TYPE n8n_execution_exporter_poll_errors_total counter",
+            f"n8n_execution_exporter_poll_errors_total {self.poll_errors}",
+            "# HELP n8n_execution_exporter_poll_seconds Duration of the last poll.",
+            "# TYPE n8n_execution_exporter_poll_seconds gauge",
+            f"n8n_execution_exporter_poll_seconds {round(self.last_poll_seconds, 6)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def serve(tail, port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = tail.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export per-workflow n8n execution latency to Prometheus.")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("N8N_METRICS_EXPORTER_PORT", "9465")))
+    parser.add_argument("--poll", type=float, default=float(os.environ.get("N8N_METRICS_EXPORTER_POLL", "15")),
+                        help="seconds between reads of the execution table")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-pending", type=int,
+                        default=int(os.environ.get("N8N_METRICS_EXPORTER_MAX_PENDING", "5000")))
+    args = parser.parse_args(argv)
+
+    tail = ExecutionTail(os.environ.get("DB_TABLE_PREFIX", ""), args.batch_size, args.max_pending)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    server = serve(tail, args.port)
+    print(f"execution metrics on :{args.port}/metrics, polling every {args.poll}s", flush=True)
+    while not stop.is_set():
+        try:
+            tail.poll()
+        except (RuntimeError, OSError, ValueError) as e:
+            tail.poll_errors += 1
+            print(f"ERROR: poll failed: {e}", file=sys.stderr, flush=True)
+        stop.wait(args.poll)
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+n8n_export.py
+
+Exports workflows edited in the running n8n back into the backup directory,
+incrementally, so n8n/backup/workflows can be committed like any other source.
+
+- Rows are read straight from n8n's Postgres with `psql`, one JSON object per
+  row; psql fetches them through a cursor (FETCH_COUNT), so memory use does not
+  grow with the table.
+- Only rows with updatedAt at or after the last run's watermark are read, and a
+  file is written only if its canonical content hash changed.
+- Files use canonical JSON (sorted keys, 2-space indent, no runtime fields such
+  as updatedAt/versionId/staticData), so diffs show only real edits.
+- Workflows already in the backup directory keep their file names (matched by
+  id); new ones get a file named after the workflow.
+- With --prune, files of tracked workflows that were deleted in n8n are removed.
+
+Runs once with --once, otherwise every --interval seconds (N8N_EXPORT_INTERVAL).
+Exits at startup if the output directory is not writable (it is a host bind mount
+and the container runs as node, uid 1000).
+Connection settings come from the DB_POSTGRESDB_* variables n8n itself uses.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from common import atomic_write_json, env_flag, iter_backup_files, load_json, psql_rows, sha256_file
+
+DEFAULT_OUTPUT_DIR = "/backup/workflows"
+DEFAULT_STATE = "/home/node/.n8n/export-state.json"
+STATE_VERSION = 1
+# Exported like `n8n export:workflow`; runtime fields are left out to keep diffs minimal
+EXPORT_FIELDS = ("id", "name", "active", "nodes", "connections", "settings", "pinData", "meta")
+UNSAFE_NAME_RE = re.compile(r"[^\w\- ]+")
+
+
+def canonical_json(workflow):
+    """Stable text for a workflow: same content always gives the same bytes."""
+    return json.dumps(workflow, sort_keys=True, indent=2, ensure_ascii=False) + "\n"
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def workflow_query(since=None, prefix=""):
+    """SQL returning one JSON object per workflow updated at or after `since`, oldest first."""
+    where = ""
+    if since:
+        # ISO timestamp written by this script; quoted as a literal, never user input
+        where = "WHERE w.\"updatedAt\" >= '{}'::timestamptz".format(since.replace("'", ""))
+    return f"""
+        SELECT json_build_object(
+            'id', w.id, 'name', w.name, 'active', w.active, 'nodes', w.nodes,
+            'connections', w.connections, 'settings', w.settings, 'pinData', w."pinData",
+            'meta', w.meta, 'updatedAt', w."updatedAt",
+            'tags', COALESCE((
+                SELECT json_agg(json_build_object('id', t.id, 'name', t.name) ORDER BY t.name)
+                FROM {prefix}workflows_tags wt JOIN {prefix}tag_entity t ON t.id = wt."tagId"
+                WHERE wt."workflowId" = w.id
+            ), '[]'::json)
+        )
+        FROM {prefix}workflow_entity w {where}
+        ORDER BY w."updatedAt"
+    """
+
+
+def existing_ids(output_dir):
+    """Map workflow id -> file name for the files already in the backup directory."""
+    ids = {}
+    for name, path in iter_backup_files(output_dir):
+        data = load_json(path)
+        if isinstance(data, dict) and data.get("id"):
+            ids.setdefault(str(data["id"]), name)
+    return ids
+
+
+def file_name_for(workflow, taken):
+    base = UNSAFE_NAME_RE.sub("_", workflow.get("name") or "workflow").strip() or "workflow"
+    name = f"{base[:120]}.json"
+    if name in taken:
+        name = f"{base[:120]}-{workflow['id']}.json"
+    return name
+
+
+def to_export(row):
+    """Workflow as it is written to disk."""
+    workflow = {field: row[field] for field in EXPORT_FIELDS if row.get(field) is not None}
+    workflow["tags"] = row.get("tags") or []
+    return workflow
+
+
+def export_once(output_dir, state_path, rows=None, prune=False, prefix=""):
+    """
+    Write changed workflows; return a report dict.
+
+    rows: iterable of workflow rows (defaults to streaming them from Postgres).
+    """
+    state = load_json(state_path, {}) or {}
+    if state.get("version") != STATE_VERSION:
+        state = {"version": STATE_VERSION, "since": None, "workflows": {}}
+    known = state["workflows"]
+    os.makedirs(output_dir, exist_ok=True)
+    on_disk = existing_ids(output_dir) if not known else {}
+    taken = {name for name, _ in iter_backup_files(output_dir)}
+    report = {"read": 0, "written": 0, "unchanged": 0, "removed": 0}
+    started = time.monotonic()
+
+    if rows is None:
+        rows = psql_rows(workflow_query(state["since"], prefix))
+    since = state["since"]
+    for row in rows:
+        report["read"] += 1
+        wf_id = str(row["id"])
+        text = canonical_json(to_export(row))
+        digest = content_hash(text)
+        entry = known.get(wf_id) or {}
+        file_name = entry.get("file") or on_disk.get(wf_id) or file_name_for(row, taken)
+        path = os.path.join(output_dir, file_name)
+        if os.path.exists(path) and (
+            entry.get("sha256") == digest or (not entry and sha256_file(path) == digest)
+        ):
+            report["unchanged"] += 1
+        else:
+            tmp_path = os.path.join(output_dir, f".{file_name}.tmp")  # hidden: never picked up as an export
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            report["written"] += 1
+        taken.add(file_name)
+        known[wf_id] = {"file": file_name, "sha256": digest}
+        since = max(since or "", str(row.get("updatedAt") or ""))
+
+    if prune:
+        present = {str(row["id"]) for row in psql_rows(f"SELECT json_build_object('id', id) FROM {prefix}workflow_entity")}
+        for wf_id in [wf_id for wf_id in known if wf_id not in present]:
+            path = os.path.join(output_dir, known.pop(wf_id)["file"])
+            if os.path.exists(path):
+                os.unlink(path)
+                report["removed"] += 1
+
+    state["since"] = since or None
+    atomic_write_json(state_path, state)
+    report["seconds"] = round(time.monotonic() - started, 2)
+    return report
+
+
+def check_writable(output_dir):
+    """Fail early with a clear message if this user (node, uid 1000) cannot write the backup directory."""
+    os.makedirs(output_dir, exist_ok=True)
+    probe = os.path.join(output_dir, f".write-check-{os.getpid()}.tmp")
+    try:
+        with open(probe, "w"):
+            pass
+        os.remove(probe)
+    except OSError as e:
+        raise RuntimeError(
+            f"cannot write to {output_dir} as uid {os.getuid()}: {e.strerror}. "
+            f"Make n8n/backup/workflows on the host writable for it, e.g. sudo chown -R 1000:1000 n8n/backup/workflows"
+        ) from e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export changed n8n workflows into the backup directory.")
+    parser.add_argument("--output-dir", default=os.environ.get("N8N_EXPORT_DIR", DEFAULT_OUTPUT_DIR))
+    parser.add_argument("--state", default=os.environ.get("N8N_EXPORT_STATE", DEFAULT_STATE))
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("N8N_EXPORT_INTERVAL", "300")))
+    parser.add_argument("--once", action="store_true", help="export once and exit")
+    parser.add_argument("--prune", action="store_true", default=env_flag("N8N_EXPORT_PRUNE"),
+                        help="remove exported files of workflows deleted in n8n")
+    args = parser.parse_args(argv)
+    prefix = os.environ.get("DB_TABLE_PREFIX", "")
+    try:
+        check_writable(args.output_dir)
+    except (RuntimeError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr, flush=True)
+        return 1
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    while True:
+        try:
+            report = export_once(args.output_dir, args.state, prune=args.prune, prefix=prefix)
+            stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            print(f"{stamp} export: read {report['read']}, written {report['written']}, "
+                  f"unchanged {report['unchanged']}, removed {report['removed']} ({report['seconds']}s)", flush=True)
+        except (RuntimeError, OSError, ValueError) as e:
+            print(f"ERROR: export failed: {e}", file=sys.stderr, flush=True)
+            if args.once:
+                return 1
+        if args.once or stop.wait(args.interval):
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+n8n_import.py
+
+Imports credentials and workflows from the backup directory into n8n, replacing
+the old one-process-per-file shell loop.
+
+- Every file is hashed (SHA-256) and compared with a manifest from the last run;
+  unchanged files are skipped, so a steady-state restart imports nothing.
+- Changed files are validated, staged into one temporary directory and imported
+  with a single `n8n import:<kind> --separate --input=<dir>` call.
+- If a batch fails, it is split in halves and retried until the failing files
+  are isolated; every failure is reported per file and retried on the next run.
+- Workflows recorded in the manifest but missing from the database (e.g. after
+  a database reset) are imported again; one `n8n list:workflow --onlyId` call
+  checks this and can be disabled with --no-verify.
+
+--bundle (N8N_IMPORT_BUNDLE) reads workflows from a packed bundle instead of
+the directory (see bundle.py): unchanged entries are recognised from its index
+alone and only changed ones are decoded, one at a time.
+
+--select (N8N_IMPORT_SELECT) limits workflows to those matching catalog
+selectors, e.g. "llm:ollama,credentials:available" (see catalog.py); the
+catalog is kept next to the manifest and re-parses only changed files.
+
+Runs only when RUN_N8N_IMPORT=true (as before) unless --force is given.
+Exit code is 0 even with per-file failures, so n8n still starts; use --strict
+to fail instead.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import catalog
+from bundle import Bundle
+from common import atomic_write_json, env_flag, iter_backup_files, load_json, run_n8n, sha256_file
+
+DEFAULT_BACKUP_DIR = "/backup"
+DEFAULT_MANIFEST = "/home/node/.n8n/import-manifest.json"
+MANIFEST_VERSION = 1
+KINDS = ("credentials", "workflows")  # credentials first: workflows reference them
+IMPORT_COMMANDS = {"credentials": "import:credentials", "workflows": "import:workflow"}
+WORKFLOW_ID_RE = re.compile(r"^[A-Za-z0-9]{8,64}$")
+
+
+def validate(kind, path):
+    """Return (error or None, list of ids) for one export file."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        return f"invalid JSON: {e}", []
+    items = data if isinstance(data, list) else [data]
+    if not items or not all(isinstance(item, dict) for item in items):
+        return "expected an object or a list of objects", []
+    if kind == "workflows":
+        for item in items:
+            if not isinstance(item.get("nodes"), list) or not isinstance(item.get("connections"), dict):
+                return "workflow without 'nodes' list / 'connections' object", []
+    else:
+        for item in items:
+            if not item.get("name") or not item.get("type"):
+                return "credential without 'name' / 'type'", []
+    return None, [str(item["id"]) for item in items if item.get("id")]
+
+
+def scan(kind, directory, manifest_entries, force, workers=8, only=None):
+    """
+    Hash and validate every file of one kind (or only the names in `only`).
+
+    Returns (entries, changed, invalid): entries maps file name to its manifest
+    entry, changed lists names to import, invalid maps names to errors.
+    """
+    files = [(name, path) for name, path in iter_backup_files(directory) if only is None or name in only]
+
+    def inspect(item):
+        name, path = item
+        digest = sha256_file(path)
+        previous = manifest_entries.get(name)
+        if previous and previous.get("sha256") == digest and not force:
+            return name, path, digest, None, previous.get("ids", []), False
+        error, ids = validate(kind, path)
+        return name, path, digest, error, ids, True
+
+    entries, changed, invalid = {}, [], {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for name, path, digest, error, ids, is_changed in pool.map(inspect, files):
+            if error:
+                invalid[name] = error
+                continue
+            entries[name] = {"sha256": digest, "ids": ids}
+            if is_changed:
+                changed.append((name, path))
+    return entries, changed, invalid
+
+
+def scan_bundle(index, manifest_entries, force, only=None):
+    """Like scan() for a bundle index; changed items carry no path until extracted."""
+    entries, changed = {}, []
+    for item in index:
+        name = item["file"]
+        if only is not None and name not in only:
+            continue
+        entries[name] = {"sha256": item["sha256"], "ids": item["ids"]}
+        previous = manifest_entries.get(name)
+        if force or not previous or previous.get("sha256") != item["sha256"]:
+            changed.append((name, None))
+    return entries, changed, {}
+
+
+def existing_workflow_ids(runner=run_n8n):
+    """IDs of workflows in the database, or None if n8n could not list them."""
+    code, output = runner(["list:workflow", "--onlyId"])
+    if code != 0:
+        return None
+    return {line.strip() for line in output.splitlines() if WORKFLOW_ID_RE.match(line.strip())}
+
+
+def import_batch(kind, files, runner=run_n8n):
+    """
+    Import files with one n8n call; bisect on failure.
+
+    Returns (imported names, {name: error}).
+    """
+    if not files:
+        return [], {}
+    staging = tempfile.mkdtemp(prefix=f"n8n-import-{kind}-")
+    try:
+        # Directory mode only reads *.json; staged names are unique and keep the order
+        for index, (name, path) in enumerate(files):
+            shutil.copyfile(path, os.path.join(staging, f"{index:05d}.json"))
+        code, output = runner([IMPORT_COMMANDS[kind], "--separate", f"--input={staging}"])
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    if code == 0:
+        return [name for name, _ in files], {}
+    if len(files) == 1:
+        tail = " | ".join(line.strip() for line in output.strip().splitlines()[-3:])
+        return [], {files[0][0]: tail or f"n8n exited with code {code}"}
+    middle = len(files) // 2
+    left_ok, left_failed = import_batch(kind, files[:middle], runner)
+    right_ok, right_failed = import_batch(kind, files[middle:], runner)
+    return left_ok + right_ok, {**left_failed, **right_failed}
+
+
+def selected_workflows(backup_dir, selector, catalog_path, available_credentials=None, bundle=None):
+    """File names of workflows matching the selector (raises ValueError on a bad selector)."""
+    selectors = catalog.parse_selectors(selector)
+    if bundle is not None:
+        # The bundle index carries the catalog fields already
+        index = {"workflows": {item["file"]: item for item in bundle.index}}
+    else:
+        index, errors = catalog.load_or_build(catalog_path, os.path.join(backup_dir, "workflows"))
+        for name, error in sorted(errors.items()):
+            print(f"WARNING: {name} not in catalog: {error}")
+    available = catalog.available_credential_types(os.path.join(backup_dir, "credentials"), available_credentials)
+    return set(catalog.select(index, selectors, available))
+
+
+def run_import(backup_dir, manifest_path, force=False, verify=True, dry_run=False, runner=run_n8n,
+               selector="", catalog_path=None, available_credentials=None, bundle_path=None):
+    """Import changed files of every kind; return a report dict."""
+    bundle = Bundle(bundle_path) if bundle_path else None
+    try:
+        return _run_import(backup_dir, manifest_path, force, verify, dry_run, runner,
+                           selector, catalog_path, available_credentials, bundle)
+    finally:
+        if bundle is not None:
+            bundle.close()
+
+
+def _run_import(backup_dir, manifest_path, force, verify, dry_run, runner,
+                selector, catalog_path, available_credentials, bundle):
+    manifest = load_json(manifest_path, {}) or {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        manifest = {"version": MANIFEST_VERSION}
+    report = {}
+    only = {}
+    if selector:
+        catalog_path = catalog_path or os.path.join(os.path.dirname(os.path.abspath(manifest_path)), "workflow-catalog.json")
+        only["workflows"] = selected_workflows(backup_dir, selector, catalog_path, available_credentials, bundle)
+
+    for kind in KINDS:
+        started = time.monotonic()
+        previous = manifest.get(kind, {})
+        from_bundle = kind == "workflows" and bundle is not None
+        if from_bundle:
+            entries, changed, invalid = scan_bundle(bundle.index, previous, force, only=only.get(kind))
+        else:
+            entries, changed, invalid = scan(kind, os.path.join(backup_dir, kind), previous, force, only=only.get(kind))
+
+        if kind == "workflows" and verify and not force:
+            unchanged = [name for name in entries if name not in {n for n, _ in changed}]
+            if unchanged:
+                present_ids = existing_workflow_ids(runner)
+                if present_ids is None:
+                    print("WARNING: could not list workflows in n8n; trusting the manifest.")
+                else:
+                    for name in unchanged:
+                        if any(i not in present_ids for i in entries[name]["ids"]):
+                            changed.append((name, None if from_bundle else os.path.join(backup_dir, kind, name)))
+
+        if dry_run:
+            imported, failed = [name for name, _ in changed], {}
+        elif from_bundle and changed:
+            extracted = tempfile.mkdtemp(prefix="n8n-bundle-")
+            try:
+                paths = dict(bundle.extract(extracted, {name for name, _ in changed}))
+                imported, failed = import_batch(kind, [(name, paths[name]) for name, _ in changed], runner)
+            finally:
+                shutil.rmtree(extracted, ignore_errors=True)
+        else:
+            imported, failed = import_batch(kind, changed, runner)
+
+        # Failed and invalid files stay out of the manifest, so they are retried next run;
+        # deselected files keep their old entries, so re-selecting them does not reimport
+        kept = {name: entry for name, entry in previous.items() if kind in only and name not in only[kind]}
+        kept.update((name, entry) for name, entry in entries.items() if name not in failed)
+        manifest[kind] = kept
+        report[kind] = {
+            "total": len(entries) + len(invalid),
+            "imported": len(imported),
+            "skipped": len(entries) - len(changed),
+            "failed": {**invalid, **failed},
+            "seconds": round(time.monotonic() - started, 2),
+        }
+
+    if not dry_run:
+        atomic_write_json(manifest_path, manifest)
+    return report
+
+
+def print_report(report, dry_run=False):
+    for kind, stats in report.items():
+        verb = "would import" if dry_run else "imported"
+        print(f"{kind}: {stats['total']} files, {verb} {stats['imported']}, "
+              f"unchanged {stats['skipped']}, failed {len(stats['failed'])} ({stats['seconds']}s)")
+        for name, error in sorted(stats["failed"].items()):
+            print(f"  FAILED {name}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import changed n8n credentials and workflows in bulk.")
+    parser.add_argument("--backup-dir", default=os.environ.get("N8N_IMPORT_DIR", DEFAULT_BACKUP_DIR))
+    parser.add_argument("--manifest", default=os.environ.get("N8N_IMPORT_MANIFEST", DEFAULT_MANIFEST))
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and import everything")
+    parser.add_argument("--no-verify", action="store_true", help="do not check the database for missing workflows")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be imported")
+    parser.add_argument("--strict", action="store_true", help="exit with code 1 if any file failed")
+    parser.add_argument("--select", default=os.environ.get("N8N_IMPORT_SELECT", ""),
+                        help='import only matching workflows, e.g. "llm:ollama,credentials:available"')
+    parser.add_argument("--bundle", default=os.environ.get("N8N_IMPORT_BUNDLE") or None,
+                        help="read workflows from this bundle instead of <backup-dir>/workflows")
+    parser.add_argument("--catalog", default=os.environ.get("N8N_CATALOG"),
+                        help="workflow catalog path (default: next to the manifest)")
+    args = parser.parse_args(argv)
+
+    if not args.force and not env_flag("RUN_N8N_IMPORT"):
+        print("Skipping n8n import based on RUN_N8N_IMPORT environment variable.")
+        return 0
+
+    try:
+        report = run_import(
+            args.backup_dir,
+            args.manifest,
+            force=args.force,
+            verify=not args.no_verify and env_flag("N8N_IMPORT_VERIFY", True),
+            dry_run=args.dry_run,
+            selector=args.select,
+            catalog_path=args.catalog,
+            available_credentials=os.environ.get("N8N_AVAILABLE_CREDENTIALS"),
+            bundle_path=args.bundle,
+        )
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    print_report(report, args.dry_run)
+    print("Import process finished.")
+    failed = sum(len(stats["failed"]) for stats in report.values())
+    return 1 if failed and args.strict else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+n8n_prune.py
+
+Prunes n8n execution history in Postgres by policy, in small batches.
+
+Policy (defaults from the environment, per-workflow overrides from a JSON file):
+    success_days   delete successful executions older than this (N8N_PRUNE_SUCCESS_DAYS, 7)
+    error_days     delete failed/crashed/canceled executions older than this (N8N_PRUNE_ERROR_DAYS, 30)
+    max_rows       keep at most this many finished executions per workflow (N8N_PRUNE_MAX_ROWS, 10000)
+A value of 0 disables the rule. Running and waiting executions are never deleted;
+executions n8n already soft-deleted (deletedAt set) always are.
+
+Policy file (N8N_PRUNE_POLICY), keys under "workflows" are workflow ids:
+    {"default": {"success_days": 3}, "workflows": {"AbC123xyz0000001": {"error_days": 90, "max_rows": 0}}}
+
+Every batch is its own short transaction: it picks the next N matching ids above
+a cursor (keyset pagination on the primary key) and deletes them; execution_data
+and metadata rows go with them through n8n's ON DELETE CASCADE keys. A pause
+between batches keeps locks and WAL bursts short. After a pass that deleted rows,
+VACUUM (ANALYZE) runs on the execution tables, and the report shows the execution
+data made reusable and the table sizes before and after.
+
+Runs once with --once, otherwise every --interval seconds (N8N_PRUNE_INTERVAL).
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from common import load_json, psql_rows
+
+FINISHED = ("success", "error", "crashed", "canceled")
+FAILED = ("error", "crashed", "canceled")
+RULES = ("success_days", "error_days", "max_rows")
+DEFAULT_POLICY = {"success_days": 7, "error_days": 30, "max_rows": 10000}
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _in_list(values):
+    return "(" + ", ".join(_literal(v) for v in values) + ")"
+
+
+def load_policy(path=None, env=os.environ):
+    """{"default": {...}, "workflows": {id: {...}}} with every rule filled in."""
+    default = dict(DEFAULT_POLICY)
+    for rule in RULES:
+        if env.get(f"N8N_PRUNE_{rule.upper()}"):
+            default[rule] = int(env[f"N8N_PRUNE_{rule.upper()}"])
+    data = (load_json(path) if path else None) or {}
+    default.update({k: int(v) for k, v in (data.get("default") or {}).items() if k in RULES})
+    workflows = {
+        str(wf_id): {**default, **{k: int(v) for k, v in rules.items() if k in RULES}}
+        for wf_id, rules in (data.get("workflows") or {}).items()
+    }
+    return {"default": default, "workflows": workflows}
+
+
+class Pruner:
+    """Runs the batched deletes; query(sql) returns the JSON rows of one statement."""
+
+    def __init__(self, policy, prefix="", batch_size=500, pause=0.2, query=None, stop=None):
+        self.policy, self.batch_size, self.pause = policy, batch_size, pause
+        self.executions, self.data = f"{prefix}execution_entity", f"{prefix}execution_data"
+        self.query = query or (lambda sql: list(psql_rows(sql, fetch_count=0)))
+        self.stop = stop or threading.Event()
+
+    def age_rules(self):
+        """(label, SQL condition) for soft-deleted rows and every age rule."""
+        rules = [("soft-deleted", '"deletedAt" IS NOT NULL')]
+        overrides = list(self.policy["workflows"])
+        scopes = [("default", self.policy["default"],
+                   f'"workflowId" NOT IN {_in_list(overrides)}' if overrides else "TRUE")]
+        scopes += [(wf_id, rules_, f'"workflowId" = {_literal(wf_id)}') for wf_id, rules_ in self.policy["workflows"].items()]
+        for scope, rules_, where in scopes:
+            for rule, statuses in (("success_days", ("success",)), ("error_days", FAILED)):
+                days = rules_[rule]
+                if days > 0:
+                    rules.append((f"{scope} {rule}={days}", f"{where} AND status IN {_in_list(statuses)} "
+                                  f"AND \"stoppedAt\" < now() - interval '{int(days)} days'"))
+        return rules
+
+    def max_rows_rules(self):
+        """(label, SQL condition) per workflow holding more finished executions than its max_rows."""
+        limits = {wf_id: rules["max_rows"] for wf_id, rules in self.policy["workflows"].items()}
+        default = self.policy["default"]["max_rows"]
+        smallest = min([v for v in [default, *limits.values()] if v > 0], default=0)
+        if not smallest:
+            return []
+        counts = self.query(
+            f'SELECT json_build_object(\'workflow\', "workflowId", \'count\', count(*)) FROM {self.executions} '
+            f'WHERE status IN {_in_list(FINISHED)} GROUP BY "workflowId" HAVING count(*) > {int(smallest)}'
+        )
+        rules = []
+        for row in counts:
+            limit = limits.get(row["workflow"], default)
+            if limit <= 0 or row["count"] <= limit:
+                continue
+            # id of the oldest execution to keep: everything older goes
+            keep = self.query(
+                f"SELECT json_build_object('id', id) FROM {self.executions} "
+                f"WHERE \"workflowId\" = {_literal(row['workflow'])} AND status IN {_in_list(FINISHED)} "
+                f"ORDER BY id DESC OFFSET {int(limit) - 1} LIMIT 1"
+            )
+            if keep:
+                rules.append((f"{row['workflow']} max_rows={limit}",
+                              f"\"workflowId\" = {_literal(row['workflow'])} AND status IN {_in_list(FINISHED)} "
+                              f"AND id < {int(keep[0]['id'])}"))
+        return rules
+
+    def delete_where(self, where):
+        """Delete matching executions batch by batch; return (rows, execution data bytes)."""
+        cursor, deleted, freed = 0, 0, 0
+        while not self.stop.is_set():
+            rows = self.query(f"""
+                WITH ids AS (
+                    SELECT id FROM {self.executions} WHERE id > {int(cursor)} AND {where} ORDER BY id LIMIT {int(self.batch_size)}
+                ), data AS (
+                    SELECT COALESCE(sum(pg_column_size(d.data) + pg_column_size(d."workflowData")), 0) AS bytes
+                    FROM {self.data} d WHERE d."executionId" IN (SELECT id FROM ids)
+                ), gone AS (
+                    DELETE FROM {self.executions} WHERE id IN (SELECT id FROM ids) RETURNING id
+                )
+                SELECT json_build_object('count', (SELECT count(*) FROM gone), 'last', (SELECT max(id) FROM gone),
+                                         'bytes', (SELECT bytes FROM data))
+            """)
+            batch = rows[0] if rows else {"count": 0}
+            deleted += batch["count"]
+            freed += int(batch.get("bytes") or 0)
+            if batch["count"] < self.batch_size:
+                break
+            cursor = batch["last"]
+            self.stop.wait(self.pause)
+        return deleted, freed
+
+    def table_sizes(self):
+        rows = self.query(
+            f"SELECT json_build_object('{self.executions}', pg_total_relation_size('{self.executions}'), "
+            f"'{self.data}', pg_total_relation_size('{self.data}'))"
+        )
+        return rows[0] if rows else {}
+
+    def run(self):
+        """One pruning pass; return a report dict."""
+        started = time.monotonic()
+        report = {"deleted": {}, "rows": 0, "data_bytes": 0, "sizes_before": self.table_sizes()}
+        for label, where in self.age_rules() + self.max_rows_rules():
+            rows, freed = self.delete_where(where)
+            if rows:
+                report["deleted"][label] = rows
+                report["rows"] += rows
+                report["data_bytes"] += freed
+        if report["rows"]:
+            for table in (self.executions, self.data):
+                self.query(f"VACUUM (ANALYZE) {table}")
+        report["sizes_after"] = self.table_sizes()
+        report["seconds"] = round(time.monotonic() - started, 2)
+        return report
+
+
+def _mb(value):
+    return f"{int(value or 0) / 1024 / 1024:.1f} MB"
+
+
+def print_report(report):
+    stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    print(f"{stamp} prune: deleted {report['rows']} executions, {_mb(report['data_bytes'])} of execution data "
+          f"reusable ({report['seconds']}s)", flush=True)
+    for label, rows in report["deleted"].items():
+        print(f"  {label}: {rows}", flush=True)
+    for table, before in report["sizes_before"].items():
+        print(f"  {table}: {_mb(before)} -> {_mb(report['sizes_after'].get(table))}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prune n8n execution history in batches.")
+    parser.add_argument("--policy", default=os.environ.get("N8N_PRUNE_POLICY"), help="JSON policy file")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get("N8N_PRUNE_BATCH", "500")))
+    parser.add_argument("--pause", type=float, default=float(os.environ.get("N8N_PRUNE_PAUSE", "0.2")),
+                        help="seconds between batches")
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("N8N_PRUNE_INTERVAL", "3600")))
+    parser.add_argument("--once", action="store_true", help="prune once and exit")
+    args = parser.parse_args(argv)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    while True:
+        try:
+            pruner = Pruner(load_policy(args.policy), os.environ.get("DB_TABLE_PREFIX", ""),
+                            args.batch_size, args.pause, stop=stop)
+            print_report(pruner.run())
+        except (RuntimeError, OSError, ValueError) as e:
+            print(f"ERROR: prune failed: {e}", file=sys.stderr, flush=True)
+            if args.once:
+                return 1
+        if args.once or stop.wait(args.interval):
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""Make the tool modules importable as top-level modules, like in the container."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+"""Tests for the n8n-worker autoscaling policy and the compose call."""
+
+import os
+
+import pytest
+
+import autoscaler
+from autoscaler import ScalePolicy
+
+
+def test_scale_up_needs_sustained_load_and_respects_cooldown():
+    policy = ScalePolicy(max_replicas=5, up_samples=2, up_cooldown=60)
+    assert policy.decide(0, waiting=30, active=10, replicas=1)[0] is None  # single spike
+    assert policy.decide(15, waiting=30, active=10, replicas=1)[0] == 5    # 40 jobs / (10 * 0.8) slots
+    assert policy.decide(30, waiting=30, active=10, replicas=3)[0] is None
+    assert policy.decide(45, waiting=30, active=10, replicas=3) == (None, "scale-up cooldown")
+
+
+def test_scale_down_one_step_after_quiet_period():
+    policy = ScalePolicy(down_samples=3, down_cooldown=100)
+    decisions = [policy.decide(t, waiting=0, active=1, replicas=3)[0] for t in (0, 10, 20)]
+    assert decisions == [None, None, 2]
+    assert policy.decide(30, waiting=0, active=0, replicas=1)[0] is None  # at the minimum
+
+
+def test_memory_guard_limits_new_workers():
+    policy = ScalePolicy(max_replicas=8, up_samples=1, worker_mb=500, min_free_mb=1000)
+    assert policy.decide(0, waiting=100, active=10, replicas=2, mem_available_mb=2100)[0] == 4
+    assert policy.decide(100, waiting=100, active=10, replicas=4, mem_available_mb=1200)[1].startswith("memory guard")
+
+
+def test_compose_runs_on_the_host_path(tmp_path, monkeypatch):
+    mount = tmp_path / "project"
+    mount.mkdir()
+    (mount / "docker-compose.yml").write_text("services: {}\n")
+    host_dir = str(tmp_path / "host" / "srv" / "n8n-installer")
+
+    autoscaler.link_project_dir(host_dir, mount=str(mount))
+    autoscaler.link_project_dir(host_dir, mount=str(mount))  # restart: link already there
+    assert os.path.isfile(os.path.join(host_dir, "docker-compose.yml"))
+
+    calls = []
+    monkeypatch.setattr(autoscaler, "docker", calls.append)
+    autoscaler.scale(3, host_dir, 300)
+    args = calls[0]
+    assert args[args.index("--project-directory") + 1] == host_dir
+    assert args[args.index("-f") + 1] == os.path.join(host_dir, "docker-compose.yml")
+    assert args[args.index("--env-file") + 1] == os.path.join(host_dir, ".env")
+    assert args[-2:] == ["n8n-worker=3", "n8n-worker"]
+
+
+def test_link_refuses_to_shadow_an_unrelated_path(tmp_path):
+    (tmp_path / "project").mkdir()
+    (tmp_path / "taken").mkdir()
+    with pytest.raises(RuntimeError):
+        autoscaler.link_project_dir(str(tmp_path / "taken"), mount=str(tmp_path / "project"))
@@ -0,0 +1,57 @@
+"""Tests for the binary-data garbage collector."""
+
+import os
+
+import binary_gc
+
+NOW = 1_000_000.0
+
+
+def make_execution(binary_dir, workflow_id, execution_id, files=2, mtime=NOW - 7200):
+    path = binary_dir / "workflows" / workflow_id / "executions" / str(execution_id)
+    (path / "binary_data").mkdir(parents=True)
+    for i in range(files):
+        (path / "binary_data" / f"file{i}").write_bytes(b"x" * 100)
+    os.utime(path, (mtime, mtime))
+    os.utime(path.parent, (NOW - 10, NOW - 10))
+    return path
+
+
+class FakeDb:
+    def __init__(self, live):
+        self.live = set(live)
+        self.statements = []
+
+    def __call__(self, sql):
+        self.statements.append(sql)
+        if "min(id)" in sql:
+            return [{"min": min(self.live) if self.live else None}]
+        ids = [int(i) for i in sql.split("IN (")[1].rstrip(")").split(",")]
+        return [{"id": i} for i in ids if i in self.live]
+
+
+def test_deletes_only_old_orphans_and_keeps_state(tmp_path):
+    binary_dir, state = tmp_path / "binaryData", str(tmp_path / "state.json")
+    dead_below_min = make_execution(binary_dir, "wfA", 3)
+    dead = make_execution(binary_dir, "wfA", 12)
+    alive = make_execution(binary_dir, "wfB", 11)
+    young = make_execution(binary_dir, "wfB", 13, mtime=NOW - 60)
+    temp = binary_dir / "workflows" / "wfB" / "executions" / "temp"
+    temp.mkdir()
+    db = FakeDb([10, 11])
+
+    report = binary_gc.collect(str(binary_dir), state, grace=3600, files_per_second=0, query=db, now=NOW)
+    assert report["indexed"] == 4
+    assert report["orphans"] == 2 and report["files"] == 4 and report["bytes"] == 400
+    assert not dead_below_min.exists() and not dead.exists()
+    assert alive.exists() and young.exists() and temp.exists()
+    lookups = [s for s in db.statements if "IN (" in s]
+    assert lookups and "3" not in lookups[0].split("IN (")[1]  # below the smallest live id: no lookup
+
+    # Next run: nothing new on disk, so no directory is listed again; the execution
+    # that was alive is deleted once its row is gone
+    db.live = {13}
+    report = binary_gc.collect(str(binary_dir), state, grace=3600, files_per_second=0, query=db, now=NOW + 4000)
+    assert report["indexed"] == 0
+    assert report["orphans"] == 1 and not alive.exists()
+    assert young.exists() and report["tracked"] == 1
@@ -0,0 +1,39 @@
+"""Tests for workflow catalog selectors."""
+
+import pytest
+
+import catalog
+
+
+def test_parse_selectors():
+    assert catalog.parse_selectors("llm:ollama|openai, !tag:x, maxsize:2.5, credentials:available") == [
+        (False, "llm", ["ollama", "openai"]),
+        (True, "tag", ["x"]),
+        (False, "maxsize", ["2.5"]),
+        (False, "credentials", ["available"]),
+    ]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("maxsize:abc", "maxsize: 'abc'"),
+    ("maxsize:-1", "maxsize: '-1'"),
+    ("maxsize:nan", "maxsize: 'nan'"),
+    ("credentials:foo", "only supports 'available'"),
+    ("llm:|", "has no values"),
+    ("color:red", "unknown selector"),
+])
+def test_bad_selectors_fail_at_parse_time(text, message):
+    with pytest.raises(ValueError, match=message):
+        catalog.parse_selectors(text)
+
+
+def test_list_reports_bad_selector_as_usage_error(tmp_path, capsys):
+    (tmp_path / "workflows").mkdir()
+    argv = ["list", "--workflows-dir", str(tmp_path / "workflows"), "--catalog", str(tmp_path / "catalog.json"),
+            "--credentials-dir", str(tmp_path / "credentials"), "--select", "maxsize:abc"]
+
+    with pytest.raises(SystemExit) as exit_info:
+        catalog.main(argv)
+
+    assert exit_info.value.code == 2
+    assert "maxsize: 'abc' is not a size in KB" in capsys.readouterr().err
@@ -0,0 +1,65 @@
+"""Tests for the per-workflow execution latency exporter."""
+
+import execution_metrics
+
+
+class FakeDb:
+    """Rows are dicts shaped like the exporter's SELECT; answers max(id), id > n and id IN (...)."""
+
+    def __init__(self, rows):
+        self.rows = {row["id"]: row for row in rows}
+        self.statements = []
+
+    def __call__(self, sql):
+        sql = " ".join(sql.split())
+        self.statements.append(sql)
+        if "max(id)" in sql:
+            return [{"max": max(self.rows, default=None)}]
+        if "e.id IN (" in sql:
+            ids = {int(i) for i in sql.split("e.id IN (")[1].split(")")[0].split(",")}
+            return [self.rows[i] for i in sorted(ids) if i in self.rows]
+        cursor = int(sql.split("e.id > ")[1].split()[0])
+        limit = int(sql.split("LIMIT ")[1])
+        return [self.rows[i] for i in sorted(self.rows) if i > cursor][:limit]
+
+
+def row(id_, status="success", duration=2.0, wait=0.2, workflow="wf1", name="Mailer"):
+    finished = status in execution_metrics.FINISHED
+    return {"id": id_, "workflow": workflow, "name": name, "status": status, "finished": finished,
+            "wait": wait, "duration": duration if finished else None}
+
+
+def test_tails_by_cursor_and_rechecks_pending():
+    db = FakeDb([row(1)])
+    tail = execution_metrics.ExecutionTail(batch_size=2, query=db)
+    assert tail.poll() == 0 and tail.cursor == 1  # history before start is not counted
+
+    db.rows.update({2: row(2), 3: row(3, "running"), 4: row(4, "error", 40.0), 5: row(5, duration=0.05)})
+    assert tail.poll() == 3
+    assert tail.pending == {3} and tail.cursor == 5
+    scans = [s for s in db.statements if "e.id > " in s]
+    assert [s.split("e.id > ")[1].split()[0] for s in scans] == ["1", "1", "3", "5"]
+
+    db.rows[3] = row(3, "success", 700.0, wait=12.0, workflow="wf2", name='Say "hi"')
+    assert tail.poll() == 1 and not tail.pending
+
+    text = tail.render()
+    assert 'n8n_workflow_executions_total{workflow_id="wf1",workflow_name="Mailer",status="success"} 2' in text
+    assert 'n8n_workflow_executions_total{workflow_id="wf1",workflow_name="Mailer",status="error"} 1' in text
+    assert 'n8n_workflow_execution_duration_seconds_bucket{workflow_id="wf1",workflow_name="Mailer",le="0.1"} 1' in text
+    assert 'n8n_workflow_execution_duration_seconds_bucket{workflow_id="wf1",workflow_name="Mailer",le="30"} 2' in text
+    assert 'n8n_workflow_execution_duration_seconds_count{workflow_id="wf1",workflow_name="Mailer"} 3' in text
+    assert 'n8n_workflow_queue_wait_seconds_bucket{workflow_id="wf2",workflow_name="Say \\"hi\\"",le="10"} 0' in text
+    assert "n8n_execution_exporter_cursor 5" in text
+
+
+def test_pending_is_bounded_and_forgets_deleted():
+    db = FakeDb([])
+    tail = execution_metrics.ExecutionTail(max_pending=2, query=db)
+    tail.poll()
+    db.rows.update({i: row(i, "waiting") for i in range(1, 5)})
+    tail.poll()
+    assert tail.pending == {3, 4}
+    del db.rows[4]
+    tail.poll()
+    assert tail.pending == {3}
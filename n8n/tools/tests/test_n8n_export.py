@@ -0,0 +1,42 @@
+"""Tests for the incremental workflow exporter."""
+
+import json
+
+import n8n_export
+
+
+def _row(wf_id, name, updated, nodes=()):
+    return {"id": wf_id, "name": name, "active": False, "nodes": list(nodes), "connections": {},
+            "settings": None, "updatedAt": updated, "tags": []}
+
+
+def test_writes_only_changed_workflows(tmp_path):
+    out, state = tmp_path / "workflows", str(tmp_path / "state.json")
+    out.mkdir()
+    # Existing backup file keeps its name; an unchanged canonical file is not rewritten
+    kept = n8n_export.to_export(_row("wfidexisting0000", "Old name", "2024-01-01"))
+    (out / "custom file.json").write_text(n8n_export.canonical_json(kept))
+
+    rows = [_row("wfidexisting0000", "Old name", "2024-01-01"), _row("wfidnew000000000", "New: flow/1", "2024-01-02")]
+    report = n8n_export.export_once(str(out), state, rows=rows)
+    assert (report["written"], report["unchanged"]) == (1, 1)
+    assert sorted(p.name for p in out.iterdir()) == ["New_ flow_1.json", "custom file.json"]
+    assert json.loads((tmp_path / "state.json").read_text())["since"] == "2024-01-02"
+
+    edited = _row("wfidexisting0000", "Old name", "2024-01-03", nodes=[{"name": "Set", "type": "n8n-nodes-base.set"}])
+    report = n8n_export.export_once(str(out), state, rows=[edited, rows[1]])
+    assert (report["written"], report["unchanged"]) == (1, 1)
+    text = (out / "custom file.json").read_text()
+    assert text == n8n_export.canonical_json(n8n_export.to_export(edited))
+    assert "updatedAt" not in text
+
+
+def test_unwritable_output_dir_fails_at_startup(tmp_path, monkeypatch, capsys):
+    def denied(path, *args, **kwargs):
+        raise PermissionError(13, "Permission denied", path)
+
+    monkeypatch.setattr(n8n_export, "open", denied, raising=False)
+    argv = ["--once", "--output-dir", str(tmp_path / "workflows"), "--state", str(tmp_path / "state.json")]
+
+    assert n8n_export.main(argv) == 1
+    assert "chown -R 1000:1000 n8n/backup/workflows" in capsys.readouterr().err
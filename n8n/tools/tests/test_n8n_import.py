@@ -0,0 +1,166 @@
+"""Tests for the bulk hash-skipping importer."""
+
+import json
+import os
+import zlib
+
+import pytest
+
+import bundle
+import n8n_import
+
+
+def _workflow(wf_id, name="wf"):
+    return {"id": wf_id, "name": name, "nodes": [], "connections": {}}
+
+
+class FakeN8n:
+    """Stands in for the n8n CLI: records calls, fails on marked workflows."""
+
+    def __init__(self, bad_ids=()):
+        self.calls = []
+        self.db = set()
+        self.bad_ids = set(bad_ids)
+
+    def __call__(self, args):
+        self.calls.append(args[0])
+        if args[0] == "list:workflow":
+            return 0, "some log line\n" + "\n".join(sorted(self.db))
+        directory = args[-1].split("=", 1)[1]
+        ids = []
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name)) as f:
+                ids.append(json.load(f)["id"])
+        if self.bad_ids & set(ids):
+            return 1, "Error: could not import workflow"
+        self.db.update(ids)
+        return 0, ""
+
+
+def _backup(tmp_path, workflows):
+    wf_dir = tmp_path / "backup" / "workflows"
+    wf_dir.mkdir(parents=True)
+    (tmp_path / "backup" / "credentials").mkdir()
+    (wf_dir / ".gitkeep").write_text("")
+    for file_name, data in workflows.items():
+        (wf_dir / file_name).write_text(data if isinstance(data, str) else json.dumps(data))
+    return str(tmp_path / "backup"), str(tmp_path / "manifest.json")
+
+
+def test_one_batch_then_skip_unchanged(tmp_path):
+    backup, manifest = _backup(tmp_path, {
+        f"w{i}.json": _workflow(f"wfid{i:012d}") for i in range(20)
+    })
+    n8n = FakeN8n()
+
+    report = n8n_import.run_import(backup, manifest, runner=n8n)
+    assert report["workflows"]["imported"] == 20
+    assert n8n.calls == ["import:workflow"]
+
+    n8n.calls.clear()
+    report = n8n_import.run_import(backup, manifest, runner=n8n)
+    assert report["workflows"]["imported"] == 0
+    assert report["workflows"]["skipped"] == 20
+    assert n8n.calls == ["list:workflow"]
+
+
+def test_failures_are_isolated_and_retried(tmp_path):
+    backup, manifest = _backup(tmp_path, {
+        **{f"w{i}.json": _workflow(f"wfid{i:012d}") for i in range(8)},
+        "broken.json": "{not json",
+        "no extension": _workflow("wfidnoextension0"),
+    })
+    n8n = FakeN8n(bad_ids={"wfid000000000003"})
+
+    report = n8n_import.run_import(backup, manifest, runner=n8n)
+    failed = report["workflows"]["failed"]
+    assert set(failed) == {"w3.json", "broken.json"}
+    assert report["workflows"]["imported"] == 8
+    assert "wfidnoextension0" in n8n.db
+
+    # Fixed upstream: only the previously failed file is imported again
+    n8n.bad_ids.clear()
+    report = n8n_import.run_import(backup, manifest, runner=n8n)
+    assert report["workflows"]["imported"] == 1
+    assert report["workflows"]["failed"] == {"broken.json": failed["broken.json"]}
+
+
+def test_reimports_workflows_missing_from_database(tmp_path):
+    backup, manifest = _backup(tmp_path, {
+        "a.json": _workflow("wfid00000000000a"), "b.json": _workflow("wfid00000000000b"),
+    })
+    n8n = FakeN8n()
+    n8n_import.run_import(backup, manifest, runner=n8n)
+
+    n8n.db.discard("wfid00000000000b")  # e.g. database volume was reset
+    report = n8n_import.run_import(backup, manifest, runner=n8n)
+    assert report["workflows"]["imported"] == 1
+    assert "wfid00000000000b" in n8n.db
+
+
+def test_select_imports_only_matching_workflows(tmp_path):
+    ollama = {"type": "@n8n/n8n-nodes-langchain.lmChatOllama", "credentials": {"ollamaApi": {"id": "1"}}}
+    openai = {"type": "@n8n/n8n-nodes-langchain.lmChatOpenAi", "credentials": {"openAiApi": {"id": "2"}}}
+    backup, manifest = _backup(tmp_path, {
+        "local.json": {**_workflow("wfidlocal0000000"), "nodes": [ollama]},
+        "cloud.json": {**_workflow("wfidcloud0000000"), "nodes": [openai]},
+        "mixed.json": {**_workflow("wfidmixed0000000"), "nodes": [ollama, openai]},
+    })
+    n8n = FakeN8n()
+
+    report = n8n_import.run_import(backup, manifest, runner=n8n, selector="llm:ollama,credentials:available",
+                                   available_credentials="ollamaApi")
+    assert n8n.db == {"wfidlocal0000000"}
+    assert report["workflows"]["total"] == 1
+
+    # Widening the selection imports only the newly selected files
+    report = n8n_import.run_import(backup, manifest, runner=n8n, selector="!llm:openai|anthropic")
+    assert report["workflows"]["imported"] == 0
+    report = n8n_import.run_import(backup, manifest, runner=n8n, selector="llm:ollama")
+    assert report["workflows"]["imported"] == 1
+    assert n8n.db == {"wfidlocal0000000", "wfidmixed0000000"}
+    assert os.path.exists(tmp_path / "workflow-catalog.json")
+
+
+def test_bundle_import_decodes_only_changed_entries(tmp_path, monkeypatch):
+    backup, manifest = _backup(tmp_path, {
+        f"w{i}.json": {**_workflow(f"wfid{i:012d}"), "nodes": [{"name": "Note", "type": bundle.STICKY_NOTE}]}
+        for i in range(5)
+    })
+    bundle_path = str(tmp_path / "workflows.bundle")
+    bundle.pack(os.path.join(backup, "workflows"), bundle_path, codec="zlib", notes=False)
+    n8n = FakeN8n()
+
+    report = n8n_import.run_import(backup, manifest, runner=n8n, bundle_path=bundle_path)
+    assert report["workflows"]["imported"] == 5
+    assert len(n8n.db) == 5
+
+    with open(os.path.join(backup, "workflows", "w2.json"), "w") as f:
+        json.dump(_workflow("wfid000000000002", name="edited"), f)
+    bundle.pack(os.path.join(backup, "workflows"), bundle_path, codec="zlib", notes=False)
+    decoded = []
+    read = bundle.Bundle.read
+    monkeypatch.setattr(bundle.Bundle, "read", lambda self, item: decoded.append(item["file"]) or read(self, item))
+
+    report = n8n_import.run_import(backup, manifest, runner=n8n, bundle_path=bundle_path)
+    assert report["workflows"]["imported"] == 1
+    assert decoded == ["w2.json"]
+
+
+def test_bundle_rejects_entry_names_outside_the_directory(tmp_path):
+    source = tmp_path / "workflows"
+    source.mkdir()
+    (source / "w.json").write_text(json.dumps(_workflow("wfid000000000001")))
+    bundle_path = str(tmp_path / "workflows.bundle")
+    bundle.pack(str(source), bundle_path, codec="zlib")
+
+    with open(bundle_path, "rb") as f:
+        magic, codec_id, flags, index_length = bundle.HEADER.unpack(f.read(bundle.HEADER.size))
+        index, payloads = json.loads(zlib.decompress(f.read(index_length))), f.read()
+    index[0]["file"] = "../evil.json"
+    packed_index = zlib.compress(json.dumps(index).encode())
+    with open(bundle_path, "wb") as f:
+        f.write(bundle.HEADER.pack(magic, codec_id, flags, len(packed_index)) + packed_index + payloads)
+
+    with pytest.raises(ValueError, match="plain file name"):
+        bundle.Bundle(bundle_path)
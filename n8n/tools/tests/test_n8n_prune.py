@@ -0,0 +1,81 @@
+"""Tests for the execution pruning daemon."""
+
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import n8n_prune
+
+
+class FakeDb:
+    """Answers the pruner's statements for a list of (id, workflowId, status) rows, all old."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def __call__(self, sql):
+        self.statements.append(" ".join(sql.split()))
+        if "pg_total_relation_size" in sql:
+            return [{"execution_entity": 1000, "execution_data": 5000}]
+        if sql.startswith("VACUUM") or "GROUP BY" in sql:
+            return []
+        cursor = int(sql.split("id > ")[1].split()[0])
+        limit = int(sql.split("LIMIT ")[1].split()[0])
+        statuses = ("success",) if "IN ('success')" in sql else n8n_prune.FAILED
+        batch = [r for r in self.rows if r[0] > cursor and r[2] in statuses and "deletedAt" not in sql][:limit]
+        self.rows = [r for r in self.rows if r not in batch]
+        return [{"count": len(batch), "last": batch[-1][0] if batch else None, "bytes": 100 * len(batch)}]
+
+
+def test_deletes_in_keyset_batches_and_vacuums():
+    rows = [(i, "wf", "success" if i % 3 else "error") for i in range(1, 21)] + [(21, "wf", "running")]
+    db = FakeDb(rows)
+    pruner = n8n_prune.Pruner(n8n_prune.load_policy(env={"N8N_PRUNE_MAX_ROWS": "0"}), batch_size=4, pause=0, query=db)
+
+    report = pruner.run()
+    assert report["rows"] == 20
+    assert report["deleted"] == {"default success_days=7": 14, "default error_days=30": 6}
+    assert db.rows == [(21, "wf", "running")]
+    deletes = [s for s in db.statements if "DELETE" in s]
+    assert all("LIMIT 4" in s for s in deletes)
+    assert "id > 5 " in deletes[2]  # second success batch (after 1, 2, 4, 5) starts above the last id
+    assert sum(s.startswith("VACUUM") for s in db.statements) == 2
+
+
+def test_policy_overrides(tmp_path):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(json.dumps({"default": {"success_days": 3}, "workflows": {"keep": {"error_days": 0}}}))
+    policy = n8n_prune.load_policy(str(policy_file), env={"N8N_PRUNE_ERROR_DAYS": "14"})
+    labels = [label for label, _ in n8n_prune.Pruner(policy, query=lambda sql: []).age_rules()]
+    assert labels == ["soft-deleted", "default success_days=3", "default error_days=14", "keep success_days=3"]
+
+
+@pytest.mark.skipif(not (shutil.which("psql") and os.environ.get("PGHOST")),
+                    reason="needs psql and a scratch Postgres (PGHOST, PGUSER, PGPASSWORD, PGDATABASE)")
+def test_against_postgres():
+    schema = """
+        DROP TABLE IF EXISTS prunetest_execution_data, prunetest_execution_entity;
+        CREATE TABLE prunetest_execution_entity (id serial PRIMARY KEY, "workflowId" varchar, status varchar,
+            "stoppedAt" timestamptz, "deletedAt" timestamptz);
+        CREATE TABLE prunetest_execution_data ("executionId" int PRIMARY KEY
+            REFERENCES prunetest_execution_entity (id) ON DELETE CASCADE, data text, "workflowData" json);
+        INSERT INTO prunetest_execution_entity ("workflowId", status, "stoppedAt")
+            SELECT 'wf' || (i % 3), CASE WHEN i % 5 = 0 THEN 'error' ELSE 'success' END,
+                   now() - (i % 40) * interval '1 day' FROM generate_series(1, 5000) i;
+        INSERT INTO prunetest_execution_data SELECT id, repeat('x', 500), '{}' FROM prunetest_execution_entity;
+    """
+    subprocess.run(["psql", "-X", "-q", "-v", "ON_ERROR_STOP=1", "-c", schema], check=True)
+    policy = n8n_prune.load_policy(env={"N8N_PRUNE_MAX_ROWS": "200"})
+    report = n8n_prune.Pruner(policy, prefix="prunetest_", batch_size=250, pause=0).run()
+    remaining = n8n_prune.psql_rows(
+        "SELECT json_build_object('n', count(*), 'data', (SELECT count(*) FROM prunetest_execution_data)) "
+        "FROM prunetest_execution_entity")
+    counts = next(remaining)
+    list(remaining)
+    assert counts["n"] == counts["data"] == 5000 - report["rows"]
+    assert counts["n"] <= 3 * 200
+    assert report["data_bytes"] > 0
@@ -0,0 +1,54 @@
+"""Tests for the workflow performance linter."""
+
+import json
+
+import workflow_lint
+
+
+def _node(name, node_type, version=1, **params):
+    return {"id": f"id-{name}", "name": name, "type": f"n8n-nodes-base.{node_type}",
+            "typeVersion": version, "parameters": params}
+
+
+def _link(*targets, output=0):
+    outputs = [[] for _ in range(output + 1)]
+    outputs[output] = [{"node": target, "type": "main", "index": 0} for target in targets]
+    return {"main": outputs}
+
+
+def test_http_in_loop_body_only():
+    workflow = {
+        "nodes": [
+            _node("Start", "manualTrigger"),
+            _node("Loop", "splitInBatches", version=3),
+            _node("Fetch", "httpRequest", url="https://api.example.com/items"),
+            _node("Report", "httpRequest", url="https://hooks.example.com/done"),
+        ],
+        "connections": {
+            "Start": _link("Loop"),
+            "Loop": {"main": [[{"node": "Report", "type": "main", "index": 0}],
+                              [{"node": "Fetch", "type": "main", "index": 0}]]},
+            "Fetch": _link("Loop"),
+        },
+    }
+    findings = workflow_lint.lint_workflow(workflow)
+    assert [(f["rule"], f["node_id"]) for f in findings] == [("http-in-loop", "id-Fetch")]
+    assert "batch size 1" in findings[0]["message"]
+
+
+def test_sync_webhook_and_ranking(tmp_path):
+    workflow = {
+        "name": "hook",
+        "nodes": [
+            _node("Webhook", "webhook", responseMode="lastNode"),
+            _node("Call", "httpRequest", url="https://api.example.com/x"),
+            _node("Agent", "agent"),
+            _node("Memory", "memoryBufferWindow", contextWindowLength=40),
+        ],
+        "connections": {"Webhook": _link("Call"), "Call": _link("Agent")},
+    }
+    (tmp_path / "wf.json").write_text(json.dumps(workflow))
+    findings = workflow_lint.lint_paths([str(tmp_path)])
+    assert [f["rule"] for f in findings] == ["sync-webhook", "memory-window"]
+    assert findings[0]["severity"] == "high"
+    assert workflow_lint.lint_paths([str(tmp_path)], min_severity="high")[0]["node_id"] == "id-Webhook"
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+workflow_lint.py
+
+Static performance linter for n8n workflow exports. Parses each workflow,
+builds its connection graph and reports performance anti-patterns, ranked by
+score, with the offending node ids.
+
+Rules:
+    http-in-loop        HTTP Request inside a Loop Over Items (Split in Batches)
+                        body: one request per batch, worst with batch size 1 (N+1)
+    http-no-batching    HTTP Request fed by a Split Out / Item Lists fan-out without
+                        the request "batching" option: one unthrottled call per item
+    missing-pagination  URL or query uses page/offset/cursor parameters, but the
+                        node has no "pagination" option (one page per run or a
+                        hand-built pagination loop)
+    sync-webhook        Webhook answers only after a long chain or slow nodes (LLM,
+                        HTTP, sub-workflows) have run, holding the caller's connection
+    memory-window       Window Buffer Memory keeps many messages, so every agent
+                        call resends a large history
+    reembed-on-run      Vector store insert on a scheduled/webhook path with no
+                        filter or dedup node before it: documents are re-embedded
+                        on every run
+
+Usage:
+    python3 workflow_lint.py                      # n8n/backup/workflows and n8n-tool-workflows
+    python3 workflow_lint.py path/to/workflows --min-severity medium --json
+Exit code is 1 if any finding reaches --fail-on (default: never).
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import deque
+
+from common import iter_backup_files
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_PATHS = (
+    os.path.join(REPO_ROOT, "n8n", "backup", "workflows"),
+    os.path.join(REPO_ROOT, "n8n-tool-workflows"),
+)
+SEVERITY = {"low": 1, "medium": 2, "high": 3}
+LONG_CHAIN = 8           # nodes before a synchronous webhook response
+MEMORY_WINDOW_LIMIT = 30  # messages kept by Window Buffer Memory
+PAGINATION_RE = re.compile(r"\b(page|page_?size|per_?page|offset|cursor|next_?token|page_?token|start_?cursor)\b", re.I)
+
+FAN_OUT_TYPES = {"splitOut", "itemLists"}
+FILTER_TYPES = {"if", "filter", "removeDuplicates", "compareDatasets", "switch"}
+SLOW_TYPES = {
+    "httpRequest", "agent", "chainLlm", "chainSummarization", "chainRetrievalQa", "informationExtractor",
+    "textClassifier", "sentimentAnalysis", "openAi", "executeWorkflow", "wait",
+}
+TRIGGER_SOURCES = {"scheduleTrigger", "cron", "interval", "webhook"}
+
+
+def short_type(node):
+    return node.get("type", "").rsplit(".", 1)[-1]
+
+
+class Graph:
+    """Main-connection graph of one workflow; nodes are addressed by name."""
+
+    def __init__(self, workflow):
+        self.nodes = {node["name"]: node for node in workflow.get("nodes", []) if node.get("name")}
+        self.edges = {name: [] for name in self.nodes}    # name -> [(output index, target)]
+        self.parents = {name: [] for name in self.nodes}
+        for source, outputs in (workflow.get("connections") or {}).items():
+            if source not in self.nodes:
+                continue
+            for index, targets in enumerate((outputs or {}).get("main") or []):
+                for target in targets or []:
+                    name = target.get("node")
+                    if name in self.nodes:
+                        self.edges[source].append((index, name))
+                        self.parents[name].append(source)
+
+    def reachable(self, starts, forward=True):
+        seen, queue = set(), deque(starts)
+        while queue:
+            name = queue.popleft()
+            if name in seen:
+                continue
+            seen.add(name)
+            queue.extend([target for _, target in self.edges[name]] if forward else self.parents[name])
+        return seen
+
+    def loop_body(self, name):
+        """Nodes executed per batch of a Split in Batches node (those leading back to it)."""
+        node = self.nodes[name]
+        # v3+: output 0 is "done", output 1 is "loop"; older versions loop on output 0
+        loop_output = 1 if node.get("typeVersion", 1) >= 3 else 0
+        starts = [target for index, target in self.edges[name] if index == loop_output]
+        body = self.reachable(starts) & self.reachable(self.parents[name], forward=False)
+        body.discard(name)
+        return body
+
+
+def batch_size(node):
+    """Effective batch size of a Split in Batches node (n8n defaults: 10 before v3, 1 from v3)."""
+    default = 1 if node.get("typeVersion", 1) >= 3 else 10
+    value = (node.get("parameters") or {}).get("batchSize", default)
+    try:
+        return int(str(value).lstrip("="))
+    except ValueError:
+        return None  # expression
+
+
+def _finding(rule, severity, node, message, weight=1.0):
+    return {
+        "rule": rule,
+        "severity": severity,
+        "score": round(SEVERITY[severity] * weight, 1),
+        "node_id": node.get("id") or node.get("name"),
+        "node": node.get("name"),
+        "message": message,
+    }
+
+
+def check_loops(graph):
+    findings = []
+    for name, node in graph.nodes.items():
+        if short_type(node) != "splitInBatches":
+            continue
+        size = batch_size(node)
+        body = graph.loop_body(name)
+        slow = [graph.nodes[n] for n in sorted(body) if short_type(graph.nodes[n]) == "httpRequest"]
+        for http in slow:
+            per = f"batch size {size}" if size is not None else "batch size from an expression"
+            weight = 2.0 if size == 1 else 1.5 if size and size < 10 else 1.0
+            findings.append(_finding(
+                "http-in-loop", "high", http,
+                f"HTTP request runs once per batch of '{name}' ({per}); "
+                f"send items in one request or use the request batching option",
+                weight,
+            ))
+    return findings
+
+
+def check_http(graph):
+    findings = []
+    for name, node in graph.nodes.items():
+        if short_type(node) != "httpRequest":
+            continue
+        params = node.get("parameters") or {}
+        options = params.get("options") or {}
+        fan_out = [p for p in graph.parents[name] if short_type(graph.nodes[p]) in FAN_OUT_TYPES]
+        if fan_out and "batching" not in options:
+            findings.append(_finding(
+                "http-no-batching", "medium", node,
+                f"one request per item split by '{fan_out[0]}' with no batching/throttling option",
+            ))
+        query = json.dumps([params.get("url", ""), params.get("queryParameters", {}), params.get("jsonQuery", "")])
+        if PAGINATION_RE.search(query) and "pagination" not in options:
+            looped = name in graph.reachable([t for _, t in graph.edges[name]])
+            findings.append(_finding(
+                "missing-pagination", "medium" if looped else "low", node,
+                "paged API without the pagination option"
+                + (" (hand-built pagination loop)" if looped else "; only one page is fetched per call"),
+            ))
+    return findings
+
+
+def check_webhooks(graph):
+    findings = []
+    for name, node in graph.nodes.items():
+        if short_type(node) != "webhook":
+            continue
+        mode = (node.get("parameters") or {}).get("responseMode", "onReceived")
+        downstream = graph.reachable([t for _, t in graph.edges[name]])
+        if mode == "lastNode":
+            chain = downstream
+        elif mode == "responseNode":
+            responders = [n for n in downstream if short_type(graph.nodes[n]) == "respondToWebhook"]
+            chain = downstream & graph.reachable(responders, forward=False) - set(responders)
+        else:
+            continue
+        slow = sorted(n for n in chain if short_type(graph.nodes[n]) in SLOW_TYPES)
+        if len(chain) >= LONG_CHAIN or slow:
+            findings.append(_finding(
+                "sync-webhook", "high" if len(slow) > 1 else "medium", node,
+                f"responds after {len(chain)} nodes ({len(slow)} slow: {', '.join(slow[:3]) or '-'}); "
+                "respond immediately or move the work to a sub-workflow",
+                1.0 + 0.1 * min(len(chain), 20),
+            ))
+    return findings
+
+
+def check_memory(graph):
+    findings = []
+    for node in graph.nodes.values():
+        if short_type(node) != "memoryBufferWindow":
+            continue
+        length = (node.get("parameters") or {}).get("contextWindowLength")
+        if isinstance(length, (int, float)) and length >= MEMORY_WINDOW_LIMIT:
+            findings.append(_finding(
+                "memory-window", "medium", node,
+                f"keeps {int(length)} messages; every model call resends the whole window",
+                min(length / MEMORY_WINDOW_LIMIT, 3.0),
+            ))
+    return findings
+
+
+def check_embeddings(graph):
+    findings = []
+    for name, node in graph.nodes.items():
+        if not short_type(node).startswith("vectorStore") or (node.get("parameters") or {}).get("mode") != "insert":
+            continue
+        upstream = graph.reachable(graph.parents[name], forward=False)
+        triggers = [n for n in upstream if short_type(graph.nodes[n]) in TRIGGER_SOURCES]
+        if triggers and not any(short_type(graph.nodes[n]) in FILTER_TYPES for n in upstream):
+            findings.append(_finding(
+                "reembed-on-run", "medium", node,
+                f"every '{triggers[0]}' run embeds and inserts all documents again; "
+                "filter unchanged documents first",
+            ))
+    return findings
+
+
+CHECKS = (check_loops, check_http, check_webhooks, check_memory, check_embeddings)
+
+
+def lint_workflow(workflow):
+    graph = Graph(workflow)
+    return [finding for check in CHECKS for finding in check(graph)]
+
+
+def iter_workflow_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from (p for _, p in iter_backup_files(path))
+        elif os.path.isfile(path):
+            yield path
+
+
+def lint_paths(paths, min_severity="low"):
+    """Findings for every workflow file under paths, highest score first."""
+    results = []
+    for path in iter_workflow_files(paths):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"SKIPPED {path}: {e}", file=sys.stderr)
+            continue
+        for workflow in data if isinstance(data, list) else [data]:
+            if not isinstance(workflow, dict) or not isinstance(workflow.get("nodes"), list):
+                continue
+            for finding in lint_workflow(workflow):
+                if SEVERITY[finding["severity"]] >= SEVERITY[min_severity]:
+                    results.append({"file": os.path.relpath(path), "workflow": workflow.get("name", ""), **finding})
+    results.sort(key=lambda f: (-f["score"], f["file"], f["node"] or ""))
+    return results
+
+
+def print_report(findings):
+    for f in findings:
+        print(f"{f['score']:>4} {f['severity']:<6} {f['rule']:<18} {f['file']} :: {f['node']} [{f['node_id']}]")
+        print(f"     {f['workflow']}: {f['message']}")
+    by_rule = {}
+    for f in findings:
+        by_rule[f["rule"]] = by_rule.get(f["rule"], 0) + 1
+    print(f"{len(findings)} findings: " + (", ".join(f"{rule} {n}" for rule, n in sorted(by_rule.items())) or "none"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report performance anti-patterns in n8n workflow JSON.")
+    parser.add_argument("paths", nargs="*", default=list(DEFAULT_PATHS), help="workflow files or directories")
+    parser.add_argument("--min-severity", choices=SEVERITY, default="low")
+    parser.add_argument("--fail-on", choices=SEVERITY, help="exit with code 1 if a finding has this severity or higher")
+    parser.add_argument("--json", action="store_true", help="print findings as JSON")
+    args = parser.parse_args(argv)
+
+    findings = lint_paths(args.paths, args.min_severity)
+    if args.json:
+        print(json.dumps(findings, indent=2, ensure_ascii=False))
+    else:
+        print_report(findings)
+    if args.fail_on and any(SEVERITY[f["severity"]] >= SEVERITY[args.fail_on] for f in findings):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -92,8 +92,22 @@ if [[ "$COMPOSE_PROFILES" == *"vpn"* ]]; then
   log_success "VPN pre-flight checks passed"
 fi
 
+# ----------------------------------------------------------------
+# n8n-export writes into the ./n8n/backup/workflows bind mount as the n8n image's
+# "node" user (uid 1000); the clone is usually owned by root after a sudo install
+# ----------------------------------------------------------------
+if [[ "$COMPOSE_PROFILES" == *"n8n-export"* ]]; then
+  mkdir -p "n8n/backup/workflows"
+  if chown -R 1000:1000 "n8n/backup/workflows" 2>/dev/null; then
+    log_success "n8n/backup/workflows is writable for n8n-export (uid 1000)"
+  else
+    log_warning "Could not chown n8n/backup/workflows to uid 1000; n8n-export will fail until you run:"
+    log_warning "  sudo chown -R 1000:1000 n8n/backup/workflows"
+  fi
+fi
+
 log_info "Launching services using start_services.py..."
 # Execute start_services.py
-./start_services.py
+./start_services.py "$@"
 
 exit 0 
\ No newline at end of file
@@ -80,7 +80,7 @@ $COMPOSE_CMD -p "localai" "${COMPOSE_FILES_FOR_PULL[@]}" pull --ignore-buildable
 
 # Start services using the 06_run_services.sh script
 log_info "Running Services..."
-bash "$RUN_SERVICES_SCRIPT" || { log_error "Failed to start services. Check logs for details."; exit 1; }
+bash "$RUN_SERVICES_SCRIPT" "$@" || { log_error "Failed to start services. Check logs for details."; exit 1; }
 
 log_success "Update application completed successfully!"
 
@@ -53,7 +53,7 @@ fi
 
 
 # Execute the rest of the update process using the (potentially updated) apply_update.sh
-bash "$APPLY_UPDATE_SCRIPT"
+bash "$APPLY_UPDATE_SCRIPT" "$@"
 
 # The final success message will now come from apply_update.sh
 log_info "Update script finished." # Changed final message
@@ -5,11 +5,18 @@ start_services.py
 This script starts the Supabase stack first, waits for it to initialize, and then starts
 the local AI stack. Both stacks use the same Docker Compose project name ("localai")
 so they appear together in Docker Desktop.
+
+With --rolling, running containers are not torn down: images are pulled and built
+first, other services are updated in place, n8n workers are replaced one at a time
+(a new worker starts before the old one drains its active jobs on SIGTERM), and the
+main n8n container is swapped while Caddy holds incoming requests (lb_try_duration).
+The n8n-autoscaler is paused for the roll and the workflow import runs after it.
 """
 
 import os
 import subprocess
 import shutil
+import re
 import time
 import argparse
 import platform
@@ -229,6 +236,129 @@ def start_local_ai():
     up_cmd = ["docker", "compose", "-p", "localai", "-f", "docker-compose.yml", "up", "-d"]
     run_command(up_cmd)
 
+# --- Rolling update (n8n main and workers) ---
+
+N8N_SERVICES = ("n8n", "n8n-worker", "n8n-import")
+# Seconds a worker/main gets to finish active executions on SIGTERM
+DRAIN_TIMEOUT = int(os.environ.get("N8N_GRACEFUL_SHUTDOWN_TIMEOUT") or dotenv_values(".env").get("N8N_GRACEFUL_SHUTDOWN_TIMEOUT") or 300)
+# Seconds reserved for the new main container to start answering /healthz
+MAIN_STARTUP_TIMEOUT = 30
+
+def parse_duration(text, default):
+    """Seconds in a Caddy duration such as '60s', '2m' or '1m30s' (default if it can't be parsed)."""
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", text or "")
+    if not parts or "".join(number + unit for number, unit in parts) != text.strip():
+        return default
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+# How long Caddy holds n8n requests (lb_try_duration); the main swap must fit into it
+PROXY_HOLD = parse_duration(os.environ.get("N8N_PROXY_HOLD") or dotenv_values(".env").get("N8N_PROXY_HOLD"), 60)
+# In queue mode main only receives requests and enqueues executions, so its drain is capped
+# so that stopping the old main plus starting the new one stays within the Caddy hold
+MAIN_STOP_TIMEOUT = max(1, min(DRAIN_TIMEOUT, int(PROXY_HOLD) - MAIN_STARTUP_TIMEOUT))
+
+def compose_cmd(*args):
+    """docker compose command for the main compose file of the 'localai' project."""
+    return ["docker", "compose", "-p", "localai", "-f", "docker-compose.yml", *args]
+
+def capture(cmd):
+    """Run a command and return its stdout (empty string on failure)."""
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+def service_containers(service):
+    """IDs of running containers of a compose service, oldest first."""
+    ids = capture([
+        "docker", "ps", "-q", "--filter", "label=com.docker.compose.project=localai",
+        "--filter", f"label=com.docker.compose.service={service}",
+    ]).split()
+    return list(reversed(ids))  # docker ps lists newest first
+
+def is_outdated(container, service):
+    """True if the container runs another image or service config than compose currently has for the service."""
+    image = capture(compose_cmd("config", "--images", service)).splitlines()
+    wanted = capture(["docker", "image", "inspect", "-f", "{{.Id}}", image[0]]) if image else ""
+    if not wanted or capture(["docker", "inspect", "-f", "{{.Image}}", container]) != wanted:
+        return True
+    # Same label compose compares on "up": environment, stop_grace_period etc. changed without a new image
+    config_hash = capture(compose_cmd("config", "--hash", service)).split()
+    label = capture(["docker", "inspect", "-f", '{{index .Config.Labels "com.docker.compose.config-hash"}}', container])
+    return not config_hash or config_hash[-1] != label
+
+def wait_for_http(container, port, timeout=180):
+    """Wait until n8n in the container answers /healthz."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if subprocess.run(
+            ["docker", "exec", container, "wget", "-q", "-O", "/dev/null", f"http://localhost:{port}/healthz"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ).returncode == 0:
+            return True
+        time.sleep(2)
+    print(f"Warning: {container[:12]} did not become healthy within {timeout}s")
+    return False
+
+def roll_workers():
+    """Replace outdated n8n-worker containers one at a time without losing queue capacity."""
+    old = [c for c in service_containers("n8n-worker") if is_outdated(c, "n8n-worker")]
+    if not old:
+        print("n8n workers are up to date.")
+        run_command(compose_cmd("up", "-d", "--no-deps", "--no-recreate", "n8n-worker"))
+        return
+    for number, container in enumerate(old, 1):
+        current = service_containers("n8n-worker")
+        # Surge: start one new worker before draining an old one
+        run_command(compose_cmd(
+            "up", "-d", "--no-deps", "--no-recreate", "--scale", f"n8n-worker={len(current) + 1}", "n8n-worker"
+        ))
+        for new in [c for c in service_containers("n8n-worker") if c not in current]:
+            wait_for_http(new, 5678)
+        print(f"Draining n8n worker {number}/{len(old)} ({container[:12]}), up to {DRAIN_TIMEOUT}s...")
+        run_command(["docker", "stop", "-t", str(DRAIN_TIMEOUT), container])
+        run_command(["docker", "rm", container])
+
+def roll_main():
+    """Swap the main n8n container while Caddy holds incoming requests, then run the workflow import."""
+    # Load the current Caddyfile (lb_try_duration) without dropping connections
+    subprocess.run(["docker", "exec", "caddy", "caddy", "reload", "--config", "/etc/caddy/Caddyfile"])
+    running = service_containers("n8n")
+    if running and not is_outdated(running[0], "n8n"):
+        print("n8n main is up to date.")
+    else:
+        print(f"Swapping n8n main container (stop up to {MAIN_STOP_TIMEOUT}s, start up to {MAIN_STARTUP_TIMEOUT}s); "
+              f"Caddy holds requests for {PROXY_HOLD:g}s...")
+        run_command(compose_cmd("up", "-d", "--no-deps", "--timeout", str(MAIN_STOP_TIMEOUT), "n8n"))
+        wait_for_http("n8n", 5678, timeout=max(MAIN_STARTUP_TIMEOUT, int(PROXY_HOLD) - MAIN_STOP_TIMEOUT))
+    # Incremental import (manifest-based, usually nothing to do) only once every container runs the new version
+    run_command(compose_cmd("up", "--no-deps", "n8n-import"))
+
+def pause_autoscaler():
+    """Stop the n8n-autoscaler so it does not change n8n-worker replicas mid-roll; True if it was running."""
+    if not service_containers("n8n-autoscaler"):
+        return False
+    run_command(["docker", "stop", "n8n-autoscaler"])
+    return True
+
+def rolling_update_local_ai():
+    """Update the local AI stack in place, rolling n8n main and workers."""
+    print("Pulling and building images before replacing containers...")
+    run_command(compose_cmd("pull", "--ignore-buildable", "--quiet"))
+    run_command(compose_cmd("build", "--pull"))
+
+    others = [s for s in capture(compose_cmd("config", "--services")).split() if s not in N8N_SERVICES]
+    if others:
+        print("Updating other services in place...")
+        run_command(compose_cmd("up", "-d", *others))
+
+    autoscaler = pause_autoscaler()
+    try:
+        roll_workers()
+        roll_main()
+    finally:
+        if autoscaler:
+            run_command(["docker", "start", "n8n-autoscaler"])
+
 def generate_searxng_secret_key():
     """Generate a secret key for SearXNG based on the current platform."""
     print("Checking SearXNG settings...")
@@ -371,6 +501,11 @@ def check_and_fix_docker_compose_for_searxng():
         print(f"Error checking/modifying docker-compose.yml for SearXNG: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Start the local AI stack.")
+    parser.add_argument("--rolling", action="store_true",
+                        help="update running services in place, rolling n8n main and workers without downtime")
+    args = parser.parse_args()
+
     # Clone and prepare repositories
     if is_supabase_enabled():
         clone_supabase_repo()
@@ -384,6 +519,12 @@ def main():
     generate_searxng_secret_key()
     check_and_fix_docker_compose_for_searxng()
     
+    if args.rolling and service_containers("n8n"):
+        start_supabase()
+        start_dify()
+        rolling_update_local_ai()
+        return
+
     stop_existing_containers()
     
     # Start Supabase first
@@ -4,10 +4,14 @@ from .wireguard_api_adapter import WireGuardAPIAdapter
 from .telegram_bot_adapter import TelegramBotAdapter
 from .qr_code_adapter import QRCodeAdapter
 from .stdout_adapter import StdoutAdapter
+from .queue_log_adapter import QueueLogAdapter
+from .acl_adapter import ACLAdapter
 
 __all__ = [
     'WireGuardAPIAdapter',
     'TelegramBotAdapter',
     'QRCodeAdapter',
     'StdoutAdapter',
+    'QueueLogAdapter',
+    'ACLAdapter',
 ]
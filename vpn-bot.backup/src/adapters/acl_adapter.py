@@ -0,0 +1,204 @@
+"""
+Role-based access control adapter with hot reload.
+
+The role names (admin/user) and the "vpn:*" permissions differ from the
+main vpn-bot (admin/operator/viewer over config/create/...) on purpose:
+this bot only has /request, /revoke and /status, and its roles mirror the
+BOT_ADMINS / BOT_WHITELIST lists it has always used. An ACL file written
+for one bot is not meant to be shared with the other.
+"""
+
+import os
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Mapping, Optional
+from ..interfaces import IAccessControl
+
+ALL = "*"
+
+# Built-in roles; an ACL file may extend or override them
+DEFAULT_ROLES = {
+    "admin": [ALL],
+    "user": ["vpn:request", "vpn:status"],
+}
+
+
+@dataclass(frozen=True)
+class CompiledACL:
+    """Grants compiled into hashed sets: 'perm' or 'perm@server'."""
+    grants: dict = field(default_factory=dict)   # user_id -> frozenset
+    anywhere: dict = field(default_factory=dict)  # user_id -> frozenset
+    public: frozenset = frozenset()
+    public_anywhere: frozenset = frozenset()
+    warnings: tuple = ()
+
+
+def _split_ids(value: str) -> list[int]:
+    return [int(uid.strip()) for uid in value.split(",") if uid.strip()]
+
+
+def compile_acl(
+    whitelist: str = "", admins: str = "", document: Optional[dict] = None
+) -> CompiledACL:
+    """
+    Compile env lists and an optional ACL document.
+
+    Document format (JSON)::
+
+        {
+          "roles": {"operator": ["vpn:request", "vpn:status"]},
+          "users": {
+            "111": ["admin"],
+            "222": {"roles": ["operator"], "servers": ["vpn"]}
+          },
+          "public": ["vpn:status"]
+        }
+
+    Users with ``servers`` get their permissions only on those servers.
+    A single role may be given as a string (``"111": "admin"``); unknown
+    role names grant nothing and are reported in ``warnings``.
+    Without a document, BOT_ADMINS are admins, BOT_WHITELIST are users and
+    an empty whitelist makes the user role public (open access mode).
+    """
+    document = document or {}
+    roles = {**DEFAULT_ROLES, **document.get("roles", {})}
+    assignments: dict[int, set] = {}
+    warnings = []
+
+    def grant(user_id: int, role_names, servers):
+        if isinstance(role_names, str):
+            role_names = [role_names]
+        if isinstance(servers, str):
+            servers = [servers]
+        unknown = [name for name in role_names if name not in roles]
+        if unknown:
+            warnings.append(f"user {user_id} has unknown roles {unknown}")
+        perms = {perm for name in role_names for perm in roles.get(name, [])}
+        target = assignments.setdefault(user_id, set())
+        if servers:
+            target.update(f"{perm}@{srv}" for perm in perms for srv in servers)
+        else:
+            target.update(perms)
+
+    for user_id in _split_ids(admins):
+        grant(user_id, ["admin"], None)
+    for user_id in _split_ids(whitelist):
+        grant(user_id, ["user"], None)
+
+    for raw_id, spec in document.get("users", {}).items():
+        if isinstance(spec, dict):
+            grant(int(raw_id), spec.get("roles", []), spec.get("servers"))
+        else:
+            grant(int(raw_id), spec, None)
+
+    if "public" in document:
+        public = set(document["public"])
+    elif not whitelist.strip() and not document.get("users"):
+        public = set(roles["user"])
+    else:
+        public = set()
+
+    def strip(perms) -> frozenset:
+        return frozenset(perm.split("@", 1)[0] for perm in perms)
+
+    return CompiledACL(
+        grants={uid: frozenset(p) for uid, p in assignments.items()},
+        anywhere={uid: strip(p) for uid, p in assignments.items()},
+        public=frozenset(public),
+        public_anywhere=strip(public),
+        warnings=tuple(warnings),
+    )
+
+
+class ACLAdapter:
+    """
+    Adapter for role-based permission checks.
+
+    Checks are set lookups against a compiled snapshot. The snapshot is
+    rebuilt only when BOT_WHITELIST/BOT_ADMINS change or the ACL file's
+    mtime changes (polled at most every ``reload_interval`` seconds).
+    A broken file keeps the previous snapshot.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        env: Optional[Mapping[str, str]] = None,
+        reload_interval: float = 1.0,
+        logger=None
+    ):
+        self.path = path or None
+        self.env = env if env is not None else os.environ
+        self.reload_interval = reload_interval
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._source = None
+        self._next_stat = 0.0
+        self._mtime = None
+        self._document: Optional[dict] = None
+        self._acl = CompiledACL()
+        self._refresh(force=True)
+
+    def _log(self, level: str, message: str, *args: object) -> None:
+        if self.logger:
+            self.logger.log(level, message, *args)
+
+    def _read_file(self) -> None:
+        """Reload the document if the file changed (throttled)."""
+        now = time.monotonic()
+        if not self.path or now < self._next_stat:
+            return
+        self._next_stat = now + self.reload_interval
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        if mtime is None:
+            self._document = None
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._document = json.load(f)
+            self._log("info", "ACL reloaded from %s", self.path)
+        except (OSError, ValueError) as e:
+            self._log("error", "ACL file %s ignored: %s", self.path, e)
+
+    def _refresh(self, force: bool = False) -> None:
+        document = self._document
+        self._read_file()
+        source = (
+            self.env.get("BOT_WHITELIST", ""),
+            self.env.get("BOT_ADMINS", ""),
+            self._mtime,
+        )
+        if not force and source == self._source and document is self._document:
+            return
+        with self._lock:
+            try:
+                self._acl = compile_acl(source[0], source[1], self._document)
+                self._source = source
+                for warning in self._acl.warnings:
+                    self._log("warn", "ACL: %s", warning)
+            except (TypeError, ValueError, AttributeError) as e:
+                self._log("error", "ACL not compiled: %s", e)
+
+    def is_allowed(
+        self, user_id: int, permission: str, server: Optional[str] = None
+    ) -> bool:
+        """Check if user holds permission (optionally on one server)."""
+        self._refresh()
+        acl = self._acl
+        if server is None:
+            held = acl.anywhere.get(user_id, frozenset())
+            return bool(
+                {permission, ALL} & held
+                or {permission, ALL} & acl.public_anywhere
+            )
+        held = acl.grants.get(user_id, frozenset())
+        keys = {permission, ALL, f"{permission}@{server}", f"{ALL}@{server}"}
+        return bool(keys & held or keys & acl.public)
@@ -0,0 +1,143 @@
+"""Non-blocking queue-based JSON log adapter."""
+
+import sys
+import json
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, TextIO
+from ..interfaces import ILogSink
+
+LEVELS = {"debug": 10, "info": 20, "warn": 30, "warning": 30, "error": 40}
+_STOP = object()
+
+
+class QueueLogAdapter:
+    """
+    Adapter that enqueues log records for a background writer thread.
+
+    ``log()`` only filters, samples and enqueues: the %-template is applied
+    and the JSON line serialized in the writer, which flushes in batches.
+    When the queue is full the record is dropped and counted; the writer
+    reports drops as a separate record.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        min_level: str = "info",
+        sample_rates: Optional[dict] = None,
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5
+    ):
+        self.stream = stream or sys.stdout
+        self.min_level = LEVELS.get(min_level.lower(), 20)
+        self.sample_rates = {
+            level.lower(): rate for level, rate in (sample_rates or {}).items()
+        }
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.sampled_out = 0
+        self.written = 0
+        self._reported_drops = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def log(self, level: str, message: str, *args: object) -> None:
+        """Enqueue log entry; never blocks the caller."""
+        level = level.lower()
+        if LEVELS.get(level, 20) < self.min_level:
+            return
+
+        rate = self.sample_rates.get(level, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.sampled_out += 1
+            return
+
+        try:
+            self._queue.put_nowait((time.time(), level, message, args))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush pending records and stop the writer."""
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _format(self, record: tuple) -> str:
+        created, level, message, args = record
+        try:
+            text = message % args if args else str(message)
+        except (TypeError, ValueError):
+            text = f"{message} {args!r}"
+        return json.dumps({
+            "ts": datetime.fromtimestamp(created, timezone.utc).isoformat(),
+            "level": level,
+            "msg": text,
+        }, ensure_ascii=False)
+
+    def _drop_report(self) -> Optional[str]:
+        dropped = self.dropped
+        if dropped == self._reported_drops:
+            return None
+        lost = dropped - self._reported_drops
+        self._reported_drops = dropped
+        return json.dumps({
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "level": "warn",
+            "msg": "log records dropped",
+            "dropped": lost,
+            "dropped_total": dropped,
+        })
+
+    def _write(self, batch: list) -> None:
+        lines = [self._format(record) for record in batch]
+        report = self._drop_report()
+        if report:
+            lines.append(report)
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+            self.written += len(batch)
+        except (OSError, ValueError):
+            pass
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            if stopping:
+                # Drain whatever is still queued before exiting
+                while True:
+                    try:
+                        record = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if record is not _STOP:
+                        batch.append(record)
+            self._write(batch)
@@ -7,7 +7,8 @@ from ..interfaces import ILogSink
 class StdoutAdapter:
     """Adapter for stdout logging."""
 
-    def log(self, level: str, message: str) -> None:
+    def log(self, level: str, message: str, *args: object) -> None:
         """Write log entry to stdout."""
         timestamp = datetime.now().isoformat()
-        print(f"[{timestamp}] {level.upper()}: {message}")
+        text = message % args if args else message
+        print(f"[{timestamp}] {level.upper()}: {text}")
@@ -1,18 +1,33 @@
 """WireGuard API adapter (wg-easy HTTP API)."""
 
 import sys
+import asyncio
+import threading
 import requests
-from typing import Optional
-from ..interfaces import IVPNProvider, Client
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Optional
+from ..interfaces import IVPNProvider, Client, BatchResult
 
 
 class WireGuardAPIAdapter:
-    """Adapter for wg-easy HTTP API."""
+    """
+    Adapter for wg-easy HTTP API.
 
-    def __init__(self, base_url: str, password: str):
+    Sync methods implement IVPNProvider. Async batch methods
+    (IAsyncVPNProvider) run requests in worker threads over one pooled
+    HTTP session, at most ``max_concurrency`` in flight.
+    """
+
+    def __init__(
+        self, base_url: str, password: str, max_concurrency: int = 8
+    ):
         self.base_url = base_url.rstrip('/')
         self.password = password
         self.session_token: Optional[str] = None
+        self.max_concurrency = max(1, max_concurrency)
+        self._http: Optional[requests.Session] = None
+        self._auth_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
 
     def _ensure_session(self) -> None:
         """Lazy session creation (early return pattern)."""
@@ -219,3 +234,164 @@ class WireGuardAPIAdapter:
         except Exception as e:
             print(f"ERROR: list clients failed: {e}", file=sys.stderr)
             return []
+
+    # --- Async batch API (IAsyncVPNProvider) ---
+
+    def _pool(self) -> requests.Session:
+        """Shared keep-alive session sized for max_concurrency."""
+        if self._http is None:
+            http = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=self.max_concurrency
+            )
+            http.mount("http://", adapter)
+            http.mount("https://", adapter)
+            self._http = http
+        return self._http
+
+    def _refresh_session(self, stale_token: Optional[str]) -> None:
+        """Re-login once for all threads that saw the same stale token."""
+        with self._auth_lock:
+            if self.session_token == stale_token:
+                self.session_token = None
+                self._ensure_session()
+
+    def _send(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Pooled request with one retry on expired session (sync)."""
+        with self._auth_lock:
+            self._ensure_session()
+        token = self.session_token
+        resp = self._pool().request(
+            method,
+            f"{self.base_url}{path}",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=10,
+            **kwargs
+        )
+        if resp.status_code == 401:
+            self._refresh_session(token)
+            resp = self._pool().request(
+                method,
+                f"{self.base_url}{path}",
+                headers={"Authorization": f"Bearer {self.session_token}"},
+                timeout=10,
+                **kwargs
+            )
+        return resp
+
+    async def _request(
+        self, method: str, path: str, **kwargs
+    ) -> requests.Response:
+        """Run one request in a worker thread under the concurrency cap."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await asyncio.to_thread(self._send, method, path, **kwargs)
+
+    async def _config_async(self, client_id: str) -> str:
+        resp = await self._request(
+            "GET", f"/api/wireguard/client/{client_id}/configuration"
+        )
+        return resp.text if resp.status_code == 200 else ""
+
+    async def _create_one(self, name: str) -> BatchResult:
+        if not name:
+            return BatchResult(name, False, error="name required")
+        try:
+            resp = await self._request(
+                "POST", "/api/wireguard/client", json={"name": name}
+            )
+            if resp.status_code != 201:
+                return BatchResult(
+                    name, False, error=f"create failed: {resp.status_code}"
+                )
+            data = resp.json()
+            config = await self._config_async(data["id"])
+            return BatchResult(
+                name, True, client=self._client_from_data(data, config)
+            )
+        except Exception as e:
+            return BatchResult(name, False, error=str(e))
+
+    async def _delete_one(self, client_id: str) -> BatchResult:
+        if not client_id:
+            return BatchResult(client_id, False, error="client_id required")
+        try:
+            resp = await self._request(
+                "DELETE", f"/api/wireguard/client/{client_id}"
+            )
+            if resp.status_code not in (204, 200):
+                return BatchResult(
+                    client_id, False,
+                    error=f"delete failed: {resp.status_code}"
+                )
+            return BatchResult(client_id, True)
+        except Exception as e:
+            return BatchResult(client_id, False, error=str(e))
+
+    async def _set_enabled_one(
+        self, client_id: str, enabled: bool
+    ) -> BatchResult:
+        action = "enable" if enabled else "disable"
+        try:
+            resp = await self._request(
+                "POST", f"/api/wireguard/client/{client_id}/{action}"
+            )
+            if resp.status_code not in (204, 200):
+                return BatchResult(
+                    client_id, False,
+                    error=f"{action} failed: {resp.status_code}"
+                )
+            return BatchResult(client_id, True)
+        except Exception as e:
+            return BatchResult(client_id, False, error=str(e))
+
+    async def create_clients(self, names: list[str]) -> list[BatchResult]:
+        """Create clients concurrently; results keep input order."""
+        return list(await asyncio.gather(
+            *(self._create_one(name) for name in names)
+        ))
+
+    async def delete_clients(
+        self, client_ids: list[str]
+    ) -> list[BatchResult]:
+        """Delete clients concurrently; results keep input order."""
+        return list(await asyncio.gather(
+            *(self._delete_one(client_id) for client_id in client_ids)
+        ))
+
+    async def set_enabled(
+        self, client_ids: list[str], enabled: bool
+    ) -> list[BatchResult]:
+        """Enable or disable clients concurrently."""
+        return list(await asyncio.gather(
+            *(self._set_enabled_one(cid, enabled) for cid in client_ids)
+        ))
+
+    async def iter_clients(
+        self, page_size: int = 100, include_config: bool = False
+    ) -> AsyncIterator[list[Client]]:
+        """
+        Yield clients page by page.
+
+        wg-easy returns the whole list in one response; pages bound how
+        many configs are fetched (concurrently) before the caller sees
+        results, so configs are only loaded when asked for.
+        """
+        resp = await self._request("GET", "/api/wireguard/client")
+        if resp.status_code != 200:
+            print(f"ERROR: list failed: {resp.status_code}", file=sys.stderr)
+            return
+        data = resp.json()
+        page_size = max(1, page_size)
+        for start in range(0, len(data), page_size):
+            page = data[start:start + page_size]
+            configs = [""] * len(page)
+            if include_config:
+                configs = await asyncio.gather(
+                    *(self._config_async(c["id"]) for c in page)
+                )
+            yield [
+                self._client_from_data(c, config)
+                for c, config in zip(page, configs)
+            ]
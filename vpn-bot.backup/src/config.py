@@ -1,6 +1,23 @@
 """Configuration management."""
 
 import os
+import sys
+
+
+def _parse_sample_rates(value: str) -> dict:
+    """Parse "level=share,..."; malformed items are skipped with a warning."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        level, _, rate = item.partition("=")
+        try:
+            share = float(rate)
+        except ValueError:
+            share = None
+        if not level.strip() or share is None or share != share:
+            print(f"WARNING: LOG_SAMPLE: skipping '{item}' (expected level=share)", file=sys.stderr)
+            continue
+        rates[level.strip().lower()] = min(1.0, max(0.0, share))
+    return rates
 
 
 # Bot Configuration
@@ -12,6 +29,18 @@ BOT_ADMINS = os.getenv("BOT_ADMINS", "")
 WG_EASY_HOST = os.getenv("WG_EASY_HOST", "wg-easy")
 WG_EASY_PORT = os.getenv("WG_EASY_PORT", "51821")
 WG_PASSWORD = os.getenv("WG_PASSWORD", "")
+# Max concurrent wg-easy requests for batch operations
+WG_MAX_CONCURRENCY = int(os.getenv("WG_MAX_CONCURRENCY", "8"))
+
+# Access Control (optional JSON file, hot-reloaded on change)
+ACL_FILE = os.getenv("ACL_FILE", "")
+
+# Logging Configuration
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json (queued) | text
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Per-level sampling, e.g. "debug=0.1,info=0.5" (same variable as vpn-bot)
+LOG_SAMPLE = _parse_sample_rates(os.getenv("LOG_SAMPLE", ""))
 
 # Derived Configuration
 WG_EASY_URL = f"http://{WG_EASY_HOST}:{WG_EASY_PORT}"
@@ -1,16 +1,18 @@
 """Handler for /request command."""
 
-import os
 import sys
 import time
+from typing import Optional
 from telegram import Update
 from telegram.ext import ContextTypes
 from ..interfaces import (
     IVPNProvider,
     IMessagingProvider,
     IQRGenerator,
-    ILogSink
+    ILogSink,
+    IAccessControl
 )
+from ..adapters.acl_adapter import ACLAdapter
 
 
 class RequestHandler:
@@ -21,25 +23,18 @@ class RequestHandler:
         vpn: IVPNProvider,
         messaging: IMessagingProvider,
         qr: IQRGenerator,
-        logger: ILogSink
+        logger: ILogSink,
+        acl: Optional[IAccessControl] = None
     ):
         self.vpn = vpn
         self.messaging = messaging
         self.qr = qr
         self.logger = logger
+        self.acl = acl or ACLAdapter(logger=logger)
 
     def _is_authorized(self, user_id: int) -> bool:
-        """Check if user is authorized (whitelist)."""
-        whitelist_str = os.getenv("BOT_WHITELIST", "")
-        if not whitelist_str:
-            return True  # No whitelist = allow all
-
-        whitelist = [
-            int(uid.strip())
-            for uid in whitelist_str.split(",")
-            if uid.strip()
-        ]
-        return user_id in whitelist
+        """Check if user may request a config (empty whitelist = all)."""
+        return self.acl.is_allowed(user_id, "vpn:request")
 
     async def _send_success_messages(
         self, chat_id: int, client_name: str, config: str, qr_bytes: bytes
@@ -68,14 +63,14 @@ class RequestHandler:
 
         # Early validation (suckless pattern)
         if not self._is_authorized(user_id):
-            self.logger.log("warn", f"Unauthorized user {user_id}")
+            self.logger.log("warn", "Unauthorized user %s", user_id)
             await self.messaging.send_message(
                 chat_id,
                 "❌ У вас нет доступа. Обратитесь к администратору."
             )
             return
 
-        self.logger.log("info", f"User {user_id} requested VPN config")
+        self.logger.log("info", "User %s requested VPN config", user_id)
 
         try:
             client_name = f"{username}_{int(time.time())}"
@@ -85,10 +80,10 @@ class RequestHandler:
             await self._send_success_messages(
                 chat_id, client.name, client.configuration, qr_bytes
             )
-            self.logger.log("info", f"Client {client.name} created")
+            self.logger.log("info", "Client %s created", client.name)
 
         except Exception as e:
-            self.logger.log("error", f"Failed to create VPN client: {e}")
+            self.logger.log("error", "Failed to create VPN client: %s", e)
             print(f"ERROR: VPN client creation failed: {e}", file=sys.stderr)
             await self.messaging.send_message(
                 chat_id,
@@ -1,9 +1,15 @@
 """Handler for /revoke command."""
 
-import os
+from typing import Optional
 from telegram import Update
 from telegram.ext import ContextTypes
-from ..interfaces import IVPNProvider, IMessagingProvider, ILogSink
+from ..interfaces import (
+    IVPNProvider,
+    IMessagingProvider,
+    ILogSink,
+    IAccessControl
+)
+from ..adapters.acl_adapter import ACLAdapter
 
 
 class RevokeHandler:
@@ -13,24 +19,17 @@ class RevokeHandler:
         self,
         vpn: IVPNProvider,
         messaging: IMessagingProvider,
-        logger: ILogSink
+        logger: ILogSink,
+        acl: Optional[IAccessControl] = None
     ):
         self.vpn = vpn
         self.messaging = messaging
         self.logger = logger
+        self.acl = acl or ACLAdapter(logger=logger)
 
     def _is_admin(self, user_id: int) -> bool:
-        """Check if user is admin."""
-        admin_list_str = os.getenv("BOT_ADMINS", "")
-        if not admin_list_str:
-            return False
-
-        admins = [
-            int(uid.strip())
-            for uid in admin_list_str.split(",")
-            if uid.strip()
-        ]
-        return user_id in admins
+        """Check if user may revoke clients (admins only by default)."""
+        return self.acl.is_allowed(user_id, "vpn:revoke")
 
     def _validate_args(self, context) -> str:
         """Validate and extract client_id from args."""
@@ -38,6 +37,25 @@ class RevokeHandler:
             return ""
         return context.args[0]
 
+    async def _revoke_many(
+        self, chat_id: int, user_id: int, client_ids: list[str]
+    ) -> None:
+        """Delete several clients in one concurrent batch."""
+        results = await self.vpn.delete_clients(client_ids)
+        deleted = [r.key for r in results if r.ok]
+        failed = [r.key for r in results if not r.ok]
+        self.logger.log(
+            "info",
+            "Admin %s revoked %s of %s clients",
+            user_id,
+            len(deleted),
+            len(client_ids)
+        )
+        lines = [f"✅ Удалено: {len(deleted)} из {len(client_ids)}"]
+        if failed:
+            lines.append("❌ Не удалось: " + ", ".join(failed))
+        await self.messaging.send_message(chat_id, "\n".join(lines))
+
     async def handle(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
@@ -47,7 +65,7 @@ class RevokeHandler:
 
         # Early validation
         if not self._is_admin(user_id):
-            self.logger.log("warn", f"Non-admin {user_id} tried /revoke")
+            self.logger.log("warn", "Non-admin %s tried /revoke", user_id)
             await self.messaging.send_message(
                 chat_id,
                 "❌ Только администраторы могут отзывать доступ."
@@ -58,18 +76,26 @@ class RevokeHandler:
         if not client_id:
             await self.messaging.send_message(
                 chat_id,
-                "❌ Использование: /revoke <client_id>\n\n"
+                "❌ Использование: /revoke <client_id> [client_id ...]\n\n"
                 "Используй /status для списка клиентов."
             )
             return
 
         try:
+            # Several IDs go out as one batch when the provider supports it
+            client_ids = list(dict.fromkeys(context.args))
+            if len(client_ids) > 1 and hasattr(self.vpn, "delete_clients"):
+                await self._revoke_many(chat_id, user_id, client_ids)
+                return
+
             success = self.vpn.delete_client(client_id)
 
             if success:
                 self.logger.log(
                     "info",
-                    f"Admin {user_id} revoked client {client_id}"
+                    "Admin %s revoked client %s",
+                    user_id,
+                    client_id
                 )
                 await self.messaging.send_message(
                     chat_id,
@@ -82,5 +108,5 @@ class RevokeHandler:
                 )
 
         except Exception as e:
-            self.logger.log("error", f"Revoke failed: {e}")
+            self.logger.log("error", "Revoke failed: %s", e)
             await self.messaging.send_message(chat_id, f"❌ Ошибка: {e}")
@@ -19,7 +19,7 @@ class StartHandler:
         chat_id = update.effective_chat.id
         user_id = update.effective_user.id
 
-        self.logger.log("info", f"User {user_id} started bot")
+        self.logger.log("info", "User %s started bot", user_id)
 
         welcome_msg = (
             "🔐 VPN Bot для обхода гео-блокировок\n\n"
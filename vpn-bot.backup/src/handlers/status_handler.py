@@ -25,7 +25,7 @@ class StatusHandler:
         chat_id = update.effective_chat.id
         user_id = update.effective_user.id
 
-        self.logger.log("info", f"User {user_id} requested status")
+        self.logger.log("info", "User %s requested status", user_id)
 
         try:
             clients = self.vpn.list_clients()
@@ -50,7 +50,7 @@ class StatusHandler:
             await self.messaging.send_message(chat_id, status_msg)
 
         except Exception as e:
-            self.logger.log("error", f"Status check failed: {e}")
+            self.logger.log("error", "Status check failed: %s", e)
             await self.messaging.send_message(
                 chat_id,
                 f"❌ Ошибка получения статуса: {e}"
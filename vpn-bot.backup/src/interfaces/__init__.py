@@ -1,14 +1,23 @@
 """Interface definitions for VPN bot adapters."""
 
-from .i_vpn_provider import IVPNProvider, Client
+from .i_vpn_provider import (
+    IVPNProvider,
+    IAsyncVPNProvider,
+    Client,
+    BatchResult
+)
 from .i_messaging_provider import IMessagingProvider
 from .i_qr_generator import IQRGenerator
 from .i_log_sink import ILogSink
+from .i_access_control import IAccessControl
 
 __all__ = [
     'IVPNProvider',
+    'IAsyncVPNProvider',
     'Client',
+    'BatchResult',
     'IMessagingProvider',
     'IQRGenerator',
     'ILogSink',
+    'IAccessControl',
 ]
@@ -0,0 +1,13 @@
+"""Access control interface (adapter pattern)."""
+
+from typing import Optional, Protocol
+
+
+class IAccessControl(Protocol):
+    """Interface for permission checks."""
+
+    def is_allowed(
+        self, user_id: int, permission: str, server: Optional[str] = None
+    ) -> bool:
+        """Check if user holds permission (optionally on one server)."""
+        ...
@@ -6,6 +6,6 @@ from typing import Protocol
 class ILogSink(Protocol):
     """Interface for log output."""
 
-    def log(self, level: str, message: str) -> None:
-        """Write log entry."""
+    def log(self, level: str, message: str, *args: object) -> None:
+        """Write log entry (``message`` % ``args`` is applied lazily)."""
         ...
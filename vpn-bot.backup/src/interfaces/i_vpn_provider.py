@@ -1,7 +1,7 @@
 """VPN provider interface (adapter pattern)."""
 
 from dataclasses import dataclass
-from typing import Protocol
+from typing import AsyncIterator, Optional, Protocol
 
 
 @dataclass
@@ -15,6 +15,15 @@ class Client:
     enabled: bool = True
 
 
+@dataclass
+class BatchResult:
+    """Outcome of one item in a batch call (key is a name or client ID)."""
+    key: str
+    ok: bool
+    client: Optional[Client] = None
+    error: str = ""
+
+
 class IVPNProvider(Protocol):
     """Interface for VPN client management."""
 
@@ -33,3 +42,27 @@ class IVPNProvider(Protocol):
     def list_clients(self) -> list[Client]:
         """List all clients."""
         ...
+
+
+class IAsyncVPNProvider(IVPNProvider, Protocol):
+    """Async, batch-capable extension of IVPNProvider."""
+
+    async def create_clients(self, names: list[str]) -> list[BatchResult]:
+        """Create clients concurrently; results keep input order."""
+        ...
+
+    async def delete_clients(self, client_ids: list[str]) -> list[BatchResult]:
+        """Delete clients concurrently; results keep input order."""
+        ...
+
+    async def set_enabled(
+        self, client_ids: list[str], enabled: bool
+    ) -> list[BatchResult]:
+        """Enable or disable clients concurrently."""
+        ...
+
+    def iter_clients(
+        self, page_size: int = 100, include_config: bool = False
+    ) -> AsyncIterator[list[Client]]:
+        """Yield clients page by page, with configs only if requested."""
+        ...
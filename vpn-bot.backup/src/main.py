@@ -2,12 +2,24 @@
 
 import sys
 from telegram.ext import Application, CommandHandler
-from .config import BOT_TOKEN, WG_EASY_URL, WG_PASSWORD
+from .config import (
+    BOT_TOKEN,
+    WG_EASY_URL,
+    WG_PASSWORD,
+    WG_MAX_CONCURRENCY,
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLE,
+    ACL_FILE
+)
 from .adapters import (
     WireGuardAPIAdapter,
     TelegramBotAdapter,
     QRCodeAdapter,
-    StdoutAdapter
+    StdoutAdapter,
+    QueueLogAdapter,
+    ACLAdapter
 )
 from .handlers import COMMAND_HANDLERS
 
@@ -24,16 +36,25 @@ def main() -> None:
         sys.exit(1)
 
     # Mount adapters (Hurd settrans pattern)
-    logger = StdoutAdapter()
+    if LOG_FORMAT == "text":
+        logger = StdoutAdapter()
+    else:
+        logger = QueueLogAdapter(
+            min_level=LOG_LEVEL,
+            sample_rates=LOG_SAMPLE,
+            max_queue=LOG_QUEUE_SIZE
+        )
     vpn_provider = WireGuardAPIAdapter(
         base_url=WG_EASY_URL,
-        password=WG_PASSWORD
+        password=WG_PASSWORD,
+        max_concurrency=WG_MAX_CONCURRENCY
     )
     messaging = TelegramBotAdapter(bot_token=BOT_TOKEN)
     qr_generator = QRCodeAdapter()
+    acl = ACLAdapter(path=ACL_FILE, logger=logger)
 
     logger.log("info", "Starting VPN bot")
-    logger.log("info", f"wg-easy URL: {WG_EASY_URL}")
+    logger.log("info", "wg-easy URL: %s", WG_EASY_URL)
 
     # Create Telegram application
     app = Application.builder().token(BOT_TOKEN).build()
@@ -45,10 +66,10 @@ def main() -> None:
             handler = handler_class(messaging, logger)
         elif command == 'request':
             handler = handler_class(
-                vpn_provider, messaging, qr_generator, logger
+                vpn_provider, messaging, qr_generator, logger, acl
             )
         elif command == 'revoke':
-            handler = handler_class(vpn_provider, messaging, logger)
+            handler = handler_class(vpn_provider, messaging, logger, acl)
         elif command == 'status':
             handler = handler_class(vpn_provider, messaging, logger)
         else:
@@ -56,12 +77,15 @@ def main() -> None:
 
         # Register command
         app.add_handler(CommandHandler(command, handler.handle))
-        logger.log("info", f"Registered handler: /{command}")
+        logger.log("info", "Registered handler: /%s", command)
 
     # Start bot (polling mode for MVP)
     logger.log("info", "Bot started - polling for updates")
     app.run_polling(allowed_updates=['message'])
 
+    if isinstance(logger, QueueLogAdapter):
+        logger.close()
+
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,17 @@
 """Unit tests for adapters."""
 
+import io
+import os
+import json
+import threading
 import pytest
 from unittest.mock import Mock, patch
-from src.adapters import QRCodeAdapter, WireGuardAPIAdapter
+from src.adapters import (
+    QRCodeAdapter,
+    WireGuardAPIAdapter,
+    QueueLogAdapter,
+    ACLAdapter
+)
 
 
 def test_qr_code_adapter_generates_bytes():
@@ -97,3 +106,234 @@ def test_wireguard_adapter_delete_client(mock_delete, mock_post):
 
     assert result is True
     mock_delete.assert_called_once()
+
+
+def _fake_wg_pool(clients: dict, calls: list):
+    """Mock pooled session that serves a tiny wg-easy API."""
+    def request(method, url, headers=None, timeout=None, json=None):
+        path = url.split("51821", 1)[1]
+        calls.append((method, path))
+        if method == "POST" and path == "/api/wireguard/client":
+            if json["name"] in {c["name"] for c in clients.values()}:
+                return Mock(status_code=409)
+            cid = f"id-{json['name']}"
+            clients[cid] = {
+                "id": cid, "name": json["name"], "address": "10.8.0.9",
+                "publicKey": "key", "enabled": True
+            }
+            return Mock(status_code=201, json=lambda: clients[cid])
+        if method == "GET" and path == "/api/wireguard/client":
+            return Mock(status_code=200, json=lambda: list(clients.values()))
+        if path.endswith("/configuration"):
+            return Mock(status_code=200, text=f"[Interface] {path}")
+        if method == "POST" and path.endswith(("/enable", "/disable")):
+            cid = path.split("/")[-2]
+            if cid not in clients:
+                return Mock(status_code=404)
+            clients[cid]["enabled"] = path.endswith("/enable")
+            return Mock(status_code=204)
+        return Mock(status_code=404)
+    return Mock(request=Mock(side_effect=request))
+
+
+@pytest.mark.asyncio
+@patch('src.adapters.wireguard_api_adapter.requests.post')
+async def test_wireguard_adapter_batch_create_and_toggle(mock_post):
+    """Batch calls keep input order and report per-item errors."""
+    mock_post.return_value = Mock(
+        status_code=200,
+        json=lambda: {"sessionToken": "test_token"}
+    )
+    clients = {
+        "id-old": {
+            "id": "id-old", "name": "old", "address": "10.8.0.2",
+            "publicKey": "key", "enabled": True
+        }
+    }
+    calls = []
+    adapter = WireGuardAPIAdapter(
+        "http://test:51821", "pw", max_concurrency=2
+    )
+    adapter._http = _fake_wg_pool(clients, calls)
+
+    created = await adapter.create_clients(["a", "old", "b"])
+
+    assert [r.key for r in created] == ["a", "old", "b"]
+    assert [r.ok for r in created] == [True, False, True]
+    assert created[0].client.configuration.startswith("[Interface]")
+    assert "409" in created[1].error
+
+    toggled = await adapter.set_enabled(["id-a", "missing"], False)
+    assert [r.ok for r in toggled] == [True, False]
+    assert clients["id-a"]["enabled"] is False
+    mock_post.assert_called_once()  # one login for the whole batch
+
+
+@pytest.mark.asyncio
+@patch('src.adapters.wireguard_api_adapter.requests.post')
+async def test_wireguard_adapter_iter_clients_pages_and_configs(mock_post):
+    """iter_clients pages one listing; configs only on demand."""
+    mock_post.return_value = Mock(
+        status_code=200,
+        json=lambda: {"sessionToken": "test_token"}
+    )
+    clients = {
+        f"id-{i}": {
+            "id": f"id-{i}", "name": f"c{i}", "address": f"10.8.0.{i}",
+            "publicKey": "key", "enabled": True
+        }
+        for i in range(5)
+    }
+    calls = []
+    adapter = WireGuardAPIAdapter("http://test:51821", "pw")
+    adapter._http = _fake_wg_pool(clients, calls)
+
+    pages = [page async for page in adapter.iter_clients(page_size=2)]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert all(c.configuration == "" for page in pages for c in page)
+    assert calls == [("GET", "/api/wireguard/client")]
+
+    calls.clear()
+    pages = [
+        page async for page in adapter.iter_clients(3, include_config=True)
+    ]
+    assert all(c.configuration for page in pages for c in page)
+    assert len(calls) == 1 + 5
+
+def test_queue_log_adapter_writes_json_lines():
+    """Queue log adapter formats lazily and writes JSON lines."""
+    stream = io.StringIO()
+    formatted = []
+
+    class Lazy:
+        def __str__(self):
+            formatted.append(True)
+            return "lazy"
+
+    adapter = QueueLogAdapter(stream=stream, flush_interval=0.05)
+    adapter.log("info", "User %s value %s", 42, Lazy())
+    adapter.log("debug", "filtered out by min_level")
+    adapter.close()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["level"] == "info"
+    assert lines[0]["msg"] == "User 42 value lazy"
+    assert formatted == [True]
+
+
+def test_queue_log_adapter_drops_with_counter_when_full():
+    """Queue log adapter drops records on overload and reports them."""
+
+    class BlockingStream(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.entered = threading.Event()
+            self.release = threading.Event()
+
+        def write(self, text):
+            self.entered.set()
+            self.release.wait(5)
+            return super().write(text)
+
+    stream = BlockingStream()
+    adapter = QueueLogAdapter(stream=stream, max_queue=1, batch_size=1)
+
+    # Writer is stuck on the first record; the queue holds one more
+    adapter.log("info", "first")
+    assert stream.entered.wait(5)
+    adapter.log("info", "second")
+    for _ in range(10):
+        adapter.log("info", "overflow")
+
+    assert adapter.dropped == 10
+    stream.release.set()
+    adapter.close()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["msg"] for line in lines[:2]] == ["first", "second"]
+    assert lines[-1]["msg"] == "log records dropped"
+    assert lines[-1]["dropped"] == 10
+
+
+def test_queue_log_adapter_samples_levels():
+    """Queue log adapter samples configured levels."""
+    stream = io.StringIO()
+    adapter = QueueLogAdapter(
+        stream=stream,
+        sample_rates={"info": 0.0},
+        flush_interval=0.05
+    )
+    for _ in range(5):
+        adapter.log("info", "sampled")
+    adapter.log("error", "kept")
+    adapter.close()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["msg"] for line in lines] == ["kept"]
+    assert adapter.sampled_out == 5
+
+
+def test_log_sample_config_skips_malformed_items(capsys):
+    """LOG_SAMPLE parsing warns about bad items instead of failing at import."""
+    from src.config import _parse_sample_rates
+
+    rates = _parse_sample_rates("DEBUG=0.1, info=abc, warn=2, =0.5")
+
+    assert rates == {"debug": 0.1, "warn": 1.0}
+    assert capsys.readouterr().err.count("LOG_SAMPLE") == 2
+
+
+def test_acl_adapter_env_roles():
+    """ACL adapter maps BOT_ADMINS/BOT_WHITELIST to roles."""
+    env = {"BOT_WHITELIST": "111", "BOT_ADMINS": "222"}
+    acl = ACLAdapter(env=env)
+
+    assert acl.is_allowed(111, "vpn:request")
+    assert not acl.is_allowed(111, "vpn:revoke")
+    assert acl.is_allowed(222, "vpn:revoke")
+    assert not acl.is_allowed(333, "vpn:request")
+
+    # Empty whitelist = open access for the user role; env changes apply
+    env["BOT_WHITELIST"] = ""
+    assert acl.is_allowed(333, "vpn:request")
+    assert not acl.is_allowed(333, "vpn:revoke")
+
+
+def test_acl_adapter_file_per_server_and_hot_reload(tmp_path):
+    """ACL adapter applies per-server grants and reloads on change."""
+    path = tmp_path / "acl.json"
+    path.write_text(json.dumps({
+        "roles": {"operator": ["vpn:request", "vpn:status"]},
+        "users": {"111": {"roles": ["operator"], "servers": ["vpn"]}},
+    }))
+    acl = ACLAdapter(path=str(path), env={}, reload_interval=0)
+
+    assert acl.is_allowed(111, "vpn:request", server="vpn")
+    assert not acl.is_allowed(111, "vpn:request", server="other")
+    assert acl.is_allowed(111, "vpn:request")
+    assert not acl.is_allowed(999, "vpn:request")
+
+    path.write_text(json.dumps({"users": {"999": ["admin"]}}))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert acl.is_allowed(999, "vpn:revoke", server="other")
+    assert not acl.is_allowed(111, "vpn:request")
+
+    # Broken file keeps the last good snapshot
+    path.write_text("{not json")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    assert acl.is_allowed(999, "vpn:revoke")
+
+
+def test_acl_adapter_string_role_and_unknown_roles(tmp_path):
+    """A role given as a string works; unknown roles are logged."""
+    path = tmp_path / "acl.json"
+    path.write_text(json.dumps({"users": {"111": "admin", "222": ["admn"]}}))
+    logger = Mock()
+    acl = ACLAdapter(path=str(path), env={}, logger=logger)
+
+    assert acl.is_allowed(111, "vpn:revoke")
+    assert not acl.is_allowed(222, "vpn:request")
+    logger.log.assert_any_call("warn", "ACL: %s", "user 222 has unknown roles ['admn']")
@@ -0,0 +1,32 @@
+#!/bin/bash
+# Сравнение микробенчмарков database.py: базовый коммит против рабочего дерева на одной машине.
+# Падает (код != 0), если медиана любой операции выросла больше чем на BENCH_FAIL (по умолчанию 25%).
+#
+#   bash bench/compare.sh [базовый-ref]     # из каталога vpn-bot, по умолчанию origin/main
+#
+# Сохраненный базовый прогон не коммитится: абсолютные времена зависят от машины,
+# поэтому база каждый раз измеряется заново рядом с проверяемым кодом.
+set -euo pipefail
+
+BASE_REF="${1:-origin/main}"
+FAIL="${BENCH_FAIL:-median:25%}"
+export BENCH_DB_SIZES="${BENCH_DB_SIZES:-1000,10000}"
+
+cd "$(dirname "$0")/.."
+WORK="$(mktemp -d)"
+trap 'git worktree remove --force "$WORK/base" >/dev/null 2>&1 || true; rm -rf "$WORK"' EXIT
+STORAGE="file://$WORK/results"
+
+git worktree add --detach "$WORK/base" "$BASE_REF" >/dev/null
+if [ ! -f "$WORK/base/vpn-bot/bench/test_database_bench.py" ]; then
+  echo "В $BASE_REF нет бенчмарков - сравнивать не с чем."
+  exit 0
+fi
+
+echo "База: $BASE_REF"
+(cd "$WORK/base/vpn-bot" && python -m pytest -q bench/test_database_bench.py \
+  --benchmark-only --benchmark-storage="$STORAGE" --benchmark-save=base)
+
+echo "Рабочее дерево против базы (порог $FAIL)"
+python -m pytest -q bench/test_database_bench.py \
+  --benchmark-only --benchmark-storage="$STORAGE" --benchmark-compare=0001 --benchmark-compare-fail="$FAIL"
@@ -0,0 +1,64 @@
+"""
+Общие фикстуры микробенчмарков database.py.
+
+Синтетические БД размером из BENCH_DB_SIZES (по умолчанию 1k/10k/100k клиентов)
+строятся один раз за сессию; каждый тест работает с копией, чтобы изменения
+одного бенчмарка не влияли на следующий.
+"""
+import os
+import sys
+import shutil
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from database import init_db, save_clients_bulk  # noqa: E402
+
+SIZES = [int(s) for s in os.getenv("BENCH_DB_SIZES", "1000,10000,100000").split(",") if s.strip()]
+# Доля клиентов с истекшим сроком и отключенных в синтетической БД
+EXPIRED_SHARE = 0.1
+DISABLED_SHARE = 0.05
+
+
+def size_id(size: int) -> str:
+    return f"{size // 1000}k" if size % 1000 == 0 else str(size)
+
+
+def client_name(index: int) -> str:
+    return f"client_{index:07d}"
+
+
+def synthetic_rows(size: int, seed: int = 1) -> list:
+    """(name, expiry_date, status) в формате, который пишет бот (ISO с микросекундами)."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = []
+    for i in range(size):
+        days = -rng.randint(1, 365) if rng.random() < EXPIRED_SHARE else rng.randint(1, 730)
+        expiry = (now + timedelta(days=days)).replace(hour=23, minute=59, second=59, microsecond=999999)
+        rows.append((client_name(i), expiry.isoformat(timespec="microseconds"), "disabled" if rng.random() < DISABLED_SHARE else "enabled"))
+    return rows
+
+
+@pytest.fixture(scope="session")
+def template_dbs(tmp_path_factory):
+    """{size: путь к шаблонной БД}."""
+    base = tmp_path_factory.mktemp("bench-db")
+    paths = {}
+    for size in SIZES:
+        path = str(base / f"clients-{size}.db")
+        init_db(path)
+        save_clients_bulk(path, synthetic_rows(size))
+        paths[size] = path
+    return paths
+
+
+@pytest.fixture(params=SIZES, ids=size_id)
+def db(request, template_dbs, tmp_path):
+    """(путь к копии БД, число клиентов)."""
+    path = str(tmp_path / "clients.db")
+    shutil.copyfile(template_dbs[request.param], path)
+    return path, request.param
@@ -0,0 +1,115 @@
+"""
+Локальная заглушка Telegram Bot API для нагрузочных тестов.
+
+Принимает POST /bot<token>/<method> (form-urlencoded или multipart, как шлет
+python-telegram-bot) и отвечает минимально валидными объектами: getMe - бот,
+send*/edit* - сообщение в тот же чат, остальное - true. getUpdates отдает апдейты,
+поставленные push_update, с long polling по timeout, как настоящий Bot API - бот
+забирает их своим Updater и обрабатывает обычным процессором апдейтов. Каждый ответ задерживается
+на latency_ms; при flood_every > 0 каждый N-й sendMessage получает 429 с retry_after,
+чтобы прогнать ветку RetryAfter.
+"""
+import re
+import json
+import time
+import threading
+from collections import Counter
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BOT_USER = {"id": 100000001, "is_bot": True, "first_name": "Bench", "username": "bench_vpn_bot"}
+MESSAGE_METHODS = {"sendMessage", "sendDocument", "sendPhoto", "editMessageText", "editMessageReplyMarkup"}
+_MULTIPART_FIELD_RE = re.compile(rb'name="(chat_id|text)"\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', re.S)
+
+
+class FakeTelegram:
+    """Состояние заглушки: счетчики вызовов по методам и число сообщений по чатам."""
+
+    def __init__(self, latency_ms: float = 0.0, flood_every: int = 0, retry_after: int = 1):
+        self.latency_ms, self.flood_every, self.retry_after = latency_ms, flood_every, retry_after
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.messages = Counter()  # chat_id -> отправлено сообщений
+        self._message_id = 0
+        self._updates = []  # ждут getUpdates, по возрастанию update_id
+        self._update_id = 0
+        self._has_updates = threading.Condition(self.lock)
+
+    def push_update(self, update: dict) -> int:
+        """Ставит апдейт в очередь getUpdates; -> присвоенный update_id."""
+        with self._has_updates:
+            self._update_id += 1
+            self._updates.append({**update, "update_id": self._update_id})
+            self._has_updates.notify_all()
+            return self._update_id
+
+    def _get_updates(self, params: dict):
+        """Подтверждает апдейты ниже offset и ждет новые до timeout секунд."""
+        offset, limit = int(params.get("offset") or 0), int(params.get("limit") or 100)
+        deadline = time.monotonic() + float(params.get("timeout") or 0)
+        with self._has_updates:
+            self.calls["getUpdates"] += 1
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            while not self._updates and deadline > time.monotonic(): self._has_updates.wait(deadline - time.monotonic())
+            return 200, {"ok": True, "result": self._updates[:limit]}
+
+    def handle(self, method: str, content_type: str, body: bytes):
+        params = _parse_params(content_type, body)
+        if method == "getUpdates": return self._get_updates(params)
+        if self.latency_ms > 0: time.sleep(self.latency_ms / 1000)
+        with self.lock:
+            self.calls[method] += 1
+            if method == "sendMessage" and self.flood_every and self.calls[method] % self.flood_every == 0:
+                return 429, {"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {self.retry_after}",
+                             "parameters": {"retry_after": self.retry_after}}
+            self._message_id += 1
+            message_id = self._message_id
+        if method == "getMe": return 200, {"ok": True, "result": BOT_USER}
+        if method not in MESSAGE_METHODS: return 200, {"ok": True, "result": True}
+        try: chat_id = int(params.get("chat_id") or 0)
+        except ValueError: chat_id = 0
+        with self.lock: self.messages[chat_id] += 1
+        return 200, {"ok": True, "result": {
+            "message_id": message_id, "date": int(time.time()), "from": BOT_USER,
+            "chat": {"id": chat_id, "type": "private"}, "text": params.get("text") or "",
+        }}
+
+
+def _parse_params(content_type: str, body: bytes) -> dict:
+    if content_type.startswith("multipart/form-data"):
+        return {k.decode(): v.decode("utf-8", "replace") for k, v in _MULTIPART_FIELD_RE.findall(body)}
+    if content_type.startswith("application/json"):
+        try: return json.loads(body or b"{}")
+        except ValueError: return {}
+    return {k: v[0] for k, v in parse_qs(body.decode("utf-8", "replace")).items()}
+
+
+def _make_handler(state: FakeTelegram):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            # /bot<token>/<method>
+            method = self.path.rstrip("/").rsplit("/", 1)[-1]
+            status, payload = state.handle(method, self.headers.get("Content-Type", ""), body)
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST
+        def log_message(self, *args): pass
+
+    return Handler
+
+
+def start_server(state: FakeTelegram, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Запускает заглушку в фоновом потоке. Bot API base_url: http://host:port/bot"""
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-telegram", daemon=True).start()
+    return server
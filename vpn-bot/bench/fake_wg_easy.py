@@ -0,0 +1,178 @@
+"""
+Локальная заглушка wg-easy для нагрузочных тестов (контракт .dev-docs/contracts/wg-easy-api.yaml).
+
+Держит в памяти PEERS клиентов и отвечает на те же пути, что и настоящий wg-easy:
+  POST   /api/session                                 - логин по паролю, cookie connect.sid
+  GET    /api/wireguard/client                        - листинг (со статистикой трафика)
+  POST   /api/wireguard/client                        - создание (409 при повторе имени, как ждет wg_api)
+  GET    /api/wireguard/client/{id}                   - детали
+  DELETE /api/wireguard/client/{id}                   - удаление
+  POST   /api/wireguard/client/{id}/enable|disable    - смена статуса
+  GET    /api/wireguard/client/{id}/configuration     - конфиг
+  GET    /api/wireguard/client/{id}/qrcode[.svg]      - QR (SVG)
+Каждый ответ задерживается на latency_ms +- jitter_ms, листинг дополнительно на
+list_ms_per_1k за каждую тысячу пиров - так моделируется медленный сервер.
+
+Запуск отдельно: python3 bench/fake_wg_easy.py --peers 5000 --latency-ms 20
+"""
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QR_SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64"><rect width="64" height="64" fill="#fff"/><rect x="8" y="8" width="16" height="16"/></svg>'
+CONFIG_TEMPLATE = """[Interface]
+PrivateKey = {key}
+Address = {address}/24
+DNS = 1.1.1.1, 8.8.8.8
+
+[Peer]
+PublicKey = bench-server-public-key=
+PresharedKey = bench-preshared-key=
+Endpoint = 127.0.0.1:51820
+AllowedIPs = 0.0.0.0/0, ::/0
+"""
+
+
+def peer_name(index: int) -> str:
+    return f"peer_{index:06d}"
+
+
+class FakeWgEasy:
+    """Состояние заглушки: клиенты, сессии и счетчики запросов по эндпоинтам."""
+
+    def __init__(self, peers: int = 1000, password: str = "bench", latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, list_ms_per_1k: float = 0.0, seed: int = 1):
+        self.password = password
+        self.latency_ms, self.jitter_ms, self.list_ms_per_1k = latency_ms, jitter_ms, list_ms_per_1k
+        self.lock = threading.Lock()
+        self.sessions = set()
+        self.clients = {}   # id -> dict
+        self.by_name = {}   # name -> id
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._next_ip = 2
+        now = datetime.now(timezone.utc)
+        for i in range(peers): self._add(peer_name(i), now, enabled=self._random.random() > 0.1)
+
+    def _add(self, name: str, now: datetime, enabled: bool = True) -> dict:
+        client_id = str(uuid.UUID(int=self._random.getrandbits(128)))
+        address = f"10.{8 + self._next_ip // 65536}.{(self._next_ip // 256) % 256}.{self._next_ip % 256}"
+        self._next_ip += 1
+        client = {
+            "id": client_id, "name": name, "address": address, "enabled": enabled,
+            "publicKey": f"{client_id.replace('-', '')[:43]}=", "createdAt": now.isoformat().replace("+00:00", "Z"),
+            "transferRx": self._random.randrange(0, 10**9), "transferTx": self._random.randrange(0, 10**9),
+            "latestHandshakeAt": now.isoformat().replace("+00:00", "Z") if self._random.random() > 0.3 else None,
+        }
+        self.clients[client_id] = client
+        self.by_name[name] = client_id
+        return client
+
+    def delay(self, extra_ms: float = 0.0):
+        ms = self.latency_ms + extra_ms
+        if self.jitter_ms: ms += self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if ms > 0: time.sleep(ms / 1000)
+
+    def handle(self, method: str, path: str, cookies: str, body: bytes):
+        """Возвращает (статус, content-type, тело, доп. заголовки)."""
+        parts = [p for p in path.split("?", 1)[0].split("/") if p]
+        endpoint = "/".join(p if i < 3 else "{id}" if i == 3 else p for i, p in enumerate(parts))
+        with self.lock: self.requests[f"{method} /{endpoint}"] += 1
+
+        if parts == ["api", "session"] and method == "POST":
+            self.delay()
+            try: password = json.loads(body or b"{}").get("password")
+            except ValueError: password = None
+            if password != self.password: return 401, "application/json", {"error": "Incorrect password", "code": "UNAUTHORIZED"}, {}
+            sid = uuid.uuid4().hex
+            with self.lock: self.sessions.add(sid)
+            return 200, "application/json", {"success": True}, {"Set-Cookie": f"connect.sid={sid}; Path=/; HttpOnly"}
+
+        sid = next((c.split("=", 1)[1] for c in cookies.split("; ") if c.startswith("connect.sid=")), None)
+        if sid not in self.sessions: return 401, "application/json", {"error": "Not logged in", "code": "UNAUTHORIZED"}, {}
+        if parts[:3] != ["api", "wireguard", "client"]: return 404, "application/json", {"error": "Not found", "code": "NOT_FOUND"}, {}
+
+        if len(parts) == 3 and method == "GET":
+            self.delay(self.list_ms_per_1k * len(self.clients) / 1000)
+            with self.lock: listing = list(self.clients.values())
+            return 200, "application/json", listing, {}
+        if len(parts) == 3 and method == "POST":
+            self.delay()
+            try: name = json.loads(body or b"{}").get("name")
+            except ValueError: name = None
+            if not name: return 400, "application/json", {"error": "Name is required", "code": "INVALID_REQUEST"}, {}
+            with self.lock:
+                if name in self.by_name: return 409, "application/json", {"error": "Client name already exists", "code": "CONFLICT"}, {}
+                client = self._add(name, datetime.now(timezone.utc))
+            return 201, "application/json", dict(client, configuration=CONFIG_TEMPLATE.format(key=client["publicKey"], address=client["address"])), {}
+
+        self.delay()
+        with self.lock: client = self.clients.get(parts[3])
+        if client is None: return 404, "application/json", {"error": "Client not found", "code": "NOT_FOUND"}, {}
+        tail = parts[4] if len(parts) > 4 else None
+        if tail is None and method == "GET": return 200, "application/json", client, {}
+        if tail is None and method == "DELETE":
+            with self.lock: self.clients.pop(client["id"], None); self.by_name.pop(client["name"], None)
+            return 204, "application/json", None, {}
+        if tail in ("enable", "disable") and method == "POST":
+            with self.lock: client["enabled"] = tail == "enable"
+            return 204, "application/json", None, {}
+        if tail == "configuration" and method == "GET":
+            return 200, "text/plain", CONFIG_TEMPLATE.format(key=client["publicKey"], address=client["address"]).encode(), {}
+        if tail in ("qrcode", "qrcode.svg") and method == "GET": return 200, "image/svg+xml", QR_SVG, {}
+        return 404, "application/json", {"error": "Not found", "code": "NOT_FOUND"}, {}
+
+
+def _make_handler(state: FakeWgEasy):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _dispatch(self, method: str):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            status, content_type, payload, headers = state.handle(method, self.path, self.headers.get("Cookie", ""), body)
+            data = payload if isinstance(payload, bytes) else (b"" if payload is None else json.dumps(payload).encode())
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in headers.items(): self.send_header(key, value)
+            self.end_headers()
+            if data: self.wfile.write(data)
+
+        def do_GET(self): self._dispatch("GET")
+        def do_POST(self): self._dispatch("POST")
+        def do_DELETE(self): self._dispatch("DELETE")
+        def log_message(self, *args): pass
+
+    return Handler
+
+
+def start_server(state: FakeWgEasy, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Запускает заглушку в фоновом потоке. Адрес: server.server_address."""
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-wg-easy", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Заглушка wg-easy API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=51821)
+    parser.add_argument("--peers", type=int, default=1000)
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--list-ms-per-1k", type=float, default=0.0)
+    args = parser.parse_args()
+    state = FakeWgEasy(args.peers, args.password, args.latency_ms, args.jitter_ms, args.list_ms_per_1k)
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(state))
+    print(f"fake wg-easy: http://{args.host}:{args.port} ({args.peers} пиров)")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
@@ -0,0 +1,306 @@
+"""
+Сквозной нагрузочный тест bot.py на локальных заглушках wg-easy и Telegram.
+
+Поднимает fake_wg_easy (PEERS пиров, задержка ответов) и fake_telegram, заполняет
+временную БД теми же клиентами и прогоняет сценарии ADMINS одновременных
+администраторов через бота, запущенного как в продакшене: Application.start() и
+Updater в режиме polling забирают апдейты из getUpdates заглушки, процессор апдейтов
+PTB (с его concurrent_updates) раздает их обработчикам. Каждое действие -
+последовательность апдейтов, как их прислал бы клиент Telegram; замеряется время от
+постановки первого апдейта до завершения обработчиков последнего (отметку ставит
+TypeHandler в последней группе).
+
+Отчет: число действий, ошибки, пропускная способность, p50/p95/p99 по действиям,
+число запросов к wg-easy и вызовов Bot API. С --save-baseline результат пишется в
+JSON, с --baseline сравнивается с ним: если p95 какого-либо действия вырос больше
+чем на --max-regression %, тест завершается с кодом 1 (для проверки перед деплоем).
+
+Примеры (из каталога vpn-bot):
+  python3 bench/load_test.py --peers 5000 --admins 20 --iterations 10 --wg-latency-ms 15
+  python3 bench/load_test.py --mix get_config=1,list=1 --peers 200 --save-baseline bench/baseline.json
+  python3 bench/load_test.py --baseline bench/baseline.json --max-regression 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+from collections import defaultdict
+
+from telegram import Update
+from telegram.ext import TypeHandler
+
+import fake_telegram
+import fake_wg_easy
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+BOT_TOKEN = "100000001:BENCHMARK-TOKEN"
+FIRST_ADMIN_ID = 910000000
+
+# Действие -> шаги. ("text", ...) - сообщение, ("callback", ...) - нажатие inline-кнопки,
+# ("inline", ...) - inline-запрос. Подстановки: {peer} - существующий пир, {new} - новое имя,
+# {own} - клиент, созданный этим же админом, {typo} - имя с опечаткой, {prefix} - префикс имени.
+SCENARIOS = {
+    "get_config": [("text", "📄 Скачать конфиг"), ("text", "{peer}")],
+    "get_qr": [("text", "🇶 Запросить QR"), ("text", "{peer}")],
+    "extend": [("text", "⏳ Продлить срок действия"), ("text", "1"), ("text", "{peer}")],
+    "toggle": [("callback", "disable:{peer}"), ("callback", "enable:{peer}")],
+    "create": [("text", "➕ Создать клиента"), ("text", "1 мес"), ("text", "{new}")],
+    "delete": [("text", "🗑️ Удалить клиента"), ("text", "{own}")],
+    "typo": [("text", "📄 Скачать конфиг"), ("text", "{typo}"), ("text", "⬅️ Назад")],
+    "inline": [("inline", "{prefix}")],
+    "traffic": [("text", "📊 Трафик")],
+    "reconcile": [("text", "🔄 Сверка с API")],
+    "list": [("text", "👥 Список клиентов")],
+}
+# "list" шлет по сообщению на клиента с паузой 0.2 с - по умолчанию выключен
+DEFAULT_MIX = "get_config=30,get_qr=15,extend=15,toggle=10,create=10,delete=8,typo=5,inline=5,traffic=1,reconcile=1"
+# Группа обработчика-отметки: после всех групп бота
+DONE_GROUP = 1_000_000
+POLL_TIMEOUT = 1
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Процентиль методом ближайшего ранга."""
+    if not sorted_values: return 0.0
+    rank = max(1, min(len(sorted_values), round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS: raise SystemExit(f"Неизвестное действие '{name}'. Доступны: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()): raise SystemExit("Пустой --mix.")
+    return mix
+
+
+class UpdateFeed:
+    """Подает апдейты через getUpdates заглушки и ждет, пока бот их обработает."""
+
+    def __init__(self, tg: "fake_telegram.FakeTelegram"):
+        self.tg = tg
+        self.waiting = {}  # update_id -> future
+
+    async def send(self, payload: dict):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.tg.push_update(payload)] = future
+        await future
+
+    async def done(self, update: Update, context):
+        future = self.waiting.pop(update.update_id, None)
+        if future and not future.done(): future.set_result(None)
+
+
+class Session:
+    """Сценарий одного администратора: выбор действий, сборка апдейтов, замеры."""
+
+    def __init__(self, feed: UpdateFeed, user_id: int, peers: list, mix: dict, seed: int):
+        self.feed, self.user_id, self.peers = feed, user_id, peers
+        self.random = random.Random(seed)
+        self.actions, self.weights = list(mix), list(mix.values())
+        self.own = []
+        self.created = 0
+        self.update_id = 0
+        self.chat = {"id": user_id, "type": "private"}
+        self.user = {"id": user_id, "is_bot": False, "first_name": f"admin{user_id - FIRST_ADMIN_ID}"}
+
+    def _update(self, kind: str, value: str) -> dict:
+        # update_id присваивает заглушка при постановке в getUpdates
+        self.update_id += 1
+        local_id = self.user_id * 100000 + self.update_id
+        now = int(time.time())
+        if kind == "callback":
+            message = {"message_id": local_id, "date": now, "chat": self.chat, "from": fake_telegram.BOT_USER, "text": "..."}
+            return {"callback_query": {"id": str(local_id), "from": self.user, "chat_instance": str(self.user_id), "data": value, "message": message}}
+        if kind == "inline":
+            return {"inline_query": {"id": str(local_id), "from": self.user, "query": value, "offset": ""}}
+        message = {"message_id": local_id, "date": now, "chat": self.chat, "from": self.user, "text": value}
+        if value.startswith("/"): message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(value.split()[0])}]
+        return {"message": message}
+
+    def _substitute(self, value: str) -> str:
+        if "{peer}" in value: return value.replace("{peer}", self.random.choice(self.peers))
+        if "{new}" in value:
+            self.created += 1
+            name = f"bench_{self.user_id - FIRST_ADMIN_ID}_{self.created}"
+            self.own.append(name)
+            return value.replace("{new}", name)
+        if "{own}" in value: return value.replace("{own}", self.own.pop(self.random.randrange(len(self.own))))
+        if "{typo}" in value: return value.replace("{typo}", self.random.choice(self.peers)[:-1] + "x")
+        if "{prefix}" in value: return value.replace("{prefix}", self.random.choice(self.peers)[:-2])
+        return value
+
+    async def _send(self, kind: str, value: str):
+        await self.feed.send(self._update(kind, value))
+
+    async def login(self):
+        await self._send("text", "/start")
+        await self._send("callback", "select_server:vpn")
+
+    def next_action(self) -> str:
+        action = self.random.choices(self.actions, self.weights)[0]
+        # Удалять можно только своих клиентов; если их нет - сначала создать
+        return "create" if action == "delete" and not self.own else action
+
+    async def run_action(self, action: str) -> float:
+        steps = [(kind, self._substitute(value)) for kind, value in SCENARIOS[action]]
+        started = time.perf_counter()
+        for kind, value in steps: await self._send(kind, value)
+        return time.perf_counter() - started
+
+
+async def run_load(feed: UpdateFeed, peers: list, admins: int, iterations: int, mix: dict, think_ms: float, seed: int, errors: dict) -> tuple[dict, float]:
+    samples = defaultdict(list)
+
+    async def admin(index: int):
+        session = Session(feed, FIRST_ADMIN_ID + index, peers, mix, seed + index)
+        await session.login()
+        for _ in range(iterations):
+            action = session.next_action()
+            before = errors.get(session.user_id, 0)
+            elapsed = await session.run_action(action)
+            samples[action].append((elapsed, errors.get(session.user_id, 0) > before))
+            if think_ms: await asyncio.sleep(session.random.uniform(0, think_ms) / 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(admin(i) for i in range(admins)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples: dict, wall_time: float) -> dict:
+    report = {"wall_time_s": round(wall_time, 3), "actions": {}}
+    total = 0
+    for action in sorted(samples):
+        values = sorted(elapsed for elapsed, _failed in samples[action])
+        total += len(values)
+        report["actions"][action] = {
+            "count": len(values),
+            "errors": sum(1 for _elapsed, failed in samples[action] if failed),
+            "throughput_per_s": round(len(values) / wall_time, 2) if wall_time else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+    report["total_actions"] = total
+    report["throughput_per_s"] = round(total / wall_time, 2) if wall_time else 0.0
+    return report
+
+
+def print_report(report: dict, wg: "fake_wg_easy.FakeWgEasy", tg: "fake_telegram.FakeTelegram"):
+    print(f"\nДействий: {report['total_actions']} за {report['wall_time_s']} с ({report['throughput_per_s']}/с)")
+    print(f"{'действие':<12}{'кол-во':>8}{'ошибки':>8}{'в сек':>8}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}{'max мс':>10}")
+    for action, row in report["actions"].items():
+        print(f"{action:<12}{row['count']:>8}{row['errors']:>8}{row['throughput_per_s']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+    print("\nЗапросы к wg-easy:")
+    for endpoint, count in wg.requests.most_common(): print(f"  {count:>8}  {endpoint}")
+    print("Вызовы Bot API:")
+    for method, count in tg.calls.most_common(): print(f"  {count:>8}  {method}")
+
+
+def compare_with_baseline(report: dict, baseline: dict, max_regression: float, min_delta_ms: float = 5.0) -> list:
+    """Действия, у которых p95 вырос больше допустимого. Слишком малые выборки и разницы в пределах шума игнорируются."""
+    regressions = []
+    for action, row in report["actions"].items():
+        base = baseline.get("actions", {}).get(action)
+        if not base or base["count"] < 5 or row["count"] < 5: continue
+        limit = base["p95_ms"] * (1 + max_regression / 100)
+        if row["p95_ms"] > limit and row["p95_ms"] - base["p95_ms"] > min_delta_ms:
+            regressions.append(f"{action}: p95 {base['p95_ms']} -> {row['p95_ms']} мс (+{(row['p95_ms'] / base['p95_ms'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест vpn-bot на заглушках wg-easy и Telegram")
+    parser.add_argument("--peers", type=int, default=1000, help="число пиров на wg-easy и в БД")
+    parser.add_argument("--admins", type=int, default=5, help="одновременных администраторов")
+    parser.add_argument("--iterations", type=int, default=20, help="действий на администратора")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="веса действий: name=weight,...")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="случайная пауза между действиями (0..N мс)")
+    parser.add_argument("--wg-latency-ms", type=float, default=10.0)
+    parser.add_argument("--wg-jitter-ms", type=float, default=2.0)
+    parser.add_argument("--wg-list-ms-per-1k", type=float, default=5.0, help="доп. задержка листинга на 1000 пиров")
+    parser.add_argument("--tg-latency-ms", type=float, default=5.0)
+    parser.add_argument("--tg-flood-every", type=int, default=0, help="каждый N-й sendMessage отвечает 429")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_out", help="записать отчет в JSON")
+    parser.add_argument("--save-baseline", help="сохранить отчет как базовый")
+    parser.add_argument("--baseline", help="сравнить с базовым отчетом")
+    parser.add_argument("--max-regression", type=float, default=25.0, help="допустимый рост p95, %%")
+    parser.add_argument("--verbose", action="store_true", help="логи бота уровня INFO")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    wg = fake_wg_easy.FakeWgEasy(args.peers, latency_ms=args.wg_latency_ms, jitter_ms=args.wg_jitter_ms, list_ms_per_1k=args.wg_list_ms_per_1k, seed=args.seed)
+    wg_server = fake_wg_easy.start_server(wg)
+    tg = fake_telegram.FakeTelegram(latency_ms=args.tg_latency_ms, flood_every=args.tg_flood_every)
+    tg_server = fake_telegram.start_server(tg)
+    work_dir = tempfile.mkdtemp(prefix="vpn-bot-bench-")
+
+    # Настройки читаются ботом при импорте - задаются до него
+    os.environ.update({
+        "TELEGRAM_TOKEN": BOT_TOKEN, "SESSION_PASSWORD": wg.password,
+        "SERVER1_KEY": "vpn", "SERVER1_NAME": "VPN", "SERVER1_URL": f"http://127.0.0.1:{wg_server.server_address[1]}",
+        "ALLOWED_USERS": ",".join(str(FIRST_ADMIN_ID + i) for i in range(args.admins)),
+        "DB_DIR": work_dir, "EXPORT_DIR": os.path.join(work_dir, "export"), "METRICS_PORT": "0",
+        "RECONCILE_INTERVAL": "0", "BACKUP_INTERVAL": "0", "STATS_INTERVAL": "0",
+    })
+    for key in ("SERVER2_KEY", "SERVER3_KEY"): os.environ.pop(key, None)
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+    import bot
+    from database import init_db, save_clients_bulk
+
+    db_path = os.path.join(work_dir, "vpn.db")
+    init_db(db_path)
+    peers = sorted(wg.by_name)
+    save_clients_bulk(db_path, [(name, "2099-12-31T23:59:59.999999", "enabled") for name in peers])
+
+    app = bot.build_application(BOT_TOKEN, base_url=f"http://127.0.0.1:{tg_server.server_address[1]}/bot")
+    errors = defaultdict(int)
+    feed = UpdateFeed(tg)
+    app.add_handler(TypeHandler(Update, feed.done), group=DONE_GROUP)
+
+    async def count_error(update, context):
+        user = getattr(update, "effective_user", None)
+        errors[user.id if user else 0] += 1
+        logging.debug("Ошибка обработчика: %r", context.error)
+    app.add_error_handler(count_error)
+
+    async def run():
+        await app.initialize()
+        await app.start()
+        await app.updater.start_polling(poll_interval=0, timeout=POLL_TIMEOUT)
+        try: return await run_load(feed, peers, args.admins, args.iterations, mix, args.think_ms, args.seed, errors)
+        finally:
+            await app.updater.stop(); await app.stop(); await app.shutdown()
+
+    print(f"Пиров: {args.peers}, админов: {args.admins}, действий на админа: {args.iterations}, wg-easy {args.wg_latency_ms}±{args.wg_jitter_ms} мс")
+    samples, wall_time = asyncio.run(run())
+    report = summarize(samples, wall_time)
+    report["config"] = {k: v for k, v in vars(args).items() if k not in ("json_out", "save_baseline", "baseline", "verbose")}
+    print_report(report, wg, tg)
+    wg_server.shutdown(); tg_server.shutdown()
+
+    for path in (args.json_out, args.save_baseline):
+        if path:
+            with open(path, "w") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f: baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.max_regression)
+        if regressions:
+            print(f"\n❌ Регрессии p95 (> {args.max_regression}%):"); print("\n".join(f"  {line}" for line in regressions))
+            sys.exit(1)
+        print(f"\n✅ Регрессий p95 больше {args.max_regression}% нет.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Микробенчмарки vpn-bot/src/database.py на синтетических БД 1k/10k/100k клиентов.
+
+Запуск (из каталога vpn-bot, нужен requirements-bench.txt):
+  python -m pytest bench/test_database_bench.py --benchmark-autosave
+Проверка регрессий против базового коммита (то же делает CI в .github/workflows/vpn-bot-bench.yml):
+  bash bench/compare.sh origin/main
+Скрипт меряет базу и рабочее дерево на одной машине и падает, если медиана выросла больше чем на 25%.
+Размеры: BENCH_DB_SIZES=1000,10000 (по умолчанию 1000,10000,100000).
+"""
+import itertools
+import random
+
+from conftest import client_name
+from database import (
+    save_client,
+    get_all_clients,
+    get_client_by_name,
+    update_client_status,
+    extend_client,
+    delete_client_from_db,
+    get_expired_clients,
+    save_clients_bulk,
+    update_client_statuses_bulk,
+    delete_clients_bulk,
+)
+
+BULK_SIZE = 1000
+EXPIRY = "2099-12-31T23:59:59.999999"
+# Уникальные имена новых клиентов на весь прогон
+_NEW_NAMES = (f"bench_{i:09d}" for i in itertools.count())
+
+
+def _setup(benchmark, group: str, size: int):
+    benchmark.group = group
+    benchmark.extra_info["clients"] = size
+
+
+def _new_names(count: int) -> list:
+    return list(itertools.islice(_NEW_NAMES, count))
+
+
+def test_save_client(benchmark, db):
+    path, size = db
+    _setup(benchmark, "save_client", size)
+    assert benchmark(lambda: save_client(path, next(_NEW_NAMES), EXPIRY))
+
+
+def test_get_client_by_name(benchmark, db):
+    path, size = db
+    _setup(benchmark, "get_client_by_name", size)
+    rng = random.Random(1)
+    assert benchmark(lambda: get_client_by_name(path, client_name(rng.randrange(size)))) is not None
+
+
+def test_get_all_clients(benchmark, db):
+    path, size = db
+    _setup(benchmark, "get_all_clients", size)
+    assert len(benchmark(get_all_clients, path)) == size
+
+
+def test_update_client_status(benchmark, db):
+    path, size = db
+    _setup(benchmark, "update_client_status", size)
+    rng = random.Random(1)
+    assert benchmark(lambda: update_client_status(path, client_name(rng.randrange(size)), rng.choice(("enabled", "disabled"))))
+
+
+def test_extend_client(benchmark, db):
+    path, size = db
+    _setup(benchmark, "extend_client", size)
+    rng = random.Random(1)
+    assert benchmark(lambda: extend_client(path, client_name(rng.randrange(size)), 1))
+
+
+def test_get_expired_clients(benchmark, db):
+    path, size = db
+    _setup(benchmark, "get_expired_clients", size)
+    assert benchmark(get_expired_clients, path)
+
+
+def test_delete_client_from_db(benchmark, db):
+    path, size = db
+    _setup(benchmark, "delete_client_from_db", size)
+
+    def setup():
+        name = next(_NEW_NAMES)
+        save_client(path, name, EXPIRY)
+        return (path, name), {}
+
+    assert benchmark.pedantic(delete_client_from_db, setup=setup, rounds=200)
+
+
+def test_save_clients_bulk(benchmark, db):
+    path, size = db
+    _setup(benchmark, f"save_clients_bulk[{BULK_SIZE}]", size)
+
+    def setup():
+        return (path, [(name, EXPIRY, "enabled") for name in _new_names(BULK_SIZE)]), {}
+
+    assert benchmark.pedantic(save_clients_bulk, setup=setup, rounds=20) == BULK_SIZE
+
+
+def test_update_client_statuses_bulk(benchmark, db):
+    path, size = db
+    _setup(benchmark, f"update_client_statuses_bulk[{BULK_SIZE}]", size)
+    rng = random.Random(1)
+
+    def setup():
+        return (path, [(rng.choice(("enabled", "disabled")), client_name(i)) for i in rng.sample(range(size), min(BULK_SIZE, size))]), {}
+
+    assert benchmark.pedantic(update_client_statuses_bulk, setup=setup, rounds=20)
+
+
+def test_delete_clients_bulk(benchmark, db):
+    path, size = db
+    _setup(benchmark, f"delete_clients_bulk[{BULK_SIZE}]", size)
+
+    def setup():
+        names = _new_names(BULK_SIZE)
+        save_clients_bulk(path, [(name, EXPIRY, "enabled") for name in names])
+        return (path, names), {}
+
+    assert benchmark.pedantic(delete_clients_bulk, setup=setup, rounds=20) == BULK_SIZE
@@ -0,0 +1,132 @@
+"""
+Ролевой доступ к боту: роли, пользователи и права по серверам.
+
+Права компилируются один раз в хэш-множества строк "право" и "право@сервер",
+проверка - несколько поисков по множеству. Файл ACL_FILE (JSON, по умолчанию
+db/acl.json) перечитывается при изменении mtime (проверка не чаще раза в
+ACL_RELOAD_INTERVAL секунд), перезапуск бота не нужен. Битый файл игнорируется,
+остается последняя рабочая версия.
+
+Формат файла:
+  {
+    "roles": {"support": ["config", "list"]},
+    "users": {
+      "111": ["admin"],
+      "222": {"roles": ["operator"], "servers": ["vpn"]}
+    }
+  }
+Пользователь с "servers" получает права только на этих серверах. Одну роль можно указать
+строкой ("111": "admin"); неизвестные роли пишутся в лог как предупреждение.
+ALLOWED_USERS из окружения всегда получают роль admin (как раньше - полный доступ).
+
+Права: config (конфиг и QR), create, delete, extend, toggle, list, reconcile, export, traffic,
+events (уведомления об изменениях пиров); "*" - все.
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+ALL = "*"
+DEFAULT_ROLES = {
+    "admin": [ALL],
+    "operator": ["config", "create", "extend", "toggle", "list", "traffic", "events"],
+    "viewer": ["config", "list", "traffic", "events"],
+}
+ACL_RELOAD_INTERVAL = float(os.getenv("ACL_RELOAD_INTERVAL", "1") or 1)
+
+
+def _parse_ids(value: str) -> list:
+    ids = []
+    for part in (value or "").split(","):
+        try:
+            if part.strip(): ids.append(int(part.strip()))
+        except ValueError: logging.error("ACL: некорректный id '%s'.", part.strip())
+    return ids
+
+
+def compile_acl(allowed_users: str, document: dict | None) -> tuple[dict, dict, dict]:
+    """
+    -> три словаря по user_id: frozenset('право' | 'право@сервер'), frozenset(права без учета сервера),
+    frozenset(серверы, где есть хоть одно право; "*" - все).
+    """
+    document = document or {}
+    roles = {**DEFAULT_ROLES, **document.get("roles", {})}
+    grants = {}
+
+    def grant(user_id: int, role_names, servers):
+        # "123": "admin" - одна роль строкой, а не список букв
+        if isinstance(role_names, str): role_names = [role_names]
+        if isinstance(servers, str): servers = [servers]
+        unknown = [name for name in role_names if name not in roles]
+        if unknown: logging.warning("ACL: у пользователя %s неизвестные роли %s, они ничего не дают.", user_id, unknown)
+        perms = {perm for name in role_names for perm in roles.get(name, [])}
+        target = grants.setdefault(user_id, set())
+        if servers: target.update(f"{perm}@{server}" for perm in perms for server in servers)
+        else: target.update(perms)
+
+    for user_id in _parse_ids(allowed_users): grant(user_id, ["admin"], None)
+    for raw_id, spec in document.get("users", {}).items():
+        if isinstance(spec, dict): grant(int(raw_id), spec.get("roles", []), spec.get("servers"))
+        else: grant(int(raw_id), spec, None)
+
+    compiled = {uid: frozenset(perms) for uid, perms in grants.items()}
+    anywhere = {uid: frozenset(perm.split("@", 1)[0] for perm in perms) for uid, perms in grants.items()}
+    servers = {uid: frozenset(perm.split("@", 1)[1] if "@" in perm else ALL for perm in perms) for uid, perms in grants.items()}
+    return compiled, anywhere, servers
+
+
+class ACL:
+    """Проверки прав по скомпилированному снимку с горячей перезагрузкой файла. Потокобезопасен."""
+
+    def __init__(self, allowed_users: str = "", path: str | None = None, reload_interval: float = ACL_RELOAD_INTERVAL):
+        self.allowed_users, self.path, self.reload_interval = allowed_users, path, reload_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._mtime = None
+        self._grants, self._anywhere, self._servers = compile_acl(allowed_users, None)
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force: bool = False):
+        now = time.monotonic()
+        if not self.path or (not force and now < self._next_check): return
+        with self._lock:
+            self._next_check = now + self.reload_interval
+            try: mtime = os.stat(self.path).st_mtime_ns
+            except OSError: mtime = None
+            if mtime == self._mtime and not force: return
+            self._mtime = mtime
+            document = None
+            if mtime is not None:
+                try:
+                    with open(self.path, encoding="utf-8") as f: document = json.load(f)
+                except (OSError, ValueError) as e: logging.error("ACL: файл '%s' не прочитан, остаются прежние права: %s", self.path, e); return
+            try: self._grants, self._anywhere, self._servers = compile_acl(self.allowed_users, document)
+            except (TypeError, ValueError, AttributeError) as e: logging.error("ACL: ошибка в '%s', остаются прежние права: %s", self.path, e); return
+            if mtime is not None: logging.info("ACL загружен из '%s': %s пользователей.", self.path, len(self._grants))
+
+    def is_allowed(self, user_id: int, permission: str, server: str | None = None) -> bool:
+        """Есть ли у пользователя право (на сервере server или хотя бы на одном, если server не задан)."""
+        self._maybe_reload()
+        if server is None:
+            held = self._anywhere.get(user_id)
+            return bool(held) and (permission in held or ALL in held)
+        held = self._grants.get(user_id)
+        if not held: return False
+        return permission in held or ALL in held or f"{permission}@{server}" in held or f"{ALL}@{server}" in held
+
+    def is_known(self, user_id: int) -> bool:
+        """Есть ли у пользователя хоть какие-то права."""
+        self._maybe_reload()
+        return user_id in self._grants
+
+    def can_use_server(self, user_id: int, server: str) -> bool:
+        """Есть ли у пользователя хоть одно право на сервере."""
+        self._maybe_reload()
+        servers = self._servers.get(user_id, ())
+        return ALL in servers or server in servers
+
+    def has_users(self) -> bool:
+        self._maybe_reload()
+        return bool(self._grants)
@@ -1,10 +1,10 @@
 import sqlite3
 import logging
-import requests
-import cairosvg
 import os
 import re
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 # import httpx # Не нужен
 from io import BytesIO
 from dotenv import load_dotenv
@@ -21,14 +21,17 @@ from telegram import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     ReplyKeyboardRemove,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
     constants
 )
-from telegram.error import TelegramError, TimedOut
+from telegram.error import TelegramError, TimedOut, RetryAfter
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
+    InlineQueryHandler,
     ContextTypes,
     filters,
 )
@@ -41,7 +44,29 @@ from database import (
     extend_client,
     get_client_by_name,
     get_all_clients,
+    set_sqlite_observer,
 )
+from wg_api import (
+    list_clients,
+    get_api_config_and_qr,
+    create_client_api,
+    delete_client_api,
+    toggle_client_status_api,
+)
+from reconcile import reconcile_server, format_plan, format_result
+from db_backup import backup_all
+from peer_events import PeerWatcher, append_event_log, format_events, load_subscribers, set_subscribed
+from traffic import collect_server, format_report as format_traffic_report, stats_db_path
+from name_index import get_index, get_index_async, invalidate as invalidate_name_index, sync_generation, mark_generation
+from state import create_state, Leader, shared_user_data, LEADER_TTL
+import startup
+from log_sink import setup_logging
+from acl import ACL
+from rate_limit import MutationLimiter, QueueFull
+from metrics import start_metrics_server, handler_timer, observe_flood_wait, observe_sqlite, TELEGRAM_RETRIES
+from export import export_server_zip, format_summary as format_export_summary, EXPORT_DIR, TELEGRAM_DOCUMENT_LIMIT
+
+set_sqlite_observer(observe_sqlite)  # время операций SQLite -> метрики
 
 # === ЗАГРУЗКА НАСТРОЕК ===
 load_dotenv()
@@ -49,6 +74,25 @@ load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 DB_DIR = os.getenv("DB_DIR", "db")
 DEFAULT_SESSION_PASSWORD = os.getenv("SESSION_PASSWORD")
+# Периодическая сверка БД <-> API: интервал в секундах (0 - выключена) и режим (dry-run / apply)
+RECONCILE_INTERVAL = int(os.getenv("RECONCILE_INTERVAL", "0") or 0)
+RECONCILE_MODE = os.getenv("RECONCILE_MODE", "dry-run")
+# Онлайн-бэкап БД серверов: интервал в секундах (0 - выключен)
+BACKUP_INTERVAL = int(os.getenv("BACKUP_INTERVAL", "86400") or 0)
+# Сбор статистики трафика/handshake по пирам: интервал в секундах (0 - выключен)
+STATS_INTERVAL = int(os.getenv("STATS_INTERVAL", "60") or 0)
+# События по пирам (добавлен/удален/вкл/выкл/первый handshake/простой): интервал опроса в секундах (0 - выключены)
+EVENTS_INTERVAL = int(os.getenv("EVENTS_INTERVAL", "60") or 0)
+EVENTS_LOG = os.getenv("EVENTS_LOG", os.path.join(DB_DIR, "events.jsonl"))
+EVENTS_SUBSCRIBERS_FILE = os.path.join(DB_DIR, "event_subscribers.json")
+# Webhook вместо polling (нужен для нескольких реплик): публичный URL и порт, на котором слушает реплика
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443") or 8443)
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram").strip("/")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+# Сколько апдейтов обрабатывается одновременно (разных пользователей; свои - по очереди, см. state.shared_user_data).
+# 1 - строго по одному: пользователь, ждущий лимитера wg-easy, задерживает всех.
+CONCURRENT_UPDATES = max(1, int(os.getenv("CONCURRENT_UPDATES", "32") or 32))
 
 # === СЕРВЕРЫ ===
 SERVERS = {}
@@ -74,17 +118,53 @@ url3 = os.getenv("SERVER3_URL")
 if key3 and name3 and url3:
     SERVERS[key3] = {"name": name3, "url": url3}
 
-# === ДОПУСКАЕМЫЕ ПОЛЬЗОВАТЕЛИ ===
-allowed_users_str = os.getenv("ALLOWED_USERS", "")
-try:
-    ALLOWED_USERS = [int(user_id.strip()) for user_id in allowed_users_str.split(',') if user_id.strip()]
-except ValueError:
-    logging.error("Ошибка чтения ALLOWED_USERS.")
-    ALLOWED_USERS = []
+# === ДОСТУП (роли и права по серверам, см. acl.py) ===
+# ALLOWED_USERS - администраторы; остальные роли и пользователи - в ACL_FILE (перечитывается на лету)
+ACL_FILE = os.getenv("ACL_FILE", os.path.join(DB_DIR, "acl.json"))
+ACCESS = ACL(os.getenv("ALLOWED_USERS", ""), ACL_FILE)
+
+# Кнопка / шаг диалога -> требуемое право
+BUTTON_PERMISSIONS = {
+    "Скачать конфиг": "config", "Запросить QR": "config", "Создать клиента": "create", "Удалить клиента": "delete",
+    "Продлить срок действия": "extend", "Список клиентов": "list", "Сверка с API": "reconcile", "Экспорт всех": "export", "Трафик": "traffic",
+}
+ACTION_PERMISSIONS = {
+    "select_creation_method": "create", "enter_custom_date": "create", "create_client_duration": "create", "create_client_custom_date": "create",
+    "extend_select_duration": "extend", "extend_client": "extend", "get_config": "config", "get_qr": "config", "delete_client": "delete",
+}
 
 def is_authorized(user_id: int) -> bool:
-    if not ALLOWED_USERS: logging.warning("ALLOWED_USERS пуст."); return False
-    return user_id in ALLOWED_USERS
+    return ACCESS.is_known(user_id)
+
+def is_permitted(user_id: int, permission: str, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Право на действие на выбранном пользователем сервере."""
+    return ACCESS.is_allowed(user_id, permission, context.user_data.get('server_key'))
+
+# === ЛИМИТ ИЗМЕНЯЮЩИХ ЗАПРОСОВ К WG-EASY (см. rate_limit.py) ===
+LIMITER = MutationLimiter()
+
+async def run_mutation(user_id: int, context: ContextTypes.DEFAULT_TYPE, message, func, *args):
+    """Вызов func(*args) через лимитер (по пользователю и серверу) в потоке. None - очередь заполнена, пользователь уведомлен."""
+    async def notify(position: int): await message.reply_text(f"⏳ Запрос в очереди, позиция {position}.")
+    try: return await LIMITER.run(user_id, context.user_data.get('server_key'), func, *args, on_queued=notify)
+    except QueueFull: await message.reply_text("⚠️ Сервер перегружен запросами, попробуйте позже."); return None
+
+# === ОБЩЕЕ СОСТОЯНИЕ РЕПЛИК (см. state.py) ===
+STATE = create_state()
+LEADER = Leader(STATE)
+
+async def sync_name_index(context: ContextTypes.DEFAULT_TYPE):
+    """Индекс имен сбрасывается, если клиентов сервера меняла другая реплика."""
+    server_key = context.user_data.get('server_key')
+    if server_key: sync_generation(server_key, await STATE.generation(f"names:{server_key}"))
+
+async def names_changed(server_key: str):
+    """Сообщает другим репликам, что имена клиентов сервера изменились (локальный индекс уже обновлен)."""
+    if not server_key: return
+    try: mark_generation(server_key, await STATE.bump(f"names:{server_key}"))
+    except Exception as e: logging.error("Не удалось обновить версию имен %s: %s", server_key, e)
+
+shared_state = shared_user_data(STATE, on_load=sync_name_index)
 
 # === ВСПОМОГАТЕЛЬНАЯ ФУНКЦИЯ для получения пути к БД ===
 def get_db_path_for_user(context: ContextTypes.DEFAULT_TYPE) -> str | None:
@@ -94,107 +174,22 @@ def get_db_path_for_user(context: ContextTypes.DEFAULT_TYPE) -> str | None:
     # logging.warning("Ключ сервера не найден в user_data.")
     return None
 
-# === ФУНКЦИИ ДЛЯ РАБОТЫ С API ===
-# (без изменений)
-def create_session(base_url: str, password: str):
-    try: response = requests.post(f"{base_url}/api/session", json={"password": password}, timeout=10); response.raise_for_status(); return response.cookies
-    except requests.exceptions.RequestException as e: logging.error(f"Ошибка сессии {base_url}: {e}"); return None
-def get_api_clients(cookies, base_url: str):
-    if not cookies: return None
-    try: response = requests.get(f"{base_url}/api/wireguard/client", cookies=cookies, timeout=10); response.raise_for_status(); return response.json()
-    except requests.exceptions.RequestException as e: logging.error(f"Ошибка get_clients {base_url}: {e}"); return None
-    except requests.exceptions.JSONDecodeError as e: logging.error(f"Ошибка JSON {base_url}: {e}"); return None
-def get_api_client_configuration(client_id, cookies, base_url: str):
-    if not cookies: return None
-    try: response = requests.get(f"{base_url}/api/wireguard/client/{client_id}/configuration", cookies=cookies, timeout=10); response.raise_for_status(); return response.text
-    except requests.exceptions.RequestException as e: logging.error(f"Ошибка конфига {client_id} с {base_url}: {e}"); return None
-def get_api_qr_code_svg(client_id, cookies, base_url: str):
-    if not cookies: return None
-    try: response = requests.get(f"{base_url}/api/wireguard/client/{client_id}/qrcode.svg", cookies=cookies, timeout=10); response.raise_for_status(); return response.content
-    except requests.exceptions.RequestException as e: logging.error(f"Ошибка QR SVG {client_id} с {base_url}: {e}"); return None
-def get_api_config_and_qr(client_name: str, base_url: str, password: str):
-    cookies = create_session(base_url, password);
-    if not cookies: return None, None, "Не удалось создать сессию."
-    api_clients = get_api_clients(cookies, base_url);
-    if api_clients is None: return None, None, "Не удалось получить список клиентов."
-    client_data = next((c for c in api_clients if c["name"] == client_name), None)
-    if not client_data: return None, None, f"Клиент '{client_name}' не найден на сервере."
-    client_id = client_data["id"]; config = get_api_client_configuration(client_id, cookies, base_url)
-    qr_svg = get_api_qr_code_svg(client_id, cookies, base_url); qr_png, qr_error = None, None
-    if qr_svg:
-        try: qr_png = cairosvg.svg2png(bytestring=qr_svg)
-        except Exception as e: logging.error(f"Ошибка SVG->PNG {client_name}: {e}"); qr_error = "Ошибка QR SVG->PNG."
-    else: qr_error = "Ошибка получения QR SVG."
-    error_message = None
-    if config is None and qr_png is None: error_message = "Не удалось получить ни конфиг, ни QR."
-    elif config is None: error_message = "Конфиг не получен, но QR есть."
-    elif qr_png is None: error_message = f"Конфиг получен, но {qr_error}"
-    return config, qr_png, error_message
-def create_client_api(client_name: str, base_url: str, password: str):
-    cookies = create_session(base_url, password);
-    if not cookies: return None, None, "Не удалось создать сессию."
-    try:
-        response = requests.post(f"{base_url}/api/wireguard/client", json={"name": client_name}, cookies=cookies, timeout=15)
-        if response.status_code == 409: return None, None, f"Клиент '{client_name}' уже есть на сервере."
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e: logging.error(f"Ошибка API создания {client_name}: {e}"); return None, None, f"Ошибка API создания '{client_name}'."
-    api_clients = get_api_clients(cookies, base_url);
-    if api_clients is None: return None, None, "Клиент создан (API), но ошибка получения данных."
-    client_data = next((c for c in api_clients if c["name"] == client_name), None)
-    if not client_data: return None, None, "Клиент создан (API), но не найден в списке."
-    client_id = client_data["id"]; config = get_api_client_configuration(client_id, cookies, base_url)
-    qr_svg = get_api_qr_code_svg(client_id, cookies, base_url); qr_png = None
-    if qr_svg:
-        try: qr_png = cairosvg.svg2png(bytestring=qr_svg)
-        except Exception as e: logging.error(f"Ошибка SVG->PNG созд. {client_name}: {e}")
-    error = None
-    if config is None and qr_png is None: error = "Клиент создан (API), но ошибка получения конфига/QR."
-    return config, qr_png, error
-def delete_client_api(client_name: str, base_url: str, password: str):
-    cookies = create_session(base_url, password);
-    if not cookies: return False, "Не удалось создать сессию."
-    api_clients = get_api_clients(cookies, base_url);
-    if api_clients is None: logging.warning(f"Нет списка клиентов {base_url} перед удалением {client_name}.")
-    client_data = next((c for c in api_clients if c["name"] == client_name), None) if api_clients else None
-    if client_data:
-        client_id = client_data["id"]
-        try:
-            response = requests.delete(f"{base_url}/api/wireguard/client/{client_id}", cookies=cookies, timeout=10)
-            response.raise_for_status(); logging.info(f"Клиент '{client_name}' удален с API {base_url}.")
-            return True, None
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Ошибка API удаления {client_name}: {e}")
-            return False, f"Ошибка API при удалении '{client_name}'."
-    else:
-        logging.info(f"Клиент '{client_name}' не найден на API {base_url}.")
-        return True, None
-def toggle_client_status_api(client_name: str, enable: bool, base_url: str, password: str):
-    cookies = create_session(base_url, password);
-    if not cookies: return False, "Не удалось создать сессию."
-    api_clients = get_api_clients(cookies, base_url);
-    if api_clients is None: return False, "Не удалось получить список клиентов."
-    client_data = next((c for c in api_clients if c["name"] == client_name), None)
-    if not client_data: return False, f"Клиент '{client_name}' не найден на сервере."
-    client_id = client_data["id"]; action = "enable" if enable else "disable"
-    try:
-        response = requests.post(f"{base_url}/api/wireguard/client/{client_id}/{action}", cookies=cookies, timeout=10)
-        response.raise_for_status()
-        return True, f"Статус клиента '{client_name}' изменен на API ✅"
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Ошибка API {action} {client_name}: {e}")
-        return False, f"Ошибка API при изменении статуса '{client_name}'."
-
 # === КЛАВИАТУРЫ ===
 def get_main_keyboard():
     keyboard = [
         [KeyboardButton("📄 Скачать конфиг"), KeyboardButton("🇶 Запросить QR")],
         [KeyboardButton("➕ Создать клиента"), KeyboardButton("🗑️ Удалить клиента")],
         [KeyboardButton("⏳ Продлить срок действия"), KeyboardButton("👥 Список клиентов")],
-        [KeyboardButton("🌐 Выбрать другой сервер")],
+        [KeyboardButton("🔄 Сверка с API"), KeyboardButton("📦 Экспорт всех")],
+        [KeyboardButton("📊 Трафик"), KeyboardButton("🌐 Выбрать другой сервер")],
     ]
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
 def get_back_keyboard():
     return ReplyKeyboardMarkup([[KeyboardButton("⬅️ Назад")]], resize_keyboard=True, one_time_keyboard=False)
+def get_suggestions_keyboard(names: list):
+    rows = [[KeyboardButton(name)] for name in names]
+    rows.append([KeyboardButton("⬅️ Назад")])
+    return ReplyKeyboardMarkup(rows, resize_keyboard=True, one_time_keyboard=True)
 def get_creation_options_keyboard():
     keyboard = [
         [KeyboardButton("1 мес"), KeyboardButton("6 мес"), KeyboardButton("12 мес")],
@@ -205,24 +200,28 @@ def get_creation_options_keyboard():
 
 # === ОБРАБОТЧИКИ ===
 
+@shared_state
+@handler_timer("start", lambda u, c: "start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    if not is_authorized(user.id): logging.warning(f"Неавторизованный доступ: {user.id} ({user.username})"); await update.message.reply_text("⛔️ Нет доступа."); return
+    if not is_authorized(user.id): logging.warning("Неавторизованный доступ: %s (%s)", user.id, user.username); await update.message.reply_text("⛔️ Нет доступа."); return
     context.user_data.clear()
-    buttons = [[InlineKeyboardButton(s["name"], callback_data=f"select_server:{k}")] for k, s in SERVERS.items()]
+    buttons = [[InlineKeyboardButton(s["name"], callback_data=f"select_server:{k}")] for k, s in SERVERS.items() if ACCESS.can_use_server(user.id, k)]
     if not buttons: await update.message.reply_text("Ошибка: Серверы не настроены."); return
     reply_markup = InlineKeyboardMarkup(buttons)
     await update.message.reply_text(f"Привет, {user.first_name}! Выберите сервер:", reply_markup=reply_markup)
     await update.message.reply_text("...", reply_markup=ReplyKeyboardRemove())
 
+@shared_state
+@handler_timer("handle_buttons", lambda u, c: u.message.text.split(" ", 1)[-1] if u.message and u.message.text else None)
 async def handle_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     if not is_authorized(user_id): await update.message.reply_text("⛔️ Нет доступа."); return
 
     text = update.message.text
-    logging.info(f"User {user_id} кнопка: {text}")
+    logging.info("User %s кнопка: %s", user_id, text)
 
-    action_text = text.split(" ", 1)[-1] if text.startswith(("📄", "🇶", "➕", "🗑️", "⏳", "👥", "🌐")) else text
+    action_text = text.split(" ", 1)[-1] if text.startswith(("📄", "🇶", "➕", "🗑️", "⏳", "👥", "🔄", "📦", "📊", "🌐")) else text
 
     if action_text == "Выбрать другой сервер": await start(update, context); return
 
@@ -231,6 +230,8 @@ async def handle_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     base_url = context.user_data.get('base_url')
 
     if not db_path or not base_url: await update.message.reply_text("Сервер не выбран. /start"); return
+    permission = BUTTON_PERMISSIONS.get(action_text)
+    if permission and not is_permitted(user_id, permission, context): await update.message.reply_text("⛔️ Нет прав на это действие."); return
 
     context.user_data.pop("action", None); context.user_data.pop("duration", None); context.user_data.pop("extend_duration", None); context.user_data.pop("custom_expiry_date", None)
     await update.message.reply_text(f"📍 Сервер: {server_name} (БД: {os.path.basename(db_path)})")
@@ -244,13 +245,30 @@ async def handle_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
         extend_duration_keyboard = ReplyKeyboardMarkup([ [KeyboardButton("1"), KeyboardButton("6"), KeyboardButton("12")], [KeyboardButton("⬅️ Назад")] ], resize_keyboard=True, one_time_keyboard=True)
         await update.message.reply_text("Продлить на (мес.):", reply_markup=extend_duration_keyboard)
 
+    elif action_text == "Сверка с API":
+        password = context.user_data.get('password', DEFAULT_SESSION_PASSWORD)
+        await update.message.reply_text("Сверка БД и API (без изменений)...", reply_markup=get_main_keyboard())
+        plan, _ = await asyncio.to_thread(reconcile_server, db_path, base_url, password, False)
+        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("✅ Применить", callback_data="reconcile:apply")]]) if not plan.error and not plan.is_empty() else None
+        await update.message.reply_text(format_plan(plan, server_name), parse_mode=constants.ParseMode.HTML, reply_markup=reply_markup)
+
+    elif action_text == "Трафик":
+        # Только из агрегатов сборщика - без обращения к API
+        server_key = context.user_data.get('server_key')
+        report = await asyncio.to_thread(format_traffic_report, stats_db_path(DB_DIR, server_key), server_name)
+        await update.message.reply_text(report, parse_mode=constants.ParseMode.HTML, reply_markup=get_main_keyboard())
+
+    elif action_text == "Экспорт всех":
+        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("📄 Только конфиги", callback_data="export:conf"), InlineKeyboardButton("📄+🇶 Конфиги и QR", callback_data="export:qr")]])
+        await update.message.reply_text("Состав архива:", reply_markup=reply_markup)
+
     elif action_text == "Список клиентов":
         password = context.user_data.get('password', DEFAULT_SESSION_PASSWORD)
         await update.message.reply_text("Загрузка списка...", reply_markup=get_main_keyboard())
         try: db_clients = get_all_clients(db_path)
-        except Exception as e: logging.error(f"Ошибка БД {db_path}: {e}"); await update.message.reply_text(f"Ошибка БД {server_name}."); return
+        except Exception as e: logging.error("Ошибка БД %s: %s", db_path, e); await update.message.reply_text(f"Ошибка БД {server_name}."); return
         if not db_clients: await update.message.reply_text(f"Клиенты не найдены в БД {server_name}.", reply_markup=get_main_keyboard()); return
-        cookies = create_session(base_url, password); api_clients = get_api_clients(cookies, base_url)
+        api_clients = await asyncio.to_thread(list_clients, base_url, password)
         output_messages = []; api_statuses = {}; api_error_flag = False
         if api_clients is not None: api_statuses = {c['name']: c.get('enabled', True) for c in api_clients}
         else: await update.message.reply_text("⚠️ Ошибка API статусов."); api_error_flag = True
@@ -267,18 +285,26 @@ async def handle_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
             output_messages.append({'text': message, 'reply_markup': inline_keyboard})
         if not output_messages: await update.message.reply_text(f"Список пуст {server_name}.", reply_markup=get_main_keyboard()); return
         await update.message.reply_text(f"Вывод списка ({len(output_messages)} шт.)...", reply_markup=get_main_keyboard())
-        MESSAGE_LENGTH_LIMIT = 4096; logging.debug(f"Лимит: {MESSAGE_LENGTH_LIMIT}")
+        MESSAGE_LENGTH_LIMIT = 4096; logging.debug("Лимит: %s", MESSAGE_LENGTH_LIMIT)
         for i, msg_data in enumerate(output_messages):
              try:
-                 if len(msg_data['text']) > MESSAGE_LENGTH_LIMIT: logging.warning(f"Сообщ. {i} > лимита."); client_name_from_msg = re.search(r"<b>(.*?)</b>", msg_data['text']); name_to_log = client_name_from_msg.group(1) if client_name_from_msg else f"idx {i}"; await update.message.reply_text(f"⚠️ >лимит для {name_to_log}.")
+                 if len(msg_data['text']) > MESSAGE_LENGTH_LIMIT: logging.warning("Сообщ. %s > лимита.", i); client_name_from_msg = re.search(r"<b>(.*?)</b>", msg_data['text']); name_to_log = client_name_from_msg.group(1) if client_name_from_msg else f"idx {i}"; await update.message.reply_text(f"⚠️ >лимит для {name_to_log}.")
                  else: await update.message.reply_text(text=msg_data['text'], parse_mode=constants.ParseMode.HTML, reply_markup=msg_data['reply_markup'])
                  await asyncio.sleep(0.2)
-             except TelegramError as e: logging.error(f"Ошибка TG отпр. {i}: {e}"); await update.message.reply_text(f"Ошибка отпр. {i}: {e}"); await asyncio.sleep(0.5)
-             except Exception as e: logging.error(f"Неизв. ошибка {i}: {e!r}"); await update.message.reply_text(f"Неизв. ошибка вывода."); await asyncio.sleep(1)
+             except RetryAfter as e:
+                 # Flood control: ждем сколько просит Telegram и повторяем один раз
+                 wait_seconds = observe_flood_wait(e.retry_after); logging.warning("RetryAfter %s с при отпр. %s", wait_seconds, i)
+                 await asyncio.sleep(wait_seconds); TELEGRAM_RETRIES.labels("send_message").inc()
+                 try: await update.message.reply_text(text=msg_data['text'], parse_mode=constants.ParseMode.HTML, reply_markup=msg_data['reply_markup'])
+                 except TelegramError as e2: logging.error("Ошибка TG повт. отпр. %s: %s", i, e2)
+             except TelegramError as e: logging.error("Ошибка TG отпр. %s: %s", i, e); await update.message.reply_text(f"Ошибка отпр. {i}: {e}"); await asyncio.sleep(0.5)
+             except Exception as e: logging.error("Неизв. ошибка %s: %r", i, e); await update.message.reply_text(f"Неизв. ошибка вывода."); await asyncio.sleep(1)
         await update.message.reply_text("--- Конец списка ---", reply_markup=get_main_keyboard())
         if not clients_found_on_server and db_clients and not api_error_flag: await update.message.reply_text(f"⚠️ Ни один клиент из БД не найден на API {server_name}.", reply_markup=get_main_keyboard())
 
 
+@shared_state
+@handler_timer("handle_message", lambda u, c: c.user_data.get("action"))
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     if not is_authorized(user_id): return
@@ -287,7 +313,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not text: return
 
     if text == "⬅️ Назад":
-        current_action = context.user_data.get('action'); logging.info(f"User {user_id} Назад. Отмена: {current_action}")
+        current_action = context.user_data.get('action'); logging.info("User %s Назад. Отмена: %s", user_id, current_action)
         context.user_data.pop("action", None); context.user_data.pop("duration", None); context.user_data.pop("extend_duration", None); context.user_data.pop("custom_expiry_date", None)
         await update.message.reply_text("Отменено.", reply_markup=get_main_keyboard()); return
 
@@ -298,9 +324,12 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     action = context.user_data.get("action")
 
     if not db_path or not base_url: await update.message.reply_text("Сервер не выбран. /start"); return
-    if not action: logging.debug(f"Нет action для '{text}' от {user_id}"); return
+    if not action: logging.debug("Нет action для '%s' от %s", text, user_id); return
+    permission = ACTION_PERMISSIONS.get(action)
+    if permission and not is_permitted(user_id, permission, context):
+        context.user_data.pop("action", None); await update.message.reply_text("⛔️ Нет прав на это действие.", reply_markup=get_main_keyboard()); return
 
-    logging.info(f"User {user_id} Action: {action}, Input: '{text}', Server: {server_name}, DB: {os.path.basename(db_path)}")
+    logging.info("User %s Action: %s, Input: '%s', Server: %s, DB: %s", user_id, action, text, server_name, os.path.basename(db_path))
     default_reply_markup = get_main_keyboard()
 
     try:
@@ -328,24 +357,36 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             client_name = text
             final_expiry_date_str = None
 
+            # Проверка имени по индексу в памяти: опечатка не должна стоить логина и листинга на API
+            if action in ["extend_client", "get_config", "get_qr", "delete_client"]:
+                name_index = await get_index_async(context.user_data.get('server_key'), db_path)
+                if not name_index.contains(client_name):
+                    suggestions = name_index.suggest(client_name)
+                    if suggestions: await update.message.reply_text(f"Клиент '{client_name}' не найден. Возможно, вы имели в виду:", reply_markup=get_suggestions_keyboard(suggestions))
+                    else: await update.message.reply_text(f"Клиент '{client_name}' не найден. Введите имя еще раз или '⬅️ Назад'.", reply_markup=get_back_keyboard())
+                    return
+
             if action == "create_client_duration" or action == "create_client_custom_date":
                 await update.message.reply_text(f"Создание '{client_name}'...", reply_markup=default_reply_markup)
                 if action == "create_client_duration":
                     duration = context.user_data.get("duration")
                     if duration is None: raise ValueError("Срок (duration) не найден.")
-                    try: expiry_dt = datetime.now() + relativedelta(months=duration); final_expiry_date_str = expiry_dt.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat(timespec='microseconds'); logging.info(f"Рассчитана дата до {final_expiry_date_str}")
-                    except Exception as e: logging.error(f"Ошибка расчета даты: {e}"); await update.message.reply_text("Ошибка расчета даты."); context.user_data.pop("action", None); context.user_data.pop("duration", None); return
+                    try: expiry_dt = datetime.now() + relativedelta(months=duration); final_expiry_date_str = expiry_dt.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat(timespec='microseconds'); logging.info("Рассчитана дата до %s", final_expiry_date_str)
+                    except Exception as e: logging.error("Ошибка расчета даты: %s", e); await update.message.reply_text("Ошибка расчета даты."); context.user_data.pop("action", None); context.user_data.pop("duration", None); return
                 else:
                     final_expiry_date_str = context.user_data.get("custom_expiry_date")
                     if final_expiry_date_str is None: raise ValueError("Кастомная дата не найдена.")
-                    logging.info(f"Используется кастомная дата: {final_expiry_date_str}")
+                    logging.info("Используется кастомная дата: %s", final_expiry_date_str)
 
-                config, qr_png, error_api = create_client_api(client_name, base_url, password)
+                result = await run_mutation(user_id, context, update.message, create_client_api, client_name, base_url, password)
+                if result is None: return
+                config, qr_png, error_api = result
                 if error_api: await update.message.reply_text(f"Ошибка API: {error_api}")
                 if "уже существует" not in (error_api or ""):
                     try:
                         saved_to_db = save_client(db_path, client_name, final_expiry_date_str)
                         if saved_to_db:
+                             (await get_index_async(context.user_data.get('server_key'), db_path)).add(client_name); await names_changed(context.user_data.get('server_key'))
                              if not error_api: await update.message.reply_text(f"Клиент '{client_name}' создан ✅ (до {final_expiry_date_str[:10]})", reply_markup=default_reply_markup)
                              else: await update.message.reply_text(f"Клиент '{client_name}' сохранен в БД (до {final_expiry_date_str[:10]}), но была проблема с API.", reply_markup=default_reply_markup)
                              if config: await update.message.reply_document(InputFile(BytesIO(config.encode('utf-8')), filename=f"{client_name}.conf"), caption=f"Конфиг {client_name}")
@@ -353,7 +394,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                              if qr_png: await update.message.reply_photo(BytesIO(qr_png), caption=f"QR-код {client_name}")
                              else: await update.message.reply_text("⚠️ QR-код с API не получен.")
                         else: await update.message.reply_text(f"Не удалось сохранить '{client_name}' в БД.", reply_markup=default_reply_markup)
-                    except Exception as db_err: logging.error(f"Ошибка БД сохр. {client_name} в {db_path}: {db_err}"); await update.message.reply_text(f"Ошибка сохранения '{client_name}' в БД!", reply_markup=default_reply_markup)
+                    except Exception as db_err: logging.error("Ошибка БД сохр. %s в %s: %s", client_name, db_path, db_err); await update.message.reply_text(f"Ошибка сохранения '{client_name}' в БД!", reply_markup=default_reply_markup)
                 context.user_data.pop("duration", None); context.user_data.pop("custom_expiry_date", None)
 
             elif action == "extend_client":
@@ -363,12 +404,12 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     extended = extend_client(db_path, client_name, duration)
                     if extended: updated_client_info = get_client_by_name(db_path, client_name); new_expiry_date = updated_client_info[1] if updated_client_info and len(updated_client_info) > 1 and updated_client_info[1] else "не уст."; await update.message.reply_text(f"Срок '{client_name}' в БД продлён на {duration} мес. ✅\nДо: <code>{new_expiry_date}</code>", reply_markup=default_reply_markup, parse_mode=constants.ParseMode.HTML)
                     else: await update.message.reply_text(f"Клиент '{client_name}' не найден/не продлен в БД.", reply_markup=default_reply_markup)
-                except Exception as db_err: logging.error(f"Ошибка БД продл. {client_name} в {db_path}: {db_err}"); await update.message.reply_text(f"Ошибка БД продл. '{client_name}'.")
+                except Exception as db_err: logging.error("Ошибка БД продл. %s в %s: %s", client_name, db_path, db_err); await update.message.reply_text(f"Ошибка БД продл. '{client_name}'.")
                 context.user_data.pop("extend_duration", None)
 
             elif action == "get_config":
                 await update.message.reply_text(f"Запрос конфига '{client_name}'...", reply_markup=default_reply_markup)
-                config, _, error = get_api_config_and_qr(client_name, base_url, password);
+                config, _, error = await asyncio.to_thread(get_api_config_and_qr, client_name, base_url, password)
                 if error and not config: await update.message.reply_text(f"Ошибка: {error}")
                 elif config: await update.message.reply_document(InputFile(BytesIO(config.encode('utf-8')), filename=f"{client_name}.conf"), caption=f"Конфиг {client_name}\n\n{error or ''}")
                 else: await update.message.reply_text(f"Неизв. ошибка конфига.")
@@ -376,7 +417,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             elif action == "get_qr":
                 await update.message.reply_text(f"Запрос QR '{client_name}'...", reply_markup=default_reply_markup)
-                _, qr_png, error = get_api_config_and_qr(client_name, base_url, password);
+                _, qr_png, error = await asyncio.to_thread(get_api_config_and_qr, client_name, base_url, password)
                 if error and not qr_png: await update.message.reply_text(f"Ошибка: {error}")
                 elif qr_png: await update.message.reply_photo(BytesIO(qr_png), caption=f"QR-код {client_name}\n\n{error or ''}")
                 else: await update.message.reply_text(f"Неизв. ошибка QR.")
@@ -384,11 +425,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             elif action == "delete_client":
                 await update.message.reply_text(f"Удаление '{client_name}'...", reply_markup=default_reply_markup)
-                api_success, api_msg = delete_client_api(client_name, base_url, password)
+                result = await run_mutation(user_id, context, update.message, delete_client_api, client_name, base_url, password)
+                if result is None: return
+                api_success, api_msg = result
                 if not api_success: await update.message.reply_text(f"Ошибка API: {api_msg}. Удаление из БД отменено.")
                 else:
+                    (await get_index_async(context.user_data.get('server_key'), db_path)).remove(client_name); await names_changed(context.user_data.get('server_key'))
                     try: deleted_from_db = delete_client_from_db(db_path, client_name); final_message = f"Клиент '{client_name}' удален с API ({'успешно' if api_msg is None else 'не найден'}) и из БД ({'успешно' if deleted_from_db else 'не найден'}). ✅"; await update.message.reply_text(final_message, reply_markup=default_reply_markup)
-                    except Exception as db_err: logging.error(f"Ошибка БД удал. {client_name} из {db_path}: {db_err}"); await update.message.reply_text(f"Клиент '{client_name}' удален с API, но ОШИБКА удаления из БД!", reply_markup=default_reply_markup)
+                    except Exception as db_err: logging.error("Ошибка БД удал. %s из %s: %s", client_name, db_path, db_err); await update.message.reply_text(f"Клиент '{client_name}' удален с API, но ОШИБКА удаления из БД!", reply_markup=default_reply_markup)
 
             context.user_data.pop("action", None)
 
@@ -396,14 +440,16 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
              if action == "select_creation_method": await update.message.reply_text("Пожалуйста, выберите опцию с клавиатуры.", reply_markup=get_creation_options_keyboard())
              elif action == "enter_custom_date": await update.message.reply_text("Неверный формат. Введите дату как ДД.ММ.ГГГГ:", reply_markup=get_back_keyboard())
              elif action == "extend_select_duration": await update.message.reply_text("Некорр. ввод. Выберите срок или '⬅️ Назад'.", reply_markup=ReplyKeyboardMarkup([[KeyboardButton("1"), KeyboardButton("6"), KeyboardButton("12")], [KeyboardButton("⬅️ Назад")]], resize_keyboard=True, one_time_keyboard=True))
-             else: logging.warning(f"Необработанный action '{action}' для '{text}'"); await update.message.reply_text("Неизв. действие.", reply_markup=default_reply_markup); context.user_data.pop("action", None)
+             else: logging.warning("Необработанный action '%s' для '%s'", action, text); await update.message.reply_text("Неизв. действие.", reply_markup=default_reply_markup); context.user_data.pop("action", None)
 
     except Exception as e:
-        logging.exception(f"Ошибка в handle_message: {e}")
+        logging.exception("Ошибка в handle_message: %s", e)
         await update.message.reply_text("Внутр. ошибка.", reply_markup=default_reply_markup)
         context.user_data.pop("action", None); context.user_data.pop("duration", None); context.user_data.pop("extend_duration", None); context.user_data.pop("custom_expiry_date", None)
 
 
+@shared_state
+@handler_timer("handle_callback", lambda u, c: (u.callback_query.data or "").split(":", 1)[0])
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query; user_id = query.from_user.id
     await query.answer()
@@ -414,18 +460,22 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if not query.data: return
-    logging.info(f"User {user_id} inline: {query.data}")
+    logging.info("User %s inline: %s", user_id, query.data)
 
     if query.data.startswith("select_server:"):
         server_key = query.data.split(":", 1)[1]
+        if server_key in SERVERS and not ACCESS.can_use_server(user_id, server_key):
+            try: await query.edit_message_text("⛔️ Нет доступа к этому серверу.", reply_markup=None)
+            except Exception: pass
+            return
         if server_key in SERVERS:
             selected_server = SERVERS[server_key]; db_path = os.path.join(DB_DIR, f"{server_key}.db")
             try:
                 init_db(db_path)
-                logging.info(f"БД для {server_key} готова.")
+                logging.info("БД для %s готова.", server_key)
             except Exception as e:
                  # --- ИСПРАВЛЕНО ЗДЕСЬ ---
-                 logging.error(f"Не удалось инициализ. БД {db_path} при выборе сервера: {e}")
+                 logging.error("Не удалось инициализ. БД %s при выборе сервера: %s", db_path, e)
                  try:
                      await query.edit_message_text("⚠️ Ошибка инициализации БД сервера!", reply_markup=None)
                  except Exception:
@@ -465,28 +515,68 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     # --- КОНЕЦ ИСПРАВЛЕНИЯ ---
 
+    permission = "toggle" if query.data.startswith(("enable:", "disable:")) else query.data.split(":", 1)[0]
+    if permission in ("toggle", "reconcile", "export") and not is_permitted(user_id, permission, context):
+        await context.bot.send_message(chat_id=query.message.chat_id, text="⛔️ Нет прав на это действие."); return
+
+    if query.data == "reconcile:apply":
+        try: await query.edit_message_reply_markup(reply_markup=None)
+        except Exception: pass
+        # План строится заново: между dry-run и нажатием кнопки данные могли измениться
+        applied = await run_mutation(user_id, context, query.message, reconcile_server, db_path, base_url, password, True)
+        if applied is None: return
+        plan, result = applied
+        if result is not None: invalidate_name_index(context.user_data.get('server_key')); await names_changed(context.user_data.get('server_key'))
+        if plan.error: text = format_plan(plan, server_name)
+        elif result is None or plan.is_empty(): text = f"✅ {server_name}: исправлять нечего."
+        else: text = format_result(result, server_name)
+        await context.bot.send_message(chat_id=query.message.chat_id, text=text, reply_markup=get_main_keyboard())
+        return
+
+    if query.data in ("export:conf", "export:qr"):
+        include_qr = query.data == "export:qr"
+        try: await query.edit_message_text(f"Экспорт {server_name}{' с QR' if include_qr else ''}...", reply_markup=None)
+        except Exception: pass
+        server_key = context.user_data.get('server_key')
+        zip_path, summary = await asyncio.to_thread(export_server_zip, db_path, base_url, password, server_key, include_qr)
+        chat_id = query.message.chat_id
+        if not zip_path: await context.bot.send_message(chat_id=chat_id, text=format_export_summary(summary), reply_markup=get_main_keyboard()); return
+        try:
+            if summary["size"] <= TELEGRAM_DOCUMENT_LIMIT:
+                with open(zip_path, "rb") as archive: await context.bot.send_document(chat_id=chat_id, document=archive, filename=os.path.basename(zip_path), caption=format_export_summary(summary))
+            elif not EXPORT_DIR: await context.bot.send_message(chat_id=chat_id, text=f"⚠️ Архив {summary['size'] // (1024 * 1024)} МБ больше лимита Telegram. Задайте EXPORT_DIR для сохранения в каталог.")
+            if EXPORT_DIR: await context.bot.send_message(chat_id=chat_id, text=f"Архив сохранен: {zip_path}", reply_markup=get_main_keyboard())
+        except TelegramError as e: logging.error("Ошибка отправки архива %s: %s", zip_path, e); await context.bot.send_message(chat_id=chat_id, text=f"Ошибка отправки архива: {e}")
+        finally:
+            # Временные архивы не храним; в EXPORT_DIR архив остается
+            if not EXPORT_DIR:
+                try: os.remove(zip_path); os.rmdir(os.path.dirname(zip_path))
+                except OSError: pass
+        return
+
     if query.data.startswith("enable:") or query.data.startswith("disable:"):
         try: action_cb, client_name = query.data.split(":", 1)
-        except ValueError: logging.error(f"Некорр. callback вкл/выкл: {query.data}"); return
+        except ValueError: logging.error("Некорр. callback вкл/выкл: %s", query.data); return
 
         enable = (action_cb == "enable")
-        api_success, api_msg = toggle_client_status_api(client_name, enable, base_url, password)
+        result = await run_mutation(user_id, context, query.message, toggle_client_status_api, client_name, enable, base_url, password)
+        if result is None: return
+        api_success, api_msg, api_clients = result
         db_update_success = False
         if api_success:
             try:
                 db_status = "enabled" if enable else "disabled"
                 updated_in_db = update_client_status(db_path, client_name, db_status)
                 if updated_in_db: db_update_success = True
-                else: logging.warning(f"'{client_name}' не найден в {os.path.basename(db_path)} для update.")
-            except Exception as db_err: logging.error(f"Ошибка БД update {client_name} в {os.path.basename(db_path)}: {db_err}")
+                else: logging.warning("'%s' не найден в %s для update.", client_name, os.path.basename(db_path))
+            except Exception as db_err: logging.error("Ошибка БД update %s в %s: %s", client_name, os.path.basename(db_path), db_err)
 
         result_message = api_msg if api_msg else ("Успешно" if api_success else "Ошибка")
         if api_success and not db_update_success: result_message += "\n⚠️ БД не обновлена!"
         elif not api_success: result_message += "\n БД не изменена."
 
         current_status_text, emoji, is_enabled_now = "<pre>API N/A</pre>", "⚠️", None
-        cookies = create_session(base_url, password)
-        api_clients = get_api_clients(cookies, base_url) if cookies else None
+        # Список после изменения получен в той же сессии wg-easy, что и toggle (под лимитером)
         api_client = next((c for c in api_clients if c["name"] == client_name), None) if api_clients is not None else None
 
         if api_client: is_enabled_now = api_client.get('enabled', False); emoji = "🟢" if is_enabled_now else "🔴"; current_status_text = "<b>enabled</b>" if is_enabled_now else "<b>disabled</b>"
@@ -501,70 +591,221 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         try:
             if query.message and (query.message.text != new_message_text or query.message.reply_markup != new_keyboard):
-                 logging.debug(f"Попытка редактирования сообщения для {client_name}")
+                 logging.debug("Попытка редактирования сообщения для %s", client_name)
                  await query.edit_message_text(text=new_message_text, parse_mode=constants.ParseMode.HTML, reply_markup=new_keyboard)
-                 logging.debug(f"Сообщение для {client_name} отредактировано.")
-            elif query.message: logging.info(f"Сообщение для {client_name} не изменилось, редактирование пропущено.")
+                 logging.debug("Сообщение для %s отредактировано.", client_name)
+            elif query.message: logging.info("Сообщение для %s не изменилось, редактирование пропущено.", client_name)
             else: logging.warning("Не удалось получить query.message для редактирования.")
         except TelegramError as e:
-             logging.warning(f"Не удалось отредактировать сообщение для {client_name}. Ошибка Telegram: {e!r}")
+             logging.warning("Не удалось отредактировать сообщение для %s. Ошибка Telegram: %r", client_name, e)
              # НЕ отправляем новое сообщение
         except Exception as e:
-             logging.error(f"Неизвестная ошибка при попытке редактирования сообщения {client_name}: {e!r}")
+             logging.error("Неизвестная ошибка при попытке редактирования сообщения %s: %r", client_name, e)
 
 
+# === INLINE-АВТОДОПОЛНЕНИЕ ИМЕН (@bot <префикс>) ===
+@shared_state
+@handler_timer("handle_inline_query", lambda u, c: "inline")
+async def handle_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.inline_query
+    if not is_authorized(query.from_user.id): await query.answer([], cache_time=0, is_personal=True); return
+    server_key = context.user_data.get('server_key')
+    db_path = get_db_path_for_user(context)
+    if not db_path or not ACCESS.can_use_server(query.from_user.id, server_key): await query.answer([], cache_time=0, is_personal=True); return
+    names = (await get_index_async(server_key, db_path)).prefix(query.query.strip(), limit=50)
+    results = [InlineQueryResultArticle(id=str(i), title=name, input_message_content=InputTextMessageContent(name)) for i, name in enumerate(names)]
+    await query.answer(results, cache_time=0, is_personal=True)
+
 # === ГЛОБАЛЬНЫЙ ОБРАБОТЧИК ОШИБОК ===
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
-    logging.error(f"Исключение при обработке апдейта {update}:", exc_info=context.error)
+    logging.error("Исключение при обработке апдейта %s:", update, exc_info=context.error)
+    if isinstance(context.error, RetryAfter): observe_flood_wait(context.error.retry_after)
     if isinstance(context.error, TimedOut):
         logging.warning("Таймаут Telegram API.")
         if isinstance(update, Update) and update.effective_chat:
              try:
                  if update.effective_message and update.effective_message.text: await context.bot.send_message(chat_id=update.effective_chat.id, text="⏳ Сервер Telegram не ответил. Попробуйте еще раз.")
-             except Exception as e_inner: logging.error(f"Ошибка отпр. сообщ. о таймауте: {e_inner}")
+             except Exception as e_inner: logging.error("Ошибка отпр. сообщ. о таймауте: %s", e_inner)
         return
-    if isinstance(context.error, TelegramError): logging.warning(f"Ошибка Telegram: {context.error}")
+    if isinstance(context.error, TelegramError): logging.warning("Ошибка Telegram: %s", context.error)
     if isinstance(update, Update) and update.effective_chat:
         try: await context.bot.send_message(chat_id=update.effective_chat.id, text="⚠️ Внутренняя ошибка бота.")
-        except Exception as e: logging.error(f"Ошибка отпр. сообщ. об ошибке: {e}")
+        except Exception as e: logging.error("Ошибка отпр. сообщ. об ошибке: %s", e)
 
-# === ЗАПУСК ===
-def main():
-    if not TELEGRAM_TOKEN: print("CRITICAL: Нет TELEGRAM_TOKEN"); logging.critical("Нет TOKEN"); return
-    if not ALLOWED_USERS: print("CRITICAL: Нет ALLOWED_USERS"); logging.critical("Нет ALLOWED_USERS"); return
-    if not SERVERS: print("CRITICAL: SERVERS пуст"); logging.critical("SERVERS пуст"); return
+# === ПОДПИСКА НА СОБЫТИЯ ПО ПИРАМ ===
+@shared_state
+@handler_timer("events", lambda u, c: "events")
+async def events_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/events - включить/выключить уведомления об изменениях пиров."""
+    user_id = update.effective_user.id
+    if not is_authorized(user_id): await update.message.reply_text("⛔️ Нет доступа."); return
+    if not ACCESS.is_allowed(user_id, "events"): await update.message.reply_text("⛔️ Нет прав на это действие."); return
+    subscribe = user_id not in await asyncio.to_thread(load_subscribers, EVENTS_SUBSCRIBERS_FILE)
+    try: await asyncio.to_thread(set_subscribed, EVENTS_SUBSCRIBERS_FILE, user_id, subscribe)
+    except OSError as e: logging.error("Ошибка сохранения подписки %s: %s", user_id, e); await update.message.reply_text("Не удалось сохранить подписку."); return
+    if not subscribe: await update.message.reply_text("🔕 Уведомления об изменениях пиров выключены."); return
+    note = "" if EVENTS_INTERVAL > 0 else "\n⚠️ Опрос выключен (EVENTS_INTERVAL=0)."
+    await update.message.reply_text(f"🔔 Уведомления об изменениях пиров включены. Повторная /events - выключить.{note}")
+
+# === ПЕРИОДИЧЕСКАЯ СВЕРКА ===
+async def reconcile_job(context: ContextTypes.DEFAULT_TYPE):
+    apply = RECONCILE_MODE == "apply"
+    for server_key, server in SERVERS.items():
+        db_path = os.path.join(DB_DIR, f"{server_key}.db")
+        try:
+            _plan, result = await asyncio.to_thread(reconcile_server, db_path, server["url"], DEFAULT_SESSION_PASSWORD, apply)
+            if result is not None: invalidate_name_index(server_key); await names_changed(server_key)
+        except Exception as e: logging.error("Ошибка периодической сверки %s: %s", server_key, e)
 
+# === ПЕРИОДИЧЕСКИЙ БЭКАП БД ===
+async def backup_job(context: ContextTypes.DEFAULT_TYPE):
+    # Бэкап идет в отдельном потоке мелкими шагами - обработчики не ждут
     try:
-        if not os.path.exists(DB_DIR): os.makedirs(DB_DIR); print(f"Создана директория БД: {DB_DIR}"); logging.info(f"Создана директория БД: {DB_DIR}")
-        for server_key in SERVERS.keys(): db_path_init = os.path.join(DB_DIR, f"{server_key}.db"); init_db(db_path_init)
-        logging.info("Все базы данных успешно инициализированы.")
-    except Exception as e: print(f"CRITICAL: Ошибка инициализации БД: {e}"); logging.critical(f"Ошибка инициализации БД: {e}"); return
-
-    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("telegram.vendor.ptb_urllib3.urllib3").setLevel(logging.WARNING)
-
-    app = (
+        results = await asyncio.to_thread(backup_all, DB_DIR, list(SERVERS.keys()))
+        failed = [k for k, path in results.items() if not path]
+        if failed: logging.warning("Бэкап не выполнен для: %s", ', '.join(failed))
+    except Exception as e: logging.error("Ошибка периодического бэкапа: %s", e)
+
+# === ОПРОС ПИРОВ: статистика трафика и события ===
+# Один листинг на сервер за такт: его получают и сборщик трафика, и наблюдатель событий.
+# Такт - меньший из включенных интервалов; каждый потребитель срабатывает по своему интервалу.
+WATCHERS = {}
+PEERS_INTERVAL = min([i for i in (STATS_INTERVAL, EVENTS_INTERVAL) if i > 0], default=0)
+_PEERS_LAST_RUN = {"stats": None, "events": None}
+
+def _peers_due(kind: str, interval: int, now: float) -> bool:
+    """Пора ли потребителю kind; допуск в пол-такта на дрожание JobQueue."""
+    last = _PEERS_LAST_RUN[kind]
+    if interval <= 0 or (last is not None and now - last < interval - PEERS_INTERVAL / 2): return False
+    _PEERS_LAST_RUN[kind] = now; return True
+
+async def send_events(context: ContextTypes.DEFAULT_TYPE, server_key: str, events: list, subscribers: set):
+    logging.info("События %s: %s", server_key, len(events))
+    await asyncio.to_thread(append_event_log, EVENTS_LOG, events)
+    text = format_events(events, SERVERS[server_key]["name"])
+    for user_id in subscribers:
+        if not ACCESS.is_allowed(user_id, "events", server_key): continue
+        try: await context.bot.send_message(chat_id=user_id, text=text, parse_mode=constants.ParseMode.HTML)
+        except TelegramError as e: logging.warning("Не удалось отправить события %s: %s", user_id, e)
+
+async def peers_job(context: ContextTypes.DEFAULT_TYPE):
+    now = datetime.now().timestamp()
+    stats_due, events_due = _peers_due("stats", STATS_INTERVAL, now), _peers_due("events", EVENTS_INTERVAL, now)
+    if not (stats_due or events_due): return
+    subscribers = None
+    for server_key, server in SERVERS.items():
+        try: api_clients = await asyncio.to_thread(list_clients, server["url"], DEFAULT_SESSION_PASSWORD)
+        except Exception as e: logging.error("Ошибка листинга пиров %s: %s", server_key, e); continue
+        if api_clients is None: logging.warning("Опрос пиров %s: нет данных с API, такт пропущен.", server_key); continue
+        if stats_due:
+            try: await asyncio.to_thread(collect_server, DB_DIR, server_key, api_clients)
+            except Exception as e: logging.error("Ошибка сбора статистики %s: %s", server_key, e)
+        if events_due:
+            watcher = WATCHERS.setdefault(server_key, PeerWatcher(server_key))
+            try: events = await asyncio.to_thread(watcher.diff, api_clients, now)
+            except Exception as e: logging.error("Ошибка опроса событий %s: %s", server_key, e); continue
+            if not events: continue
+            if subscribers is None: subscribers = await asyncio.to_thread(load_subscribers, EVENTS_SUBSCRIBERS_FILE)
+            await send_events(context, server_key, events, subscribers)
+
+# === ВЫБОР ЛИДЕРА (периодические задачи выполняет одна реплика) ===
+async def leader_job(context: ContextTypes.DEFAULT_TYPE):
+    await LEADER.tick()
+
+async def close_state(app: Application):
+    await STATE.close()
+
+# === ИНИЦИАЛИЗАЦИЯ БД ===
+def init_all_dbs():
+    """init_db и индекс имен для всех серверов параллельно. Ошибки только логируются: выбор сервера все равно вызывает init_db."""
+    paths = {server_key: os.path.join(DB_DIR, f"{server_key}.db") for server_key in SERVERS}
+    if not paths: return
+    def init_one(server_key):
+        try: init_db(paths[server_key]); get_index(server_key, paths[server_key]); return None
+        except Exception as e: return e
+    with ThreadPoolExecutor(max_workers=len(paths), thread_name_prefix="init-db") as pool:
+        errors = [(paths[key], error) for key, error in zip(paths, pool.map(init_one, paths)) if error]
+    for path, error in errors: logging.critical("Ошибка инициализации БД %s: %s", path, error)
+    if not errors: logging.info("Все базы данных успешно инициализированы (%.0f мс от старта).", startup.elapsed_ms())
+
+# === СБОРКА ПРИЛОЖЕНИЯ ===
+def build_application(token: str, base_url: str | None = None) -> Application:
+    """Application с зарегистрированными обработчиками (без фоновых задач). base_url - другой Bot API (стенд нагрузочного теста)."""
+    builder = (
         Application.builder()
-        .token(TELEGRAM_TOKEN)
+        .token(token)
         .connect_timeout(15.0)
         .read_timeout(30.0)
         .write_timeout(10.0)
         # .pool_timeout(30.0) # Можно раскомментировать
-        .build()
+        # Параллельные апдейты: ожидание лимитера или wg-easy одним пользователем не останавливает остальных
+        .concurrent_updates(CONCURRENT_UPDATES)
+        # Соединений к Bot API хватает на все одновременные обработчики
+        .connection_pool_size(max(CONCURRENT_UPDATES, 8))
     )
+    if base_url: builder = builder.base_url(base_url)
+    app = builder.post_shutdown(close_state).build()
 
-    main_menu_options = [ "📄 Скачать конфиг", "🇶 Запросить QR", "➕ Создать клиента", "🗑️ Удалить клиента", "⏳ Продлить срок действия", "👥 Список клиентов", "🌐 Выбрать другой сервер" ]
+    main_menu_options = [ "📄 Скачать конфиг", "🇶 Запросить QR", "➕ Создать клиента", "🗑️ Удалить клиента", "⏳ Продлить срок действия", "👥 Список клиентов", "🔄 Сверка с API", "📦 Экспорт всех", "📊 Трафик", "🌐 Выбрать другой сервер" ]
     app.add_handler(MessageHandler(filters.Regex(f"^({'|'.join(map(re.escape, main_menu_options))})$") & filters.ChatType.PRIVATE, handle_buttons))
 
     app.add_handler(CommandHandler("start", start, filters=filters.ChatType.PRIVATE))
+    app.add_handler(CommandHandler("events", events_command, filters=filters.ChatType.PRIVATE))
     app.add_handler(CallbackQueryHandler(handle_callback))
+    app.add_handler(InlineQueryHandler(handle_inline_query))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & filters.ChatType.PRIVATE, handle_message))
     app.add_error_handler(error_handler)
+    return app
+
+# === ЗАПУСК ===
+def main():
+    setup_logging()
+    if not TELEGRAM_TOKEN: print("CRITICAL: Нет TELEGRAM_TOKEN"); logging.critical("Нет TOKEN"); return
+    if not ACCESS.has_users(): print("CRITICAL: Нет ALLOWED_USERS и пользователей в ACL_FILE"); logging.critical("Нет ALLOWED_USERS и пользователей в ACL_FILE"); return
+    if not SERVERS: print("CRITICAL: SERVERS пуст"); logging.critical("SERVERS пуст"); return
+
+    try:
+        if not os.path.exists(DB_DIR): os.makedirs(DB_DIR); print(f"Создана директория БД: {DB_DIR}"); logging.info("Создана директория БД: %s", DB_DIR)
+    except OSError as e: print(f"CRITICAL: Ошибка создания директории БД: {e}"); logging.critical("Ошибка создания директории БД: %s", e); return
+    # Схемы БД проверяются в фоне и параллельно - polling их не ждет
+    threading.Thread(target=init_all_dbs, name="init-db", daemon=True).start()
 
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("telegram.vendor.ptb_urllib3.urllib3").setLevel(logging.WARNING)
+    startup.mark("логи и проверки")
+
+    app = build_application(TELEGRAM_TOKEN)
+    startup.mark("сборка приложения")
+
+    if RECONCILE_INTERVAL > 0:
+        if app.job_queue: app.job_queue.run_repeating(LEADER.only(reconcile_job), interval=RECONCILE_INTERVAL, first=RECONCILE_INTERVAL); logging.info("Периодическая сверка: каждые %s с, режим %s.", RECONCILE_INTERVAL, RECONCILE_MODE)
+        else: logging.warning("RECONCILE_INTERVAL задан, но JobQueue недоступна (нужен python-telegram-bot[job-queue]).")
+    if BACKUP_INTERVAL > 0:
+        if app.job_queue: app.job_queue.run_repeating(LEADER.only(backup_job), interval=BACKUP_INTERVAL, first=60); logging.info("Бэкап БД: каждые %s с.", BACKUP_INTERVAL)
+        else: logging.warning("BACKUP_INTERVAL задан, но JobQueue недоступна (нужен python-telegram-bot[job-queue]).")
+    if PEERS_INTERVAL > 0:
+        if app.job_queue:
+            app.job_queue.run_repeating(LEADER.only(peers_job), interval=PEERS_INTERVAL, first=5)
+            logging.info("Опрос пиров: такт %s с (статистика: %s, события: %s, журнал %s).", PEERS_INTERVAL,
+                         STATS_INTERVAL or "выкл", EVENTS_INTERVAL or "выкл", EVENTS_LOG)
+        else: logging.warning("STATS_INTERVAL/EVENTS_INTERVAL заданы, но JobQueue недоступна (нужен python-telegram-bot[job-queue]).")
+
+    if STATE.shared:
+        # Лидер выбирается до первого запуска задач (first=0); без JobQueue задачи не выполняются вовсе
+        if app.job_queue: app.job_queue.run_repeating(leader_job, interval=LEADER_TTL / 3, first=0); logging.info("Выбор лидера: реплика %s, TTL %.0f с.", LEADER.owner, LEADER_TTL)
+        if not WEBHOOK_URL: logging.warning("Общее состояние без WEBHOOK_URL: polling допускает только одну реплику бота.")
+
+    start_metrics_server()
+    startup.mark("задачи и метрики")
     logging.info("Бот запускается...")
     print("Бот запускается...")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    logging.info(startup.report()); print(startup.report())
+    if WEBHOOK_URL:
+        # Все реплики регистрируют один и тот же URL; балансировщик раздает обновления между ними
+        logging.info("Режим webhook: %s/%s, порт %s", WEBHOOK_URL.rstrip('/'), WEBHOOK_PATH, WEBHOOK_PORT)
+        app.run_webhook(listen="0.0.0.0", port=WEBHOOK_PORT, url_path=WEBHOOK_PATH, webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+                        secret_token=WEBHOOK_SECRET, allowed_updates=Update.ALL_TYPES)
+    else: app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == "__main__":
     try: from dateutil.relativedelta import relativedelta; from datetime import datetime, timedelta, time
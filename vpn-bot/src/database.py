@@ -1,13 +1,38 @@
+import time
 import sqlite3
 import logging
+import functools
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
+# Время операций отдается наблюдателю, которого подключает bot.py (metrics.observe_sqlite).
+# Без наблюдателя модуль ничего не замеряет и не зависит от prometheus_client.
+_sqlite_observer = None
+
+def set_sqlite_observer(observer):
+    """observer(operation, seconds) вызывается после каждой операции БД; None - выключить замеры."""
+    global _sqlite_observer
+    _sqlite_observer = observer
+
+def sqlite_timer(operation: str):
+    """Декоратор: время выполнения функции БД -> наблюдатель."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            observer = _sqlite_observer
+            if observer is None: return func(*args, **kwargs)
+            started = time.perf_counter()
+            try: return func(*args, **kwargs)
+            finally: observer(operation, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
 # Убираем глобальный DB_FILE
 
 # Настройка логгирования (лучше делать в основном файле, но можно и здесь для модуля)
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
+@sqlite_timer("init_db")
 def init_db(db_path: str):
     """Инициализирует БД по указанному пути, создает таблицу, если её нет."""
     try:
@@ -16,7 +41,7 @@ def init_db(db_path: str):
         db_dir = os.path.dirname(db_path)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir)
-            logging.info(f"Создана директория для БД: {db_dir}")
+            logging.info("Создана директория для БД: %s", db_dir)
 
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
@@ -32,17 +57,18 @@ def init_db(db_path: str):
         # Можно добавить индексы для ускорения поиска, если клиентов много
         # cursor.execute("CREATE INDEX IF NOT EXISTS idx_clients_name ON clients (name);")
         conn.commit()
-        logging.info(f"База данных '{db_path}' успешно инициализирована/проверена.")
+        logging.info("База данных '%s' успешно инициализирована/проверена.", db_path)
     except sqlite3.Error as e:
-        logging.error(f"Ошибка SQLite при инициализации '{db_path}': {e}")
+        logging.error("Ошибка SQLite при инициализации '%s': %s", db_path, e)
         raise  # Пробрасываем ошибку выше
     except OSError as e:
-        logging.error(f"Ошибка ОС при создании директории/файла БД '{db_path}': {e}")
+        logging.error("Ошибка ОС при создании директории/файла БД '%s': %s", db_path, e)
         raise
     finally:
         if conn:
             conn.close()
 
+@sqlite_timer("save_client")
 def save_client(db_path: str, name: str, expiry_date_str: str | None) -> bool:
     """
     Сохраняет нового клиента или заменяет существующего (из-за PRIMARY KEY).
@@ -60,10 +86,10 @@ def save_client(db_path: str, name: str, expiry_date_str: str | None) -> bool:
         cursor.execute("INSERT OR REPLACE INTO clients (name, expiry_date, status) VALUES (?, ?, ?)",
                        (name, expiry_date_str, status)) # Передаем expiry_date_str
         conn.commit()
-        logging.info(f"Клиент '{name}' сохранен/заменен в '{db_path}'. Срок: {expiry_date_str or 'не указан'}, Статус: {status}")
+        logging.info("Клиент '%s' сохранен/заменен в '%s'. Срок: %s, Статус: %s", name, db_path, expiry_date_str or 'не указан', status)
         return True
     except sqlite3.Error as e:
-        logging.error(f"Ошибка SQLite при сохранении '{name}' в '{db_path}': {e}")
+        logging.error("Ошибка SQLite при сохранении '%s' в '%s': %s", name, db_path, e)
         if conn: conn.rollback()
         return False
     finally:
@@ -71,8 +97,13 @@ def save_client(db_path: str, name: str, expiry_date_str: str | None) -> bool:
 
 
 
-def get_all_clients(db_path: str) -> list:
-    """Возвращает список кортежей (name, expiry_date, status) всех клиентов."""
+@sqlite_timer("get_all_clients")
+def get_all_clients(db_path: str, raise_errors: bool = False) -> list:
+    """
+    Возвращает список кортежей (name, expiry_date, status) всех клиентов.
+    При ошибке SQLite - пустой список, а с raise_errors=True ошибка пробрасывается
+    (сверке нужно отличать пустую БД от нечитаемой).
+    """
     clients = []
     conn = None
     try:
@@ -82,12 +113,13 @@ def get_all_clients(db_path: str) -> list:
         cursor.execute("SELECT name, expiry_date, status FROM clients ORDER BY name")
         clients = cursor.fetchall()
     except sqlite3.Error as e:
-        logging.error(f"Ошибка SQLite при получении всех клиентов из '{db_path}': {e}")
-        # Возвращаем пустой список или можно пробросить ошибку
+        logging.error("Ошибка SQLite при получении всех клиентов из '%s': %s", db_path, e)
+        if raise_errors: raise
     finally:
         if conn: conn.close()
     return clients
 
+@sqlite_timer("get_client_by_name")
 def get_client_by_name(db_path: str, name: str) -> tuple | None:
     """Возвращает кортеж (name, expiry_date, status) для клиента по имени или None."""
     row = None
@@ -99,11 +131,12 @@ def get_client_by_name(db_path: str, name: str) -> tuple | None:
         cursor.execute("SELECT name, expiry_date, status FROM clients WHERE name = ?", (name,))
         row = cursor.fetchone()
     except sqlite3.Error as e:
-        logging.error(f"Ошибка SQLite при получении '{name}' из '{db_path}': {e}")
+        logging.error("Ошибка SQLite при получении '%s' из '%s': %s", name, db_path, e)
     finally:
         if conn: conn.close()
     return row
 
+@sqlite_timer("delete_client_from_db")
 def delete_client_from_db(db_path: str, name: str) -> bool:
     """Удаляет клиента по имени. Возвращает True, если строка была удалена."""
     deleted = False
@@ -115,21 +148,22 @@ def delete_client_from_db(db_path: str, name: str) -> bool:
         conn.commit()
         # cursor.rowcount показывает количество измененных/удаленных строк
         if cursor.rowcount > 0:
-            logging.info(f"Клиент '{name}' удален из '{db_path}'.")
+            logging.info("Клиент '%s' удален из '%s'.", name, db_path)
             deleted = True
         else:
-             logging.info(f"Клиент '{name}' не найден в '{db_path}' для удаления.")
+             logging.info("Клиент '%s' не найден в '%s' для удаления.", name, db_path)
     except sqlite3.Error as e:
-        logging.error(f"Ошибка SQLite при удалении '{name}' из '{db_path}': {e}")
+        logging.error("Ошибка SQLite при удалении '%s' из '%s': %s", name, db_path, e)
         if conn: conn.rollback()
     finally:
         if conn: conn.close()
     return deleted
 
+@sqlite_timer("update_client_status")
 def update_client_status(db_path: str, name: str, status: str) -> bool:
     """Обновляет статус клиента. Возвращает True, если строка была обновлена."""
     if status not in ['enabled', 'disabled']:
-        logging.error(f"Попытка установить неверный статус '{status}' для '{name}' в '{db_path}'")
+        logging.error("Попытка установить неверный статус '%s' для '%s' в '%s'", status, name, db_path)
         return False
     updated = False
     conn = None
@@ -139,21 +173,22 @@ def update_client_status(db_path: str, name: str, status: str) -> bool:
         cursor.execute("UPDATE clients SET status = ? WHERE name = ?", (status, name))
         conn.commit()
         if cursor.rowcount > 0:
-            logging.info(f"Статус клиента '{name}' обновлен на '{status}' в '{db_path}'.")
+            logging.info("Статус клиента '%s' обновлен на '%s' в '%s'.", name, status, db_path)
             updated = True
         else:
-             logging.info(f"Клиент '{name}' не найден в '{db_path}' для обновления статуса.")
+             logging.info("Клиент '%s' не найден в '%s' для обновления статуса.", name, db_path)
     except sqlite3.Error as e:
-        logging.error(f"Ошибка SQLite при обновлении статуса '{name}' в '{db_path}': {e}")
+        logging.error("Ошибка SQLite при обновлении статуса '%s' в '%s': %s", name, db_path, e)
         if conn: conn.rollback()
     finally:
         if conn: conn.close()
     return updated
 
+@sqlite_timer("extend_client")
 def extend_client(db_path: str, name: str, months: int) -> bool:
     """Продлевает срок действия клиента. Возвращает True при успехе."""
     if not isinstance(months, int) or months <= 0:
-        logging.error(f"Некорректный срок продления '{months}' для {name} в {db_path}")
+        logging.error("Некорректный срок продления '%s' для %s в %s", months, name, db_path)
         return False
 
     conn = None
@@ -174,27 +209,28 @@ def extend_client(db_path: str, name: str, months: int) -> bool:
                 cursor.execute("UPDATE clients SET expiry_date = ? WHERE name = ?", (new_expiry_str, name))
                 conn.commit()
                 if cursor.rowcount > 0:
-                    logging.info(f"Срок клиента '{name}' в '{db_path}' продлен до '{new_expiry_str}'.")
+                    logging.info("Срок клиента '%s' в '%s' продлен до '%s'.", name, db_path, new_expiry_str)
                     success = True
                 else:
                     # Это не должно произойти, если select прошел успешно, но на всякий случай
-                    logging.warning(f"Не удалось обновить срок для '{name}' в '{db_path}' после SELECT.")
+                    logging.warning("Не удалось обновить срок для '%s' в '%s' после SELECT.", name, db_path)
             except ValueError as date_err:
-                logging.error(f"Не удалось распарсить дату '{row[0]}' для '{name}' в '{db_path}': {date_err}")
+                logging.error("Не удалось распарсить дату '%s' для '%s' в '%s': %s", row[0], name, db_path, date_err)
             except Exception as calc_err:
-                 logging.error(f"Не удалось рассчитать новую дату для '{name}' в '{db_path}': {calc_err}")
+                 logging.error("Не удалось рассчитать новую дату для '%s' в '%s': %s", name, db_path, calc_err)
         elif row:
-             logging.warning(f"У клиента '{name}' в '{db_path}' пустая дата (expiry_date is NULL). Продление невозможно.")
+             logging.warning("У клиента '%s' в '%s' пустая дата (expiry_date is NULL). Продление невозможно.", name, db_path)
         else:
-            logging.warning(f"Клиент '{name}' не найден в '{db_path}' для продления.")
+            logging.warning("Клиент '%s' не найден в '%s' для продления.", name, db_path)
     except sqlite3.Error as e:
-        logging.error(f"Ошибка SQLite при продлении '{name}' в '{db_path}': {e}")
+        logging.error("Ошибка SQLite при продлении '%s' в '%s': %s", name, db_path, e)
         if conn: conn.rollback()
     finally:
         if conn: conn.close()
     return success
 
 # Функция get_expired_clients() также должна принимать db_path, если она используется
+@sqlite_timer("get_expired_clients")
 def get_expired_clients(db_path: str) -> list:
     """Возвращает список имен клиентов с истекшим сроком."""
     expired = []
@@ -208,7 +244,72 @@ def get_expired_clients(db_path: str) -> list:
         rows = cursor.fetchall()
         expired = [row[0] for row in rows]
     except sqlite3.Error as e:
-        logging.error(f"Ошибка SQLite при поиске истекших клиентов в '{db_path}': {e}")
+        logging.error("Ошибка SQLite при поиске истекших клиентов в '%s': %s", db_path, e)
     finally:
         if conn: conn.close()
     return expired
+
+# === ПАКЕТНЫЕ ОПЕРАЦИИ (одно соединение и одна транзакция на пакет) ===
+@sqlite_timer("save_clients_bulk")
+def save_clients_bulk(db_path: str, rows: list) -> int:
+    """
+    Сохраняет пачку клиентов. rows - список кортежей (name, expiry_date, status).
+    Существующие строки не перезаписываются (INSERT OR IGNORE). Возвращает число вставленных строк.
+    """
+    if not rows: return 0
+    conn = None
+    inserted = 0
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.executemany("INSERT OR IGNORE INTO clients (name, expiry_date, status) VALUES (?, ?, ?)", rows)
+        conn.commit()
+        inserted = cursor.rowcount
+        logging.info("Пакетно сохранено %s из %s клиентов в '%s'.", inserted, len(rows), db_path)
+    except sqlite3.Error as e:
+        logging.error("Ошибка SQLite при пакетном сохранении в '%s': %s", db_path, e)
+        if conn: conn.rollback()
+    finally:
+        if conn: conn.close()
+    return inserted
+
+@sqlite_timer("update_client_statuses_bulk")
+def update_client_statuses_bulk(db_path: str, updates: list) -> int:
+    """Пакетно обновляет статусы. updates - список кортежей (status, name). Возвращает число обновленных строк."""
+    updates = [(status, name) for status, name in updates if status in ('enabled', 'disabled')]
+    if not updates: return 0
+    conn = None
+    updated = 0
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.executemany("UPDATE clients SET status = ? WHERE name = ?", updates)
+        conn.commit()
+        updated = cursor.rowcount
+        logging.info("Пакетно обновлены статусы %s клиентов в '%s'.", updated, db_path)
+    except sqlite3.Error as e:
+        logging.error("Ошибка SQLite при пакетном обновлении статусов в '%s': %s", db_path, e)
+        if conn: conn.rollback()
+    finally:
+        if conn: conn.close()
+    return updated
+
+@sqlite_timer("delete_clients_bulk")
+def delete_clients_bulk(db_path: str, names: list) -> int:
+    """Пакетно удаляет клиентов по именам. Возвращает число удаленных строк."""
+    if not names: return 0
+    conn = None
+    deleted = 0
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM clients WHERE name = ?", [(name,) for name in names])
+        conn.commit()
+        deleted = cursor.rowcount
+        logging.info("Пакетно удалено %s клиентов из '%s'.", deleted, db_path)
+    except sqlite3.Error as e:
+        logging.error("Ошибка SQLite при пакетном удалении из '%s': %s", db_path, e)
+        if conn: conn.rollback()
+    finally:
+        if conn: conn.close()
+    return deleted
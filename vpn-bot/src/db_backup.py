@@ -0,0 +1,185 @@
+"""
+Онлайн-бэкап SQLite-баз серверов (db/<server>.db) без остановки бота.
+
+Копия снимается через SQLite backup API небольшими порциями страниц: блокировка
+источника держится только на время одного шага, между шагами делается пауза,
+поэтому обработчики, пишущие в БД, не простаивают. Снимок затем проверяется
+(PRAGMA integrity_check), сжимается gzip потоково и сопровождается sha256.
+
+Файлы: <BACKUP_DIR>/<server>-<YYYYmmddTHHMMSSZ>.db.gz и рядом .sha256.
+Ротация: хранится не больше BACKUP_KEEP снимков на сервер и не старше BACKUP_MAX_AGE_DAYS.
+
+Восстановление на момент времени: берется последний снимок не позже указанного
+времени, сверяется контрольная сумма и содержимое заливается в рабочую БД тем же
+backup API (атомарно для других соединений).
+
+CLI (внутри контейнера):
+  python3 src/db_backup.py backup [server_key ...]
+  python3 src/db_backup.py list <server_key>
+  python3 src/db_backup.py restore <server_key> [YYYY-mm-ddTHH:MM:SS]
+"""
+import os
+import sys
+import gzip
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", os.path.join(os.getenv("DB_DIR", "db"), "backups"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "14") or 14)
+BACKUP_MAX_AGE_DAYS = int(os.getenv("BACKUP_MAX_AGE_DAYS", "30") or 30)
+# Страниц за шаг и пауза между шагами (секунды) - чем меньше шаг, тем короче блокировка
+BACKUP_STEP_PAGES = int(os.getenv("BACKUP_STEP_PAGES", "64") or 64)
+BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", "0.005") or 0.005)
+
+STAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+CHUNK_SIZE = 1024 * 1024
+
+
+def _step_pause(status, remaining, total):
+    # Вызывается между шагами backup: отпускаем источник, давая писателям пройти
+    if remaining: time.sleep(BACKUP_STEP_SLEEP)
+
+
+def _online_copy(src_path: str, dst_path: str, pages: int = BACKUP_STEP_PAGES):
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        with dst: src.backup(dst, pages=pages, progress=_step_pause)
+    finally:
+        dst.close(); src.close()
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""): digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_snapshots(server_key: str, backup_dir: str = BACKUP_DIR) -> list:
+    """Возвращает [(datetime UTC, путь к .db.gz)] по возрастанию времени."""
+    if not os.path.isdir(backup_dir): return []
+    prefix = f"{server_key}-"
+    snapshots = []
+    for fname in os.listdir(backup_dir):
+        if not (fname.startswith(prefix) and fname.endswith(".db.gz")): continue
+        stamp = fname[len(prefix):-len(".db.gz")]
+        try: taken_at = datetime.strptime(stamp, STAMP_FORMAT).replace(tzinfo=timezone.utc)
+        except ValueError: continue
+        snapshots.append((taken_at, os.path.join(backup_dir, fname)))
+    return sorted(snapshots)
+
+
+def backup_db(db_path: str, server_key: str, backup_dir: str = BACKUP_DIR) -> str | None:
+    """Снимает сжатый проверенный снимок одной БД. Возвращает путь к снимку или None."""
+    if not os.path.exists(db_path): logging.warning("Бэкап пропущен: нет файла '%s'.", db_path); return None
+    os.makedirs(backup_dir, exist_ok=True)
+    taken_at = datetime.now(timezone.utc)
+    target = os.path.join(backup_dir, f"{server_key}-{taken_at.strftime(STAMP_FORMAT)}.db.gz")
+    fd, tmp_db = tempfile.mkstemp(prefix=f".{server_key}-", suffix=".db", dir=backup_dir); os.close(fd)
+    tmp_gz = target + ".part"
+    started = time.monotonic()
+    try:
+        _online_copy(db_path, tmp_db)
+        check = sqlite3.connect(tmp_db)
+        try: result = check.execute("PRAGMA integrity_check").fetchone()[0]
+        finally: check.close()
+        if result != "ok": logging.error("Снимок '%s' не прошел integrity_check: %s", db_path, result); return None
+
+        with open(tmp_db, "rb") as raw, gzip.open(tmp_gz, "wb", compresslevel=6) as gz: shutil.copyfileobj(raw, gz, CHUNK_SIZE)
+        checksum = _sha256_file(tmp_gz)
+        os.replace(tmp_gz, target)
+        with open(target + ".sha256", "w") as f: f.write(f"{checksum}  {os.path.basename(target)}\n")
+        logging.info("Бэкап '%s' -> '%s' (%s байт, %.2f с).", db_path, target, os.path.getsize(target), time.monotonic() - started)
+        return target
+    except (sqlite3.Error, OSError) as e:
+        logging.error("Ошибка бэкапа '%s': %s", db_path, e)
+        return None
+    finally:
+        for path in (tmp_db, tmp_gz):
+            try: os.remove(path)
+            except OSError: pass
+
+
+def prune_snapshots(server_key: str, backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP, max_age_days: int = BACKUP_MAX_AGE_DAYS) -> int:
+    """Удаляет снимки сверх keep и старше max_age_days (самый свежий остается всегда). Возвращает число удаленных."""
+    snapshots = list_snapshots(server_key, backup_dir)
+    if len(snapshots) <= 1: return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days) if max_age_days > 0 else None
+    removed = 0
+    for idx, (taken_at, path) in enumerate(snapshots[:-1]):
+        too_many = keep > 0 and idx < len(snapshots) - keep
+        too_old = cutoff is not None and taken_at < cutoff
+        if not (too_many or too_old): continue
+        for p in (path, path + ".sha256"):
+            try: os.remove(p)
+            except OSError: pass
+        removed += 1
+    if removed: logging.info("Ротация бэкапов %s: удалено %s.", server_key, removed)
+    return removed
+
+
+def verify_snapshot(path: str) -> bool:
+    """Сверяет sha256 снимка с сохраненной суммой."""
+    try:
+        with open(path + ".sha256") as f: expected = f.read().split()[0]
+    except (OSError, IndexError): logging.error("Нет контрольной суммы для '%s'.", path); return False
+    actual = _sha256_file(path)
+    if actual != expected: logging.error("Контрольная сумма '%s' не совпадает: %s != %s", path, actual, expected); return False
+    return True
+
+
+def restore_db(db_path: str, server_key: str, at: datetime | None = None, backup_dir: str = BACKUP_DIR) -> str | None:
+    """Восстанавливает БД из последнего снимка не позже at (UTC; None - самый свежий). Возвращает путь снимка."""
+    snapshots = list_snapshots(server_key, backup_dir)
+    if at is not None:
+        if at.tzinfo is None: at = at.replace(tzinfo=timezone.utc)
+        snapshots = [s for s in snapshots if s[0] <= at]
+    if not snapshots: logging.error("Нет снимков %s для восстановления (момент: %s).", server_key, at); return None
+    taken_at, path = snapshots[-1]
+    if not verify_snapshot(path): return None
+
+    fd, tmp_db = tempfile.mkstemp(prefix=f".restore-{server_key}-", suffix=".db", dir=backup_dir); os.close(fd)
+    try:
+        with gzip.open(path, "rb") as gz, open(tmp_db, "wb") as raw: shutil.copyfileobj(gz, raw, CHUNK_SIZE)
+        # Целиком за один шаг: восстановление должно быть атомарным для читателей
+        _online_copy(tmp_db, db_path, pages=-1)
+        logging.info("БД '%s' восстановлена из '%s' (снимок %s).", db_path, path, taken_at.isoformat())
+        return path
+    except (sqlite3.Error, OSError) as e:
+        logging.error("Ошибка восстановления '%s' из '%s': %s", db_path, path, e)
+        return None
+    finally:
+        try: os.remove(tmp_db)
+        except OSError: pass
+
+
+def backup_all(db_dir: str, server_keys, backup_dir: str = BACKUP_DIR) -> dict:
+    """Бэкап + ротация для всех серверов. Возвращает {server_key: путь или None}."""
+    results = {}
+    for server_key in server_keys:
+        results[server_key] = backup_db(os.path.join(db_dir, f"{server_key}.db"), server_key, backup_dir)
+        prune_snapshots(server_key, backup_dir)
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+    db_dir = os.getenv("DB_DIR", "db")
+    args = sys.argv[1:]
+    if not args or args[0] not in ("backup", "list", "restore"): print(__doc__); sys.exit(2)
+    command, rest = args[0], args[1:]
+    if command == "backup":
+        keys = rest or [f[:-3] for f in sorted(os.listdir(db_dir)) if f.endswith(".db")]
+        sys.exit(0 if all(backup_all(db_dir, keys).values()) else 1)
+    if not rest: print("Укажите server_key."); sys.exit(2)
+    if command == "list":
+        for taken_at, path in list_snapshots(rest[0]): print(f"{taken_at.isoformat()}  {os.path.getsize(path):>10}  {path}")
+        sys.exit(0)
+    at = datetime.fromisoformat(rest[1]) if len(rest) > 1 else None
+    sys.exit(0 if restore_db(os.path.join(db_dir, f"{rest[0]}.db"), rest[0], at) else 1)
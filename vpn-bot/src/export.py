@@ -0,0 +1,127 @@
+"""
+Массовый экспорт конфигураций всех клиентов сервера в zip-архив.
+
+Вместо N отдельных get_api_config_and_qr (N логинов + N листингов) делается
+один логин и один листинг, после чего конфиги (и, по желанию, QR) скачиваются
+параллельно ограниченным пулом потоков. Готовые записи сразу пишутся в zip на
+диске, в памяти одновременно держится не больше окна из EXPORT_CONCURRENCY * 2
+результатов - архив целиком в память не загружается.
+
+Состав архива:
+  configs/<name>.conf  - конфигурации WireGuard
+  qr/<name>.png        - QR-коды (если запрошены)
+  manifest.json        - записи БД (срок, статус) + данные API, список ошибок
+"""
+import os
+import json
+import logging
+import zipfile
+import tempfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from database import get_all_clients
+from wg_api import (
+    create_session,
+    get_api_clients,
+    get_api_client_configuration,
+    get_api_qr_code_svg,
+    svg_to_png,
+)
+
+EXPORT_CONCURRENCY = max(1, int(os.getenv("EXPORT_CONCURRENCY", "8") or 8))
+# Каталог для архивов (например, смонтированный ./shared). Пусто - только отправка в Telegram
+EXPORT_DIR = os.getenv("EXPORT_DIR", "")
+# Лимит Bot API на отправку документа - 50 МБ
+TELEGRAM_DOCUMENT_LIMIT = 50 * 1024 * 1024
+
+
+def _safe_filename(name: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name) or "client"
+
+
+def _fetch_one(client: dict, cookies, base_url: str, include_qr: bool):
+    """Скачивает конфиг (и QR) одного клиента. Выполняется в потоке пула."""
+    client_id = client["id"]
+    config = get_api_client_configuration(client_id, cookies, base_url)
+    qr_png = None
+    if include_qr:
+        qr_svg = get_api_qr_code_svg(client_id, cookies, base_url)
+        if qr_svg:
+            try: qr_png = svg_to_png(qr_svg)
+            except Exception as e: logging.error("Ошибка SVG->PNG при экспорте %s: %s", client['name'], e)
+    return client, config, qr_png
+
+
+def export_server_zip(db_path: str, base_url: str, password: str, server_key: str,
+                      include_qr: bool = False, out_dir: str | None = None) -> tuple[str | None, dict]:
+    """
+    Собирает архив на диске. Возвращает (путь к zip, сводка) или (None, сводка с 'error').
+    out_dir - куда положить архив; по умолчанию EXPORT_DIR, а если он пуст - временный каталог.
+    """
+    summary = {"server": server_key, "total": 0, "configs": 0, "qr": 0, "failed": []}
+    cookies = create_session(base_url, password)
+    if not cookies: summary["error"] = "Не удалось создать сессию."; return None, summary
+    api_clients = get_api_clients(cookies, base_url)
+    if api_clients is None: summary["error"] = "Не удалось получить список клиентов."; return None, summary
+    summary["total"] = len(api_clients)
+
+    db_rows = {name: {"expiry_date": expiry, "status": status} for name, expiry, status in get_all_clients(db_path)}
+
+    target_dir = out_dir or EXPORT_DIR or tempfile.mkdtemp(prefix="vpn-export-")
+    os.makedirs(target_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    zip_path = os.path.join(target_dir, f"{server_key}-clients-{stamp}.zip")
+    manifest_clients = []
+    used_names = set()
+
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf, \
+         ThreadPoolExecutor(max_workers=EXPORT_CONCURRENCY, thread_name_prefix="export") as pool:
+
+        def write_result(client, config, qr_png):
+            name = client["name"]
+            base = _safe_filename(name)
+            # Разные имена могут дать одинаковый "безопасный" вариант
+            if base in used_names: base = f"{base}_{client['id']}"
+            used_names.add(base)
+            entry = {"name": name, "id": client["id"], "address": client.get("address"),
+                     "enabled": client.get("enabled", True), "db": db_rows.get(name), "files": []}
+            if config is not None:
+                zf.writestr(f"configs/{base}.conf", config); summary["configs"] += 1; entry["files"].append(f"configs/{base}.conf")
+            else: summary["failed"].append(name)
+            if qr_png is not None:
+                zf.writestr(f"qr/{base}.png", qr_png); summary["qr"] += 1; entry["files"].append(f"qr/{base}.png")
+            manifest_clients.append(entry)
+
+        # Окно незавершенных задач ограничено, чтобы не держать в памяти все ответы сразу
+        pending = set()
+        window = EXPORT_CONCURRENCY * 2
+        for client in api_clients:
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done: write_result(*fut.result())
+            pending.add(pool.submit(_fetch_one, client, cookies, base_url, include_qr))
+        for fut in pending: write_result(*fut.result())
+
+        manifest = {
+            "server": server_key,
+            "base_url": base_url,
+            "exported_at": datetime.now().isoformat(timespec="seconds"),
+            "include_qr": include_qr,
+            "clients": sorted(manifest_clients, key=lambda c: c["name"]),
+            "db_only": sorted(set(db_rows) - {c["name"] for c in api_clients}),
+            "failed": sorted(summary["failed"]),
+        }
+        with zf.open("manifest.json", "w") as mf: mf.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    summary["size"] = os.path.getsize(zip_path)
+    logging.info("Экспорт %s: %s/%s конфигов, %s QR, %s байт -> %s", server_key, summary['configs'], summary['total'], summary['qr'], summary['size'], zip_path)
+    return zip_path, summary
+
+
+def format_summary(summary: dict) -> str:
+    if summary.get("error"): return f"Ошибка экспорта: {summary['error']}"
+    text = f"📦 Экспорт {summary['server']}: конфигов {summary['configs']}/{summary['total']}"
+    if summary["qr"]: text += f", QR {summary['qr']}"
+    if summary["failed"]: text += f"\n⚠️ Без конфига: {', '.join(summary['failed'][:20])}"
+    return text
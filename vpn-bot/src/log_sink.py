@@ -0,0 +1,144 @@
+"""
+Неблокирующий вывод логов через очередь и фоновый поток.
+
+Обработчик корневого логгера только кладет LogRecord в очередь: сообщение
+(record.getMessage(), т.е. подстановка %-аргументов) и JSON собираются в потоке
+записи, который пишет в stdout пачками. Цикл событий Telegram не ждет ни
+форматирования, ни записи.
+
+При переполнении очереди запись отбрасывается и считается (метрика
+vpnbot_log_records_dropped_total), писатель сообщает о потерях отдельной строкой.
+Уровни можно прореживать: LOG_SAMPLE="DEBUG=0.1,INFO=0.5" оставит 10% DEBUG и 50% INFO
+(WARNING и выше по умолчанию не прореживаются). То же имя и формат у vpn-bot.backup.
+Некорректные элементы LOG_SAMPLE пропускаются с предупреждением в лог.
+
+Настройки: LOG_FORMAT (json | text), LOG_LEVEL (INFO), LOG_QUEUE_SIZE (10000), LOG_SAMPLE.
+"""
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from metrics import LOG_RECORDS_DROPPED
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000") or 10000)
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_INTERVAL = 0.5
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_STOP = object()
+
+
+def parse_sample_rates(value: str) -> dict:
+    """"DEBUG=0.1,INFO=0.5" -> {10: 0.1, 20: 0.5}. Некорректные элементы пропускаются с предупреждением."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, rate = item.partition("=")
+        level = logging.getLevelName(name.strip().upper())
+        try: share = float(rate)
+        except ValueError: share = None
+        if not isinstance(level, int) or share is None or share != share:
+            logging.warning("LOG_SAMPLE: пропущен элемент '%s' (ожидается УРОВЕНЬ=доля, например INFO=0.5).", item); continue
+        rates[level] = min(1.0, max(0.0, share))
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна JSON-строка."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info: entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class QueueLogHandler(logging.Handler):
+    """Обработчик, который только ставит запись в очередь; запись - в фоновом потоке."""
+
+    def __init__(self, formatter: logging.Formatter, stream=None, max_queue: int = LOG_QUEUE_SIZE,
+                 sample_rates: dict | None = None, batch_size: int = LOG_BATCH_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL):
+        super().__init__()
+        self.setFormatter(formatter)
+        self.stream = stream or sys.stdout
+        self.sample_rates = sample_rates or {}
+        self.batch_size, self.flush_interval = batch_size, flush_interval
+        self.dropped = 0
+        self.sampled_out = 0
+        self._reported_drops = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord):
+        rate = self.sample_rates.get(record.levelno, 1.0)
+        if rate < 1.0 and random.random() >= rate: self.sampled_out += 1; return
+        # Исключение форматируется сразу: traceback ссылается на кадры, которые к записи уже изменятся
+        if record.exc_info and not record.exc_text: record.exc_text = self.formatter.formatException(record.exc_info)
+        try: self._queue.put_nowait(record)
+        except queue.Full: self.dropped += 1; LOG_RECORDS_DROPPED.inc()
+
+    def close(self):
+        try: self._queue.put(_STOP, timeout=5)
+        except queue.Full: pass
+        self._thread.join(5)
+        super().close()
+
+    def _write(self, batch: list):
+        lines = []
+        for record in batch:
+            try: lines.append(self.format(record))
+            except Exception: self.handleError(record)
+        if self.dropped != self._reported_drops:
+            lost, self._reported_drops = self.dropped - self._reported_drops, self.dropped
+            warning = logging.LogRecord("log_sink", logging.WARNING, __file__, 0, "Отброшено записей лога: %s (всего %s)", (lost, self.dropped), None)
+            lines.append(self.format(warning))
+        if not lines: return
+        try: self.stream.write("\n".join(lines) + "\n"); self.stream.flush()
+        except (OSError, ValueError): pass
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0: break
+                try: record = self._queue.get(timeout=timeout)
+                except queue.Empty: break
+                if record is _STOP: stopping = True; break
+                batch.append(record)
+            if stopping:
+                # Дописываем все, что осталось в очереди
+                while True:
+                    try: record = self._queue.get_nowait()
+                    except queue.Empty: break
+                    if record is not _STOP: batch.append(record)
+            self._write(batch)
+
+
+def setup_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT) -> QueueLogHandler:
+    """Заменяет обработчики корневого логгера на очередь с фоновой записью."""
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    handler = QueueLogHandler(formatter)
+    root = logging.getLogger()
+    for old in root.handlers[:]: root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+    # Разбор после подключения обработчика - предупреждения о LOG_SAMPLE идут в тот же лог
+    handler.sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE", ""))
+    atexit.register(handler.close)
+    return handler
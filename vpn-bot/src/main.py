@@ -5,16 +5,22 @@ Sets up environment and launches bot.
 """
 import sys
 
-# Import and run environment adapter first
+# Startup trace first: stdlib only, marks the beginning of cold start
+import startup
+
+# Configure environment before the bot reads it
 try:
     import env_adapter
+    env_adapter.configure()
 except Exception as e:
     print(f"ERROR: Failed to configure environment: {e}", file=sys.stderr)
     sys.exit(1)
+startup.mark("env")
 
 # Now import and run the bot
 try:
     import bot
+    startup.mark("импорт bot")
     bot.main()  # Call the main function
 except Exception as e:
     print(f"ERROR: Failed to start bot: {e}", file=sys.stderr)
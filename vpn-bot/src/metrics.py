@@ -0,0 +1,87 @@
+"""
+Метрики Prometheus для vpn-bot.
+
+Эндпоинт http://<контейнер>:METRICS_PORT/metrics (по умолчанию 9108, 0 - выключен).
+Собираются:
+  vpnbot_handler_duration_seconds{handler, action}             - задержка обработчиков Telegram
+  vpnbot_wg_api_request_duration_seconds{method, endpoint}     - задержка запросов к wg-easy
+  vpnbot_wg_api_requests_total{method, endpoint, status}       - запросы к wg-easy по статусу
+  vpnbot_sqlite_operation_duration_seconds{operation}          - время операций SQLite
+  vpnbot_telegram_retries_total{method}                        - повторные отправки в Telegram
+  vpnbot_telegram_flood_waits_total / _flood_wait_seconds_total - ограничения RetryAfter
+  vpnbot_log_records_dropped_total                             - записи лога, отброшенные при переполнении очереди
+  vpnbot_wg_mutations_queued{server}                           - изменяющие запросы к wg-easy в очереди лимитера
+  vpnbot_wg_mutation_wait_seconds{server}                      - ожидание в очереди лимитера
+  vpnbot_wg_mutations_rejected_total{server}                   - запросы, отклоненные из-за полной очереди
+"""
+import os
+import re
+import time
+import logging
+import functools
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108") or 0)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_SQLITE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+HANDLER_DURATION = Histogram("vpnbot_handler_duration_seconds", "Telegram handler latency", ["handler", "action"], buckets=_LATENCY_BUCKETS)
+WG_API_DURATION = Histogram("vpnbot_wg_api_request_duration_seconds", "wg-easy API request latency", ["method", "endpoint"], buckets=_LATENCY_BUCKETS)
+WG_API_REQUESTS = Counter("vpnbot_wg_api_requests_total", "wg-easy API requests by status", ["method", "endpoint", "status"])
+SQLITE_DURATION = Histogram("vpnbot_sqlite_operation_duration_seconds", "SQLite operation latency", ["operation"], buckets=_SQLITE_BUCKETS)
+TELEGRAM_RETRIES = Counter("vpnbot_telegram_retries_total", "Telegram sends retried after an error", ["method"])
+TELEGRAM_FLOOD_WAITS = Counter("vpnbot_telegram_flood_waits_total", "Telegram RetryAfter (flood control) responses")
+TELEGRAM_FLOOD_WAIT_SECONDS = Counter("vpnbot_telegram_flood_wait_seconds_total", "Seconds requested by Telegram flood control")
+LOG_RECORDS_DROPPED = Counter("vpnbot_log_records_dropped_total", "Log records dropped because the log queue was full")
+WG_MUTATIONS_QUEUED = Gauge("vpnbot_wg_mutations_queued", "wg-easy mutations waiting for a rate limit token", ["server"])
+WG_MUTATION_WAIT = Histogram("vpnbot_wg_mutation_wait_seconds", "Time wg-easy mutations spent in the rate limit queue", ["server"], buckets=_LATENCY_BUCKETS)
+WG_MUTATIONS_REJECTED = Counter("vpnbot_wg_mutations_rejected_total", "wg-easy mutations rejected because the queue was full", ["server"])
+
+# id клиента в пути заменяется шаблоном, чтобы не плодить серии
+_CLIENT_ID_RE = re.compile(r"(/api/wireguard/client/)[^/]+")
+
+
+def start_metrics_server():
+    if METRICS_PORT <= 0: return
+    try: start_http_server(METRICS_PORT); logging.info("Метрики Prometheus: :%s/metrics", METRICS_PORT)
+    except OSError as e: logging.error("Не удалось запустить сервер метрик на порту %s: %s", METRICS_PORT, e)
+
+
+def endpoint_label(url: str) -> str:
+    path = url.split("://", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else "/"
+    return _CLIENT_ID_RE.sub(r"\1{id}", path.split("?", 1)[0])
+
+
+def observe_wg_api(method: str, url: str, started: float, status):
+    endpoint = endpoint_label(url)
+    WG_API_DURATION.labels(method, endpoint).observe(time.perf_counter() - started)
+    WG_API_REQUESTS.labels(method, endpoint, str(status)).inc()
+
+
+def observe_sqlite(operation: str, seconds: float):
+    """Наблюдатель для database.set_sqlite_observer."""
+    SQLITE_DURATION.labels(operation).observe(seconds)
+
+
+def handler_timer(handler: str, action_of=None):
+    """Декоратор async-обработчика: задержка по (handler, action). action_of(update, context) -> str."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(update, context, *args, **kwargs):
+            try: action = (action_of(update, context) if action_of else None) or "none"
+            except Exception: action = "unknown"
+            started = time.perf_counter()
+            try: return await func(update, context, *args, **kwargs)
+            finally: HANDLER_DURATION.labels(handler, action).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def observe_flood_wait(retry_after):
+    seconds = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after or 0)
+    TELEGRAM_FLOOD_WAITS.inc()
+    TELEGRAM_FLOOD_WAIT_SECONDS.inc(seconds)
+    return seconds
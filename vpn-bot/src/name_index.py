@@ -0,0 +1,122 @@
+"""
+Индекс имен клиентов в памяти (по серверу) для быстрых проверок и автодополнения.
+
+Имена хранятся в отсортированном массиве пар (имя в нижнем регистре, имя),
+поиск по префиксу - два bisect, проверка существования - множество. Индекс строится один
+раз из get_all_clients (при старте, в потоке init_all_dbs, а после сброса - в
+потоке через get_index_async, не блокируя event loop) и дальше обновляется
+точечно при создании/удалении, поэтому опечатка в имени отсекается без логина
+и листинга на wg-easy.
+"""
+import asyncio
+import bisect
+import difflib
+import logging
+import sys
+import threading
+
+from database import get_all_clients
+
+
+def _successor(key: str) -> str:
+    """Наименьшая строка больше всех строк с префиксом key (символы вне BMP, эмодзи, тоже учитываются)."""
+    last = ord(key[-1])
+    if last == sys.maxunicode: return _successor(key[:-1]) if len(key) > 1 else chr(sys.maxunicode) * 2
+    return key[:-1] + chr(last + 1)
+
+
+class NameIndex:
+    """Отсортированный индекс имен одного сервера. Потокобезопасен."""
+
+    def __init__(self, names=()):
+        self._lock = threading.Lock()
+        self._names = set()   # точные имена для contains()
+        self._keys = []       # отсортированные пары (lower(name), name)
+        self.build(names)
+
+    def build(self, names):
+        unique = {name for name in names if name}
+        keys = sorted((name.lower(), name) for name in unique)
+        with self._lock:
+            self._names = unique
+            self._keys = keys
+
+    def add(self, name: str):
+        with self._lock:
+            if name in self._names: return
+            self._names.add(name)
+            bisect.insort(self._keys, (name.lower(), name))
+
+    def remove(self, name: str):
+        entry = (name.lower(), name)
+        with self._lock:
+            if name not in self._names: return
+            self._names.discard(name)
+            pos = bisect.bisect_left(self._keys, entry)
+            if pos < len(self._keys) and self._keys[pos] == entry: del self._keys[pos]
+
+    def contains(self, name: str) -> bool:
+        """Точное совпадение (с учетом регистра, как в БД и на API)."""
+        return name in self._names
+
+    def prefix(self, text: str, limit: int = 20) -> list:
+        """Имена, начинающиеся с text (без учета регистра), по алфавиту."""
+        key = text.lower()
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, (key,))
+            hi = bisect.bisect_left(self._keys, (_successor(key),)) if key else len(self._keys)
+            return [name for _key, name in self._keys[lo:min(hi, lo + limit)]]
+
+    def suggest(self, text: str, limit: int = 5) -> list:
+        """Похожие имена для опечаток: сначала по префиксу, затем нечетко."""
+        found = self.prefix(text, limit)
+        if len(found) < limit:
+            with self._lock: names = list(self._names)
+            for name in difflib.get_close_matches(text, names, n=limit, cutoff=0.6):
+                if name not in found: found.append(name)
+        return found[:limit]
+
+    def __len__(self):
+        return len(self._names)
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+# Версия имен сервера в общем хранилище (state.py), по которой построен локальный индекс
+_GENERATIONS = {}
+
+
+def get_index(server_key: str, db_path: str) -> NameIndex:
+    """Индекс сервера; при первом обращении строится из БД."""
+    index = _INDEXES.get(server_key)
+    if index is not None: return index
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(server_key)
+        if index is None:
+            index = NameIndex(name for name, _expiry, _status in get_all_clients(db_path))
+            _INDEXES[server_key] = index
+            logging.info("Индекс имен %s: %s клиентов.", server_key, len(index))
+    return index
+
+
+async def get_index_async(server_key: str, db_path: str) -> NameIndex:
+    """get_index для обработчиков: если индекс нужно строить, чтение БД идет в потоке."""
+    index = _INDEXES.get(server_key)
+    if index is not None: return index
+    return await asyncio.to_thread(get_index, server_key, db_path)
+
+
+def invalidate(server_key: str):
+    """Сбрасывает индекс сервера (после массовых изменений БД), он перестроится при следующем обращении."""
+    with _INDEXES_LOCK: _INDEXES.pop(server_key, None)
+
+
+def sync_generation(server_key: str, generation: int):
+    """Сбрасывает индекс, если имена сервера изменила другая реплика (версия в хранилище другая)."""
+    with _INDEXES_LOCK:
+        if _GENERATIONS.get(server_key) != generation: _INDEXES.pop(server_key, None); _GENERATIONS[server_key] = generation
+
+
+def mark_generation(server_key: str, generation: int):
+    """Локальный индекс уже учитывает свое изменение, ставшее версией generation."""
+    with _INDEXES_LOCK: _GENERATIONS[server_key] = generation
@@ -0,0 +1,147 @@
+"""
+Поток событий по пирам wg-easy: периодический листинг и рассылка только изменений.
+
+Листинг снимает общий такт опроса пиров в bot.py (один на сервер, его же получает
+сборщик трафика traffic.py). Наблюдатель хранит для каждого пира кортеж значимых полей
+(имя, enabled, был ли handshake) и сырую строку latestHandshakeAt. Новый листинг
+сравнивается с прошлым по этим кортежам: события строятся только для пиров, у которых
+поля изменились, которые появились или исчезли. Поле enabled, которого нет в ответе
+(старые версии wg-easy), считается включенным - как и везде в боте.
+Дата handshake разбирается только при изменении строки. Уход в простой (нет handshake
+дольше STATS_IDLE_HOURS) не требует обхода всех пиров: сроки лежат в куче и снимаются,
+когда наступают; устаревшие записи кучи отбрасываются при снятии.
+Листинг и сравнение линейны по числу пиров (API отдает весь список), остальное - по числу изменений.
+
+Типы событий: added, removed, enabled, disabled, first_handshake, idle.
+Первый листинг после запуска - точка отсчета, события по нему не рассылаются.
+События пишутся в журнал JSON Lines (EVENTS_LOG, по умолчанию db/events.jsonl) и
+рассылаются подписчикам (/events), у которых есть право "events" на сервере.
+"""
+import os
+import html
+import json
+import heapq
+import logging
+import threading
+from datetime import datetime
+
+from traffic import STATS_IDLE_HOURS, _parse_handshake
+
+EVENTS_LOG_MAX_BYTES = int(os.getenv("EVENTS_LOG_MAX_BYTES", str(10 * 1024 * 1024)) or 0)
+# Больше событий в одном сообщении не перечисляется
+EVENTS_MESSAGE_LIMIT = 30
+
+EVENT_ICONS = {
+    "added": "➕", "removed": "➖", "enabled": "🟢", "disabled": "🔴", "first_handshake": "🤝", "idle": "💤",
+}
+EVENT_TEXT = {
+    "added": "добавлен", "removed": "удален", "enabled": "включен", "disabled": "выключен",
+    "first_handshake": "первое подключение", "idle": f"нет handshake более {STATS_IDLE_HOURS} ч",
+}
+
+_LOG_LOCK = threading.Lock()
+
+
+class PeerWatcher:
+    """Сравнивает листинги одного сервера и возвращает только изменения."""
+
+    def __init__(self, server_key: str, idle_seconds: int = STATS_IDLE_HOURS * 3600):
+        self.server_key, self.idle_seconds = server_key, idle_seconds
+        self.ready = False
+        self._states = {}      # id -> (name, enabled, был ли handshake)
+        self._names = {}       # id -> name
+        self._hs_raw = {}      # id -> latestHandshakeAt как пришел с API
+        self._hs = {}          # id -> handshake (секунды эпохи) или None
+        self._idle = set()     # id пиров, о простое которых уже сообщено
+        self._deadlines = []   # куча (срок простоя, id)
+
+    def _event(self, kind: str, peer_id, now: float) -> dict:
+        return {"ts": datetime.fromtimestamp(now).isoformat(timespec="seconds"), "server": self.server_key, "type": kind, "name": self._names.get(peer_id, str(peer_id))}
+
+    def diff(self, api_clients: list, now: float) -> list:
+        """Применяет новый листинг; -> список событий (пустой для первого листинга)."""
+        events = []
+        seen = set()
+        for client in api_clients:
+            peer_id = client.get("id") or client.get("name")
+            if not peer_id: continue
+            seen.add(peer_id)
+            raw_hs = client.get("latestHandshakeAt")
+            if self._hs_raw.get(peer_id, "") != raw_hs:
+                self._hs_raw[peer_id] = raw_hs
+                handshake = _parse_handshake(raw_hs)
+                self._hs[peer_id] = handshake
+                if handshake:
+                    heapq.heappush(self._deadlines, (handshake + self.idle_seconds, peer_id))
+                    self._idle.discard(peer_id)
+            name, enabled, connected = client.get("name"), bool(client.get("enabled", True)), self._hs.get(peer_id) is not None
+            state = (name, enabled, connected)
+            old = self._states.get(peer_id)
+            if old == state: continue
+            self._states[peer_id] = state
+            self._names[peer_id] = name
+            if old is None: events.append(self._event("added", peer_id, now)); continue
+            old_name, was_enabled, was_connected = old
+            if old_name != name:
+                events.append({**self._event("removed", peer_id, now), "name": old_name}); events.append(self._event("added", peer_id, now))
+            if was_enabled != enabled: events.append(self._event("enabled" if enabled else "disabled", peer_id, now))
+            if connected and not was_connected: events.append(self._event("first_handshake", peer_id, now))
+
+        if len(seen) != len(self._states):
+            for peer_id in [peer_id for peer_id in self._states if peer_id not in seen]:
+                events.append(self._event("removed", peer_id, now))
+                for store in (self._states, self._names, self._hs_raw, self._hs): store.pop(peer_id, None)
+                self._idle.discard(peer_id)
+
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, peer_id = heapq.heappop(self._deadlines)
+            handshake = self._hs.get(peer_id)
+            # Устаревшая запись: пир удален или с тех пор был новый handshake
+            if not handshake or handshake + self.idle_seconds != deadline or peer_id in self._idle: continue
+            self._idle.add(peer_id)
+            events.append(self._event("idle", peer_id, now))
+
+        if not self.ready:
+            self.ready = True
+            logging.info("События %s: точка отсчета, пиров %s, в простое %s.", self.server_key, len(self._states), len(self._idle))
+            return []
+        return events
+
+
+def append_event_log(path: str, events: list, max_bytes: int = EVENTS_LOG_MAX_BYTES):
+    """Дописывает события в журнал JSON Lines; при превышении max_bytes журнал сдвигается в .1."""
+    if not events or not path: return
+    lines = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+    with _LOG_LOCK:
+        try:
+            if max_bytes and os.path.exists(path) and os.path.getsize(path) > max_bytes: os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f: f.write(lines)
+        except OSError as e: logging.error("Не удалось записать журнал событий %s: %s", path, e)
+
+
+def format_events(events: list, server_name: str) -> str:
+    """Текст сообщения подписчику (HTML)."""
+    lines = [f"🔔 <b>{html.escape(server_name)}</b>: изменений {len(events)}"]
+    lines += [f"{EVENT_ICONS.get(e['type'], '•')} <b>{html.escape(str(e['name']))}</b> — {EVENT_TEXT.get(e['type'], e['type'])}" for e in events[:EVENTS_MESSAGE_LIMIT]]
+    if len(events) > EVENTS_MESSAGE_LIMIT: lines.append(f"... и еще {len(events) - EVENTS_MESSAGE_LIMIT}")
+    return "\n".join(lines)
+
+
+# === ПОДПИСЧИКИ (файл на общем томе, читается на каждом такте) ===
+def load_subscribers(path: str) -> set:
+    try:
+        with open(path, encoding="utf-8") as f: return {int(uid) for uid in json.load(f)}
+    except FileNotFoundError: return set()
+    except (OSError, ValueError, TypeError) as e: logging.error("Не удалось прочитать подписчиков %s: %s", path, e); return set()
+
+
+def set_subscribed(path: str, user_id: int, subscribed: bool) -> set:
+    """Добавляет/убирает подписчика (атомарная запись). -> новый набор подписчиков."""
+    with _LOG_LOCK:
+        subscribers = load_subscribers(path)
+        if subscribed: subscribers.add(user_id)
+        else: subscribers.discard(user_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(sorted(subscribers), f)
+        os.replace(tmp_path, path)
+    return subscribers
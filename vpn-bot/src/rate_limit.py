@@ -0,0 +1,131 @@
+"""
+Ограничение частоты изменяющих запросов к wg-easy (создание, удаление, вкл/выкл, применение сверки).
+
+Два token bucket на каждый запрос: по пользователю Telegram и по серверу wg-easy.
+Запрос без свободных токенов не отклоняется, а ждет в очереди сервера (FIFO);
+пользователю один раз отправляется "в очереди, позиция N". Пользователь,
+исчерпавший свой лимит, не задерживает чужие запросы к тому же серверу.
+Если очередь сервера заполнена (WG_QUEUE_LIMIT), запрос отклоняется.
+
+Настройки (запросов в секунду / размер пачки):
+  WG_USER_RATE (0.5), WG_USER_BURST (3), WG_SERVER_RATE (2), WG_SERVER_BURST (5), WG_QUEUE_LIMIT (50).
+"""
+import os
+import time
+import asyncio
+import logging
+
+from metrics import WG_MUTATIONS_QUEUED, WG_MUTATION_WAIT, WG_MUTATIONS_REJECTED
+
+WG_USER_RATE = float(os.getenv("WG_USER_RATE", "0.5") or 0.5)
+WG_USER_BURST = float(os.getenv("WG_USER_BURST", "3") or 3)
+WG_SERVER_RATE = float(os.getenv("WG_SERVER_RATE", "2") or 2)
+WG_SERVER_BURST = float(os.getenv("WG_SERVER_BURST", "5") or 5)
+WG_QUEUE_LIMIT = int(os.getenv("WG_QUEUE_LIMIT", "50") or 50)
+
+# Ожидающий, который не первый среди готовых, перепроверяет очередь с этим шагом
+_POLL_INTERVAL = 0.05
+
+
+class QueueFull(Exception):
+    """Очередь сервера заполнена."""
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше burst. Время - time.monotonic()."""
+
+    def __init__(self, rate: float, burst: float, now: float | None = None):
+        self.rate, self.burst = rate, max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated: self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate); self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Секунд до появления токена (0 - есть сейчас)."""
+        self._refill(now)
+        if self.tokens >= 1: return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Waiter:
+    __slots__ = ("user_id", "user_bucket")
+
+    def __init__(self, user_id, user_bucket: TokenBucket):
+        self.user_id, self.user_bucket = user_id, user_bucket
+
+
+class MutationLimiter:
+    """Token bucket по пользователю и по серверу перед изменяющими вызовами wg-easy. Работает в цикле событий бота."""
+
+    def __init__(self, user_rate: float = WG_USER_RATE, user_burst: float = WG_USER_BURST,
+                 server_rate: float = WG_SERVER_RATE, server_burst: float = WG_SERVER_BURST, queue_limit: int = WG_QUEUE_LIMIT):
+        self.user_rate, self.user_burst = user_rate, user_burst
+        self.server_rate, self.server_burst = server_rate, server_burst
+        self.queue_limit = queue_limit
+        self._users: dict = {}
+        self._servers: dict = {}
+        self._queues: dict = {}
+
+    def _user_bucket(self, user_id) -> TokenBucket:
+        bucket = self._users.get(user_id)
+        if bucket is None: bucket = self._users[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def _server_bucket(self, server_key) -> TokenBucket:
+        bucket = self._servers.get(server_key)
+        if bucket is None: bucket = self._servers[server_key] = TokenBucket(self.server_rate, self.server_burst)
+        return bucket
+
+    def queued(self, server_key) -> int:
+        return len(self._queues.get(server_key, ()))
+
+    def _next_delay(self, waiter: _Waiter, queue: list, server_bucket: TokenBucket, now: float) -> float:
+        """0 - можно выполнять. Очередность - FIFO среди тех, у кого есть токен пользователя."""
+        own = waiter.user_bucket.delay(now)
+        if own > 0: return own
+        for ahead in queue:
+            if ahead is waiter: break
+            # Впереди есть готовый запрос другого пользователя - он идет первым
+            if ahead.user_bucket.delay(now) <= 0: return _POLL_INTERVAL
+        return server_bucket.delay(now)
+
+    async def acquire(self, user_id, server_key, on_queued=None):
+        """
+        Ждет токены пользователя и сервера. on_queued(position) - корутина, вызывается один раз,
+        если сразу выполнить нельзя. QueueFull - очередь сервера заполнена.
+        """
+        queue = self._queues.setdefault(server_key, [])
+        if len(queue) >= self.queue_limit: WG_MUTATIONS_REJECTED.labels(server_key).inc(); raise QueueFull(server_key)
+        waiter = _Waiter(user_id, self._user_bucket(user_id))
+        server_bucket = self._server_bucket(server_key)
+        queue.append(waiter); WG_MUTATIONS_QUEUED.labels(server_key).set(len(queue))
+        started = time.monotonic()
+        notified = False
+        try:
+            while True:
+                now = time.monotonic()
+                delay = self._next_delay(waiter, queue, server_bucket, now)
+                if delay <= 0:
+                    waiter.user_bucket.take(now); server_bucket.take(now)
+                    return
+                if not notified:
+                    notified = True
+                    logging.info("wg-easy %s: запрос пользователя %s в очереди, позиция %s", server_key, user_id, queue.index(waiter) + 1)
+                    if on_queued:
+                        try: await on_queued(queue.index(waiter) + 1)
+                        except Exception as e: logging.warning("Не удалось сообщить о позиции в очереди: %r", e)
+                await asyncio.sleep(min(max(delay, 0.001), 1.0))
+        finally:
+            queue.remove(waiter); WG_MUTATIONS_QUEUED.labels(server_key).set(len(queue))
+            WG_MUTATION_WAIT.labels(server_key).observe(time.monotonic() - started)
+
+    async def run(self, user_id, server_key, func, *args, on_queued=None):
+        """Дождаться очереди и выполнить блокирующий func(*args) в потоке."""
+        await self.acquire(user_id, server_key, on_queued)
+        return await asyncio.to_thread(func, *args)
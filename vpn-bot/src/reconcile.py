@@ -0,0 +1,202 @@
+"""
+Сверка (reconciliation) клиентов БД и wg-easy.
+
+Обе стороны читаются ровно один раз (один SELECT и один GET списка на API),
+расхождения считаются разностями множеств по имени за O(n), после чего
+исправления применяются пакетами: изменения БД - одной транзакцией,
+изменения API - в рамках одной сессии без повторного логина и листинга.
+
+Если одну из сторон прочитать не удалось (ошибка SQLite, сессии или списка
+на API), план не строится вовсе: пустой срез - не повод удалять или
+импортировать клиентов.
+
+Политика задается переменными окружения (в .env - с префиксом VPN_):
+  RECONCILE_MISSING_ON_API - что делать с клиентом, который есть в БД, но нет на API:
+      ignore     - только сообщать (по умолчанию)
+      delete_db  - удалить запись из БД (вместе с оплаченным сроком!)
+      create_api - создать клиента на API заново (новые ключи!)
+  RECONCILE_STATUS_SOURCE  - чей статус главный при расхождении: api (по умолчанию) или db
+  RECONCILE_IMPORT_MISSING - импортировать в БД клиентов, которые есть только на API (1/0, по умолчанию 1)
+"""
+import os
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+
+from database import (
+    get_all_clients,
+    save_clients_bulk,
+    update_client_statuses_bulk,
+    delete_clients_bulk,
+)
+from wg_api import (
+    create_session,
+    get_api_clients,
+    set_client_enabled_by_id,
+    create_client_by_name,
+)
+
+MISSING_ON_API_POLICIES = ("delete_db", "create_api", "ignore")
+STATUS_SOURCES = ("api", "db")
+
+RECONCILE_MISSING_ON_API = os.getenv("RECONCILE_MISSING_ON_API", "ignore")
+if RECONCILE_MISSING_ON_API not in MISSING_ON_API_POLICIES:
+    logging.warning("Неизвестная политика RECONCILE_MISSING_ON_API='%s', используется 'ignore'.", RECONCILE_MISSING_ON_API)
+    RECONCILE_MISSING_ON_API = "ignore"
+RECONCILE_STATUS_SOURCE = os.getenv("RECONCILE_STATUS_SOURCE", "api")
+if RECONCILE_STATUS_SOURCE not in STATUS_SOURCES:
+    logging.warning("Неизвестный RECONCILE_STATUS_SOURCE='%s', используется 'api'.", RECONCILE_STATUS_SOURCE)
+    RECONCILE_STATUS_SOURCE = "api"
+RECONCILE_IMPORT_MISSING = os.getenv("RECONCILE_IMPORT_MISSING", "1") not in ("0", "false", "no")
+
+
+@dataclass
+class ReconcilePlan:
+    """План исправлений для одного сервера. Пустой план = стороны совпадают."""
+    missing_on_api: list = field(default_factory=list)      # имена: есть в БД, нет на API
+    missing_in_db: list = field(default_factory=list)       # (name, status): есть на API, нет в БД
+    status_mismatch: list = field(default_factory=list)     # (name, db_status, api_status, api_id)
+    # Действия, вычисленные по политике
+    db_inserts: list = field(default_factory=list)          # (name, expiry_date, status)
+    db_deletes: list = field(default_factory=list)          # name
+    db_status_updates: list = field(default_factory=list)   # (status, name)
+    api_creates: list = field(default_factory=list)         # name
+    api_status_updates: list = field(default_factory=list)  # (api_id, name, enable)
+    api_error: str | None = None
+    db_error: str | None = None
+
+    @property
+    def error(self) -> str | None:
+        """Причина, по которой план не построен (сторона не прочитана), или None."""
+        return self.db_error or self.api_error
+
+    def is_empty(self) -> bool:
+        return not (self.db_inserts or self.db_deletes or self.db_status_updates or self.api_creates or self.api_status_updates)
+
+    def drift_count(self) -> int:
+        return len(self.missing_on_api) + len(self.missing_in_db) + len(self.status_mismatch)
+
+
+@dataclass
+class ReconcileResult:
+    """Итог применения плана."""
+    db_inserted: int = 0
+    db_deleted: int = 0
+    db_status_updated: int = 0
+    api_created: int = 0
+    api_status_updated: int = 0
+    api_failed: list = field(default_factory=list)
+
+
+def build_plan(db_clients: list, api_clients: list,
+               missing_on_api_policy: str = RECONCILE_MISSING_ON_API,
+               status_source: str = RECONCILE_STATUS_SOURCE,
+               import_missing: bool = RECONCILE_IMPORT_MISSING) -> ReconcilePlan:
+    """
+    Строит план по снимкам обеих сторон. Чистая функция без ввода-вывода.
+    db_clients - кортежи (name, expiry_date, status) из get_all_clients,
+    api_clients - список словарей из GET /api/wireguard/client.
+    """
+    plan = ReconcilePlan()
+    db_by_name = {name: status for name, _expiry, status in db_clients}
+    api_by_name = {c["name"]: c for c in api_clients if c.get("name")}
+
+    for name, db_status in db_by_name.items():
+        api_client = api_by_name.get(name)
+        if api_client is None:
+            plan.missing_on_api.append(name)
+            continue
+        api_status = "enabled" if api_client.get("enabled", True) else "disabled"
+        if db_status != api_status:
+            plan.status_mismatch.append((name, db_status, api_status, api_client.get("id")))
+
+    for name, api_client in api_by_name.items():
+        if name not in db_by_name:
+            plan.missing_in_db.append((name, "enabled" if api_client.get("enabled", True) else "disabled"))
+
+    if missing_on_api_policy == "delete_db": plan.db_deletes = list(plan.missing_on_api)
+    elif missing_on_api_policy == "create_api": plan.api_creates = list(plan.missing_on_api)
+
+    if import_missing: plan.db_inserts = [(name, None, status) for name, status in plan.missing_in_db]
+
+    for name, db_status, api_status, api_id in plan.status_mismatch:
+        if status_source == "api": plan.db_status_updates.append((api_status, name))
+        elif api_id is not None: plan.api_status_updates.append((api_id, name, db_status == "enabled"))
+    return plan
+
+
+def plan_server(db_path: str, base_url: str, password: str):
+    """Снимает оба среза и строит план. Возвращает (plan, cookies) - cookies переиспользуются при apply."""
+    try: db_clients = get_all_clients(db_path, raise_errors=True)
+    except sqlite3.Error as e:
+        # Без среза БД все клиенты API выглядели бы "новыми" - ничего не планируем
+        plan = ReconcilePlan(); plan.db_error = f"Не удалось прочитать БД: {e}"
+        return plan, None
+    cookies = create_session(base_url, password)
+    if not cookies:
+        plan = ReconcilePlan(); plan.api_error = "Не удалось создать сессию."
+        return plan, None
+    api_clients = get_api_clients(cookies, base_url)
+    if not isinstance(api_clients, list):
+        # Без списка с API любые "исправления" были бы ложными - ничего не планируем
+        plan = ReconcilePlan(); plan.api_error = "Не удалось получить список клиентов."
+        return plan, cookies
+    return build_plan(db_clients, api_clients), cookies
+
+
+def apply_plan(plan: ReconcilePlan, db_path: str, base_url: str, cookies) -> ReconcileResult:
+    """Применяет план: БД - пакетами в одной транзакции на вид действия, API - в одной сессии."""
+    result = ReconcileResult()
+    if plan.error or plan.is_empty(): return result
+
+    for api_id, name, enable in plan.api_status_updates:
+        if set_client_enabled_by_id(api_id, enable, cookies, base_url): result.api_status_updated += 1
+        else: result.api_failed.append(name)
+    for name in plan.api_creates:
+        if create_client_by_name(name, cookies, base_url): result.api_created += 1
+        else: result.api_failed.append(name)
+
+    result.db_inserted = save_clients_bulk(db_path, plan.db_inserts)
+    result.db_deleted = delete_clients_bulk(db_path, plan.db_deletes)
+    result.db_status_updated = update_client_statuses_bulk(db_path, plan.db_status_updates)
+    logging.info("Сверка '%s' применена: %s", db_path, result)
+    return result
+
+
+def reconcile_server(db_path: str, base_url: str, password: str, apply: bool = False):
+    """Полный цикл сверки одного сервера. При apply=False (dry-run) ничего не меняет."""
+    plan, cookies = plan_server(db_path, base_url, password)
+    if plan.error: logging.warning("Сверка '%s' пропущена: %s", db_path, plan.error)
+    elif plan.drift_count(): logging.info("Сверка '%s': расхождений %s (apply=%s).", db_path, plan.drift_count(), apply)
+    result = apply_plan(plan, db_path, base_url, cookies) if apply else None
+    return plan, result
+
+
+def format_plan(plan: ReconcilePlan, server_name: str, limit: int = 20) -> str:
+    """Текст отчета для Telegram (HTML)."""
+    if plan.error: return f"⚠️ Сверка {server_name} невозможна: {plan.error}"
+    if not plan.drift_count(): return f"✅ {server_name}: БД и API совпадают."
+
+    def names(items): shown = ", ".join(items[:limit]); return shown + (f" … (+{len(items) - limit})" if len(items) > limit else "")
+
+    lines = [f"🔄 <b>Сверка {server_name}</b>: расхождений {plan.drift_count()}"]
+    if plan.missing_on_api: lines.append(f"❓ Нет на API ({len(plan.missing_on_api)}): <code>{names(plan.missing_on_api)}</code>")
+    if plan.missing_in_db: lines.append(f"➕ Нет в БД ({len(plan.missing_in_db)}): <code>{names([n for n, _ in plan.missing_in_db])}</code>")
+    if plan.status_mismatch: lines.append(f"🔀 Статус различается ({len(plan.status_mismatch)}): <code>{names([f'{n} (БД {d} / API {a})' for n, d, a, _ in plan.status_mismatch])}</code>")
+    lines.append("")
+    lines.append("<b>Действия:</b>")
+    if plan.db_inserts: lines.append(f"• импорт в БД: {len(plan.db_inserts)}")
+    if plan.db_deletes: lines.append(f"• удаление из БД: {len(plan.db_deletes)}")
+    if plan.api_creates: lines.append(f"• создание на API: {len(plan.api_creates)}")
+    if plan.db_status_updates: lines.append(f"• статус в БД по API: {len(plan.db_status_updates)}")
+    if plan.api_status_updates: lines.append(f"• статус на API по БД: {len(plan.api_status_updates)}")
+    if plan.is_empty(): lines.append("• нет (политика: только отчет)")
+    return "\n".join(lines)
+
+
+def format_result(result: ReconcileResult, server_name: str) -> str:
+    text = (f"✅ Сверка {server_name} применена.\n"
+            f"БД: +{result.db_inserted} / -{result.db_deleted} / статусов {result.db_status_updated}\n"
+            f"API: создано {result.api_created} / статусов {result.api_status_updated}")
+    if result.api_failed: text += f"\n⚠️ Ошибки API: {', '.join(result.api_failed[:20])}"
+    return text
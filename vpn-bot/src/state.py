@@ -0,0 +1,170 @@
+"""
+Общее состояние для нескольких реплик бота: диалоги (user_data), версии кэшей и выбор лидера.
+
+STATE_BACKEND:
+  memory - по умолчанию, одна реплика: все хранится в процессе, как раньше;
+  redis  - общий Redis/Valkey (REDIS_URL, по умолчанию сервис redis из docker-compose).
+           user_data каждого пользователя - JSON по ключу {STATE_PREFIX}user:<id> (TTL STATE_TTL),
+           версии кэшей - счетчики {STATE_PREFIX}gen:<имя>, лидер - {STATE_PREFIX}leader:<имя>.
+
+Периодические задачи выполняет только лидер: реплика держит ключ лидера SET NX PX
+и продлевает его каждые LEADER_TTL/3 секунд. Упавший лидер теряет ключ через LEADER_TTL,
+его место занимает другая реплика. При ошибке Redis реплика перестает считать себя лидером.
+"""
+import os
+import json
+import uuid
+import socket
+import asyncio
+import logging
+import weakref
+import functools
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+STATE_PREFIX = os.getenv("STATE_PREFIX", "vpnbot:")
+STATE_TTL = int(os.getenv("STATE_TTL", str(7 * 86400)) or 0)
+LEADER_TTL = float(os.getenv("LEADER_TTL", "30") or 30)
+
+# Продлить ключ, если он наш, иначе занять, если свободен
+_ACQUIRE_LEADER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then return 1 end
+return 0
+"""
+
+
+class MemoryState:
+    """Состояние одного процесса: user_data и так живет в PTB, лидер всегда этот процесс."""
+
+    shared = False
+
+    def __init__(self):
+        self._generations = {}
+
+    async def load_user(self, user_id: int) -> dict | None:
+        return None
+
+    async def save_user(self, user_id: int, data: dict):
+        pass
+
+    async def generation(self, name: str) -> int:
+        return self._generations.get(name, 0)
+
+    async def bump(self, name: str) -> int:
+        self._generations[name] = self._generations.get(name, 0) + 1
+        return self._generations[name]
+
+    async def acquire_leader(self, name: str, owner: str, ttl: float) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+
+class RedisState:
+    """Состояние в Redis/Valkey, общее для всех реплик."""
+
+    shared = True
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = STATE_PREFIX, ttl: int = STATE_TTL):
+        import redis.asyncio as redis_asyncio  # Нужен только для STATE_BACKEND=redis
+        self.prefix, self.ttl = prefix, ttl
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self._acquire = self._redis.register_script(_ACQUIRE_LEADER)
+
+    async def load_user(self, user_id: int) -> dict | None:
+        raw = await self._redis.get(f"{self.prefix}user:{user_id}")
+        return json.loads(raw) if raw else None
+
+    async def save_user(self, user_id: int, data: dict):
+        key = f"{self.prefix}user:{user_id}"
+        if not data: await self._redis.delete(key); return
+        await self._redis.set(key, json.dumps(data, ensure_ascii=False, default=str), ex=self.ttl or None)
+
+    async def generation(self, name: str) -> int:
+        return int(await self._redis.get(f"{self.prefix}gen:{name}") or 0)
+
+    async def bump(self, name: str) -> int:
+        return int(await self._redis.incr(f"{self.prefix}gen:{name}"))
+
+    async def acquire_leader(self, name: str, owner: str, ttl: float) -> bool:
+        return bool(await self._acquire(keys=[f"{self.prefix}leader:{name}"], args=[owner, int(ttl * 1000)]))
+
+    async def close(self):
+        close = getattr(self._redis, "aclose", None) or self._redis.close  # redis-py < 5: close()
+        await close()
+
+
+def create_state(backend: str = STATE_BACKEND):
+    """Бэкенд по STATE_BACKEND; если redis недоступен как библиотека - состояние одного процесса."""
+    if backend == "redis":
+        try:
+            state = RedisState()
+            logging.info("Общее состояние: Redis %s, префикс %s", REDIS_URL.rsplit('@', 1)[-1], STATE_PREFIX)
+            return state
+        except ImportError: logging.error("STATE_BACKEND=redis, но пакет redis не установлен - состояние хранится в процессе.")
+    elif backend != "memory": logging.error("Неизвестный STATE_BACKEND '%s' - состояние хранится в процессе.", backend)
+    return MemoryState()
+
+
+class Leader:
+    """Выбор лидера для периодических задач. tick() вызывается по расписанию на каждой реплике."""
+
+    def __init__(self, state, name: str = "jobs", ttl: float = LEADER_TTL):
+        self.state, self.name, self.ttl = state, name, ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = not state.shared
+
+    async def tick(self):
+        try: leader = await self.state.acquire_leader(self.name, self.owner, self.ttl)
+        except Exception as e: logging.error("Выбор лидера: ошибка хранилища, задачи приостановлены: %s", e); leader = False
+        if leader != self.is_leader: logging.info("Реплика %s %s (%s).", self.owner, 'стала лидером' if leader else 'больше не лидер', self.name)
+        self.is_leader = leader
+
+    def only(self, job):
+        """Декоратор задачи JobQueue: выполняется только на лидере."""
+        @functools.wraps(job)
+        async def wrapper(context):
+            if not self.is_leader: return
+            return await job(context)
+        return wrapper
+
+
+def shared_user_data(state, on_load=None):
+    """
+    Декоратор обработчика. Обработчики одного пользователя выполняются по очереди, в порядке
+    прихода апдейтов: при concurrent_updates два шага диалога не меняют user_data одновременно,
+    а разные пользователи обрабатываются параллельно (блокировки общие для всех обернутых обработчиков).
+    Для общего хранилища перед вызовом context.user_data загружается из него, после - сохраняется,
+    если изменился. on_load(context) - корутина после загрузки (сверка кэшей).
+    """
+    locks = weakref.WeakValueDictionary()  # user_id -> asyncio.Lock, пока его держат или ждут
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(update, context, *args, **kwargs):
+            user = getattr(update, "effective_user", None)
+            if user is None: return await func(update, context, *args, **kwargs)
+            lock = locks.get(user.id)
+            if lock is None: lock = locks[user.id] = asyncio.Lock()
+            async with lock: return await _with_user_data(user, update, context, *args, **kwargs)
+
+        async def _with_user_data(user, update, context, *args, **kwargs):
+            if not state.shared: return await func(update, context, *args, **kwargs)
+            try:
+                data = await state.load_user(user.id)
+                # Источник истины - хранилище: диалог мог продолжиться или закончиться на другой реплике
+                context.user_data.clear(); context.user_data.update(data or {})
+                if on_load: await on_load(context)
+            except Exception as e: logging.error("Не удалось загрузить состояние %s, используется локальное: %s", user.id, e)
+            before = dict(context.user_data)
+            try: return await func(update, context, *args, **kwargs)
+            finally:
+                if dict(context.user_data) != before:
+                    try: await state.save_user(user.id, dict(context.user_data))
+                    except Exception as e: logging.error("Не удалось сохранить состояние %s: %s", user.id, e)
+        return wrapper
+    return decorator
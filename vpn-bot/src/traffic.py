@@ -0,0 +1,199 @@
+"""
+Сбор статистики трафика и handshake по пирам wg-easy во временной ряд.
+
+Сборщик раз в STATS_INTERVAL секунд получает листинг клиентов (общий с опросом
+событий peer_events.py - один листинг на сервер за такт) и сохраняет
+по каждому пиру приращения transferRx/transferTx с прошлого замера и время
+последнего handshake. Данные лежат в отдельной БД db/<server>.stats.db, чтобы не
+конкурировать за блокировку с основной таблицей клиентов.
+
+Уровни хранения (все - WITHOUT ROWID, целые секунды эпохи):
+  peer_raw  - сырые замеры, хранятся STATS_RAW_RETENTION_HOURS часов
+  peer_5m   - сумма за 5 минут, STATS_5M_RETENTION_DAYS дней
+  peer_1h   - сумма за час, STATS_1H_RETENTION_DAYS дней
+Свертка идет по водяным знакам (rollup_state), поэтому каждый замер попадает
+в агрегаты ровно один раз. Отчеты "топ по трафику / простаивающие" читают только
+агрегаты и никогда не обращаются к API. peer_last содержит только пиры из последнего
+листинга: удаленные на wg-easy пиры остаются в истории трафика, но не в списке
+простаивающих.
+"""
+import os
+import time
+import sqlite3
+from datetime import datetime
+
+STATS_RAW_RETENTION_HOURS = int(os.getenv("STATS_RAW_RETENTION_HOURS", "6") or 6)
+STATS_5M_RETENTION_DAYS = int(os.getenv("STATS_5M_RETENTION_DAYS", "7") or 7)
+STATS_1H_RETENTION_DAYS = int(os.getenv("STATS_1H_RETENTION_DAYS", "90") or 90)
+# Пир без handshake дольше этого срока считается простаивающим
+STATS_IDLE_HOURS = int(os.getenv("STATS_IDLE_HOURS", "72") or 72)
+
+LEVELS = (("peer_5m", 300), ("peer_1h", 3600))
+
+
+def stats_db_path(db_dir: str, server_key: str) -> str:
+    return os.path.join(db_dir, f"{server_key}.stats.db")
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_stats_db(path: str):
+    """Создает таблицы временного ряда, если их нет."""
+    conn = _connect(path)
+    try:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS peer_last (
+                name TEXT PRIMARY KEY, ts INTEGER NOT NULL, rx INTEGER NOT NULL, tx INTEGER NOT NULL, handshake INTEGER
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS peer_raw (
+                ts INTEGER NOT NULL, name TEXT NOT NULL, rx INTEGER NOT NULL, tx INTEGER NOT NULL, handshake INTEGER,
+                PRIMARY KEY (ts, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS peer_5m (
+                bucket INTEGER NOT NULL, name TEXT NOT NULL, rx INTEGER NOT NULL, tx INTEGER NOT NULL, handshake INTEGER,
+                PRIMARY KEY (bucket, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS peer_1h (
+                bucket INTEGER NOT NULL, name TEXT NOT NULL, rx INTEGER NOT NULL, tx INTEGER NOT NULL, handshake INTEGER,
+                PRIMARY KEY (bucket, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rollup_state (level TEXT PRIMARY KEY, watermark INTEGER NOT NULL) WITHOUT ROWID;
+        """)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _parse_handshake(value) -> int | None:
+    if not value: return None
+    try: return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+    except ValueError: return None
+
+
+def record_sample(path: str, api_clients: list, now: int | None = None) -> int:
+    """Сохраняет приращения счетчиков с прошлого замера. Возвращает число записанных пиров."""
+    now = int(now if now is not None else time.time())
+    conn = _connect(path)
+    try:
+        last = {name: (rx, tx) for name, rx, tx in conn.execute("SELECT name, rx, tx FROM peer_last")}
+        raw_rows, last_rows = [], []
+        for client in api_clients:
+            name = client.get("name")
+            if not name: continue
+            rx, tx = int(client.get("transferRx") or 0), int(client.get("transferTx") or 0)
+            handshake = _parse_handshake(client.get("latestHandshakeAt"))
+            prev = last.get(name)
+            if prev is None: d_rx, d_tx = 0, 0  # первый замер - только точка отсчета
+            else:
+                # Счетчики обнуляются при перезапуске wg-easy: тогда весь текущий объем - приращение
+                d_rx = rx - prev[0] if rx >= prev[0] else rx
+                d_tx = tx - prev[1] if tx >= prev[1] else tx
+            raw_rows.append((now, name, d_rx, d_tx, handshake))
+            last_rows.append((name, now, rx, tx, handshake))
+        current = {row[0] for row in last_rows}
+        gone = [(name,) for name in last if name not in current]
+        with conn:
+            conn.executemany("DELETE FROM peer_last WHERE name = ?", gone)
+            conn.executemany("INSERT OR REPLACE INTO peer_raw (ts, name, rx, tx, handshake) VALUES (?, ?, ?, ?, ?)", raw_rows)
+            conn.executemany("INSERT OR REPLACE INTO peer_last (name, ts, rx, tx, handshake) VALUES (?, ?, ?, ?, ?)", last_rows)
+        return len(raw_rows)
+    finally:
+        conn.close()
+
+
+def rollup(path: str, now: int | None = None):
+    """Сворачивает raw -> 5m -> 1h по водяным знакам и удаляет данные старше срока хранения."""
+    now = int(now if now is not None else time.time())
+    conn = _connect(path)
+    try:
+        with conn:
+            source = ("peer_raw", "ts")
+            for table, step in LEVELS:
+                # Сворачиваются только закрытые интервалы
+                closed_until = (now // step) * step
+                row = conn.execute("SELECT watermark FROM rollup_state WHERE level = ?", (table,)).fetchone()
+                watermark = row[0] if row else 0
+                if closed_until > watermark:
+                    src_table, src_col = source
+                    conn.execute(f"""
+                        INSERT INTO {table} (bucket, name, rx, tx, handshake)
+                        SELECT ({src_col} / {step}) * {step}, name, SUM(rx), SUM(tx), MAX(handshake)
+                        FROM {src_table} WHERE {src_col} >= ? AND {src_col} < ?
+                        GROUP BY 1, 2
+                        ON CONFLICT (bucket, name) DO UPDATE SET
+                            rx = rx + excluded.rx, tx = tx + excluded.tx,
+                            handshake = MAX(COALESCE(handshake, 0), COALESCE(excluded.handshake, 0))
+                    """, (watermark, closed_until))
+                    conn.execute("INSERT OR REPLACE INTO rollup_state (level, watermark) VALUES (?, ?)", (table, closed_until))
+                source = (table, "bucket")
+            conn.execute("DELETE FROM peer_raw WHERE ts < ?", (now - STATS_RAW_RETENTION_HOURS * 3600,))
+            conn.execute("DELETE FROM peer_5m WHERE bucket < ?", (now - STATS_5M_RETENTION_DAYS * 86400,))
+            conn.execute("DELETE FROM peer_1h WHERE bucket < ?", (now - STATS_1H_RETENTION_DAYS * 86400,))
+    finally:
+        conn.close()
+
+
+def collect_server(db_dir: str, server_key: str, api_clients: list) -> int:
+    """Один такт сборщика для сервера по готовому листингу: запись замера, свертка."""
+    path = stats_db_path(db_dir, server_key)
+    init_stats_db(path)
+    count = record_sample(path, api_clients)
+    rollup(path)
+    return count
+
+
+def top_talkers(path: str, hours: int = 24, limit: int = 10, now: int | None = None) -> list:
+    """[(name, rx, tx)] по убыванию суммарного трафика за последние hours часов (из агрегатов)."""
+    now = int(now if now is not None else time.time())
+    since = now - hours * 3600
+    table = "peer_5m" if hours * 3600 <= STATS_5M_RETENTION_DAYS * 86400 else "peer_1h"
+    conn = _connect(path)
+    try:
+        return conn.execute(f"""
+            SELECT name, SUM(rx), SUM(tx) FROM {table} WHERE bucket >= ?
+            GROUP BY name HAVING SUM(rx) + SUM(tx) > 0 ORDER BY SUM(rx) + SUM(tx) DESC LIMIT ?
+        """, (since, limit)).fetchall()
+    finally:
+        conn.close()
+
+
+def idle_peers(path: str, idle_hours: int = STATS_IDLE_HOURS, limit: int = 50, now: int | None = None) -> list:
+    """[(name, последний handshake или None)] для текущих пиров без handshake дольше idle_hours (из агрегатов)."""
+    now = int(now if now is not None else time.time())
+    conn = _connect(path)
+    try:
+        return conn.execute("""
+            SELECT name, MAX(handshake) AS hs FROM (
+                SELECT name, handshake FROM peer_5m UNION ALL SELECT name, handshake FROM peer_1h
+            ) WHERE name IN (SELECT name FROM peer_last)
+            GROUP BY name HAVING hs IS NULL OR hs = 0 OR hs < ? ORDER BY hs LIMIT ?
+        """, (now - idle_hours * 3600, limit)).fetchall()
+    finally:
+        conn.close()
+
+
+def _human_bytes(value: int) -> str:
+    for unit in ("Б", "КБ", "МБ", "ГБ"):
+        if value < 1024: return f"{value:.0f} {unit}" if unit == "Б" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} ТБ"
+
+
+def format_report(path: str, server_name: str, hours: int = 24) -> str:
+    """Текст отчета "топ по трафику / простаивающие" (HTML)."""
+    if not os.path.exists(path): return f"📊 {server_name}: статистика еще не собрана."
+    lines = [f"📊 <b>{server_name}</b>: топ по трафику за {hours} ч"]
+    talkers = top_talkers(path, hours)
+    if talkers: lines += [f"{i}. <b>{name}</b> ⬇️ {_human_bytes(rx)} ⬆️ {_human_bytes(tx)}" for i, (name, rx, tx) in enumerate(talkers, 1)]
+    else: lines.append("нет трафика")
+    idle = idle_peers(path)
+    lines.append("")
+    lines.append(f"💤 Без handshake более {STATS_IDLE_HOURS} ч: {len(idle)}")
+    for name, hs in idle[:20]:
+        lines.append(f"• {name} — {datetime.fromtimestamp(hs).strftime('%Y-%m-%d %H:%M') if hs else 'никогда'}")
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+"""
+Функции для работы с HTTP API wg-easy.
+Вынесены из bot.py, чтобы ими могли пользоваться фоновые задачи (сверка и т.п.).
+"""
+import time
+import logging
+import requests
+
+from metrics import observe_wg_api
+
+def svg_to_png(svg: bytes) -> bytes:
+    """SVG -> PNG. cairosvg (нативная libcairo, ~0.3 с импорта) загружается при первом QR, а не при старте бота."""
+    import cairosvg
+    return cairosvg.svg2png(bytestring=svg)
+
+def _request(method: str, url: str, **kwargs):
+    """requests.request с записью метрик (задержка и статус по эндпоинту)."""
+    started = time.perf_counter()
+    try: response = requests.request(method, url, **kwargs)
+    except requests.exceptions.RequestException: observe_wg_api(method, url, started, "error"); raise
+    observe_wg_api(method, url, started, response.status_code)
+    return response
+
+# === СЕССИЯ И ЧТЕНИЕ ===
+def create_session(base_url: str, password: str):
+    try: response = _request("POST", f"{base_url}/api/session", json={"password": password}, timeout=10); response.raise_for_status(); return response.cookies
+    except requests.exceptions.RequestException as e: logging.error("Ошибка сессии %s: %s", base_url, e); return None
+def get_api_clients(cookies, base_url: str):
+    if not cookies: return None
+    try: response = _request("GET", f"{base_url}/api/wireguard/client", cookies=cookies, timeout=10); response.raise_for_status(); return response.json()
+    except requests.exceptions.RequestException as e: logging.error("Ошибка get_clients %s: %s", base_url, e); return None
+    except requests.exceptions.JSONDecodeError as e: logging.error("Ошибка JSON %s: %s", base_url, e); return None
+def list_clients(base_url: str, password: str):
+    """Логин и один листинг клиентов (снимок сервера для фоновых опросов). None - API недоступен."""
+    cookies = create_session(base_url, password)
+    api_clients = get_api_clients(cookies, base_url) if cookies else None
+    return api_clients if isinstance(api_clients, list) else None
+def get_api_client_configuration(client_id, cookies, base_url: str):
+    if not cookies: return None
+    try: response = _request("GET", f"{base_url}/api/wireguard/client/{client_id}/configuration", cookies=cookies, timeout=10); response.raise_for_status(); return response.text
+    except requests.exceptions.RequestException as e: logging.error("Ошибка конфига %s с %s: %s", client_id, base_url, e); return None
+def get_api_qr_code_svg(client_id, cookies, base_url: str):
+    if not cookies: return None
+    try: response = _request("GET", f"{base_url}/api/wireguard/client/{client_id}/qrcode.svg", cookies=cookies, timeout=10); response.raise_for_status(); return response.content
+    except requests.exceptions.RequestException as e: logging.error("Ошибка QR SVG %s с %s: %s", client_id, base_url, e); return None
+def get_api_config_and_qr(client_name: str, base_url: str, password: str):
+    cookies = create_session(base_url, password);
+    if not cookies: return None, None, "Не удалось создать сессию."
+    api_clients = get_api_clients(cookies, base_url);
+    if api_clients is None: return None, None, "Не удалось получить список клиентов."
+    client_data = next((c for c in api_clients if c["name"] == client_name), None)
+    if not client_data: return None, None, f"Клиент '{client_name}' не найден на сервере."
+    client_id = client_data["id"]; config = get_api_client_configuration(client_id, cookies, base_url)
+    qr_svg = get_api_qr_code_svg(client_id, cookies, base_url); qr_png, qr_error = None, None
+    if qr_svg:
+        try: qr_png = svg_to_png(qr_svg)
+        except Exception as e: logging.error("Ошибка SVG->PNG %s: %s", client_name, e); qr_error = "Ошибка QR SVG->PNG."
+    else: qr_error = "Ошибка получения QR SVG."
+    error_message = None
+    if config is None and qr_png is None: error_message = "Не удалось получить ни конфиг, ни QR."
+    elif config is None: error_message = "Конфиг не получен, но QR есть."
+    elif qr_png is None: error_message = f"Конфиг получен, но {qr_error}"
+    return config, qr_png, error_message
+def create_client_api(client_name: str, base_url: str, password: str):
+    cookies = create_session(base_url, password);
+    if not cookies: return None, None, "Не удалось создать сессию."
+    try:
+        response = _request("POST", f"{base_url}/api/wireguard/client", json={"name": client_name}, cookies=cookies, timeout=15)
+        if response.status_code == 409: return None, None, f"Клиент '{client_name}' уже есть на сервере."
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e: logging.error("Ошибка API создания %s: %s", client_name, e); return None, None, f"Ошибка API создания '{client_name}'."
+    api_clients = get_api_clients(cookies, base_url);
+    if api_clients is None: return None, None, "Клиент создан (API), но ошибка получения данных."
+    client_data = next((c for c in api_clients if c["name"] == client_name), None)
+    if not client_data: return None, None, "Клиент создан (API), но не найден в списке."
+    client_id = client_data["id"]; config = get_api_client_configuration(client_id, cookies, base_url)
+    qr_svg = get_api_qr_code_svg(client_id, cookies, base_url); qr_png = None
+    if qr_svg:
+        try: qr_png = svg_to_png(qr_svg)
+        except Exception as e: logging.error("Ошибка SVG->PNG созд. %s: %s", client_name, e)
+    error = None
+    if config is None and qr_png is None: error = "Клиент создан (API), но ошибка получения конфига/QR."
+    return config, qr_png, error
+def delete_client_api(client_name: str, base_url: str, password: str):
+    cookies = create_session(base_url, password);
+    if not cookies: return False, "Не удалось создать сессию."
+    api_clients = get_api_clients(cookies, base_url);
+    if api_clients is None: logging.warning("Нет списка клиентов %s перед удалением %s.", base_url, client_name)
+    client_data = next((c for c in api_clients if c["name"] == client_name), None) if api_clients else None
+    if client_data:
+        client_id = client_data["id"]
+        try:
+            response = _request("DELETE", f"{base_url}/api/wireguard/client/{client_id}", cookies=cookies, timeout=10)
+            response.raise_for_status(); logging.info("Клиент '%s' удален с API %s.", client_name, base_url)
+            return True, None
+        except requests.exceptions.RequestException as e:
+            logging.error("Ошибка API удаления %s: %s", client_name, e)
+            return False, f"Ошибка API при удалении '{client_name}'."
+    else:
+        logging.info("Клиент '%s' не найден на API %s.", client_name, base_url)
+        return True, None
+def toggle_client_status_api(client_name: str, enable: bool, base_url: str, password: str):
+    """Вкл/выкл клиента. Возвращает (успех, сообщение, список клиентов после изменения или None) -
+    список берется в той же сессии, чтобы обновить сообщение без второго логина."""
+    cookies = create_session(base_url, password);
+    if not cookies: return False, "Не удалось создать сессию.", None
+    api_clients = get_api_clients(cookies, base_url);
+    if api_clients is None: return False, "Не удалось получить список клиентов.", None
+    client_data = next((c for c in api_clients if c["name"] == client_name), None)
+    if not client_data: return False, f"Клиент '{client_name}' не найден на сервере.", api_clients
+    client_id = client_data["id"]; action = "enable" if enable else "disable"
+    try:
+        response = _request("POST", f"{base_url}/api/wireguard/client/{client_id}/{action}", cookies=cookies, timeout=10)
+        response.raise_for_status()
+        return True, f"Статус клиента '{client_name}' изменен на API ✅", get_api_clients(cookies, base_url)
+    except requests.exceptions.RequestException as e:
+        logging.error("Ошибка API %s %s: %s", action, client_name, e)
+        return False, f"Ошибка API при изменении статуса '{client_name}'.", api_clients
+
+# === ОПЕРАЦИИ ПО ID (для пакетных действий в рамках одной сессии) ===
+def set_client_enabled_by_id(client_id, enable: bool, cookies, base_url: str) -> bool:
+    """Включает/выключает клиента по id в рамках уже открытой сессии."""
+    if not cookies: return False
+    action = "enable" if enable else "disable"
+    try: response = _request("POST", f"{base_url}/api/wireguard/client/{client_id}/{action}", cookies=cookies, timeout=10); response.raise_for_status(); return True
+    except requests.exceptions.RequestException as e: logging.error("Ошибка API %s %s на %s: %s", action, client_id, base_url, e); return False
+def create_client_by_name(client_name: str, cookies, base_url: str) -> bool:
+    """Создает клиента в рамках уже открытой сессии (без получения конфига/QR)."""
+    if not cookies: return False
+    try:
+        response = _request("POST", f"{base_url}/api/wireguard/client", json={"name": client_name}, cookies=cookies, timeout=15)
+        if response.status_code == 409: logging.info("Клиент '%s' уже есть на %s.", client_name, base_url); return True
+        response.raise_for_status(); return True
+    except requests.exceptions.RequestException as e: logging.error("Ошибка API создания %s на %s: %s", client_name, base_url, e); return False
@@ -0,0 +1,30 @@
+"""
+Общие фикстуры unit-тестов vpn-bot.
+
+Модули бота импортируются как в контейнере (src/ в sys.path, плоские импорты).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from database import init_db, save_clients_bulk  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Пустая БД сервера со схемой бота."""
+    path = str(tmp_path / "srv.db")
+    init_db(path)
+    return path
+
+
+@pytest.fixture
+def make_db(db_path):
+    """make_db([(name, expiry_date, status), ...]) - БД с указанными клиентами."""
+    def make(rows):
+        save_clients_bulk(db_path, rows)
+        return db_path
+    return make
@@ -0,0 +1,70 @@
+"""Тесты ролевого доступа (acl.py)."""
+import json
+import logging
+import os
+
+from acl import ACL, compile_acl
+
+DOCUMENT = {
+    "roles": {"support": ["config", "list"]},
+    "users": {
+        "111": ["support"],
+        "222": {"roles": ["operator"], "servers": ["vpn"]},
+    },
+}
+
+
+def write_acl(path, document, mtime_ns):
+    path.write_text(json.dumps(document), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_compile_roles_and_servers():
+    grants, anywhere, servers = compile_acl("1, x, 2", DOCUMENT)
+
+    assert grants[1] == {"*"} and grants[2] == {"*"}
+    assert grants[111] == {"config", "list"} and servers[111] == {"*"}
+    assert "toggle@vpn" in grants[222] and "toggle" in anywhere[222] and servers[222] == {"vpn"}
+
+
+def test_checks_per_server(tmp_path):
+    path = tmp_path / "acl.json"
+    write_acl(path, DOCUMENT, 1_000_000_000)
+    acl = ACL("1", str(path), reload_interval=0)
+
+    assert acl.is_allowed(1, "delete", "other") and acl.can_use_server(1, "other")
+    assert acl.is_allowed(111, "config", "vpn") and not acl.is_allowed(111, "create")
+    assert acl.is_allowed(222, "toggle") and acl.is_allowed(222, "toggle", "vpn")
+    assert not acl.is_allowed(222, "toggle", "other") and not acl.can_use_server(222, "other")
+    assert not acl.is_known(333) and not acl.is_allowed(333, "config")
+
+
+def test_hot_reload_keeps_last_good_version(tmp_path):
+    path = tmp_path / "acl.json"
+    write_acl(path, DOCUMENT, 1_000_000_000)
+    acl = ACL("", str(path), reload_interval=0)
+    assert acl.is_known(111)
+
+    write_acl(path, {"users": {"333": ["viewer"]}}, 2_000_000_000)
+    assert acl.is_allowed(333, "list") and not acl.is_known(111)
+
+    path.write_text("{broken", encoding="utf-8")
+    os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+    assert acl.is_allowed(333, "list")
+
+    write_acl(path, {"users": {"444": ["admin"], "not-an-id": ["viewer"]}}, 4_000_000_000)
+    assert acl.is_allowed(333, "list") and not acl.is_known(444)
+
+    path.unlink()
+    assert not acl.has_users()
+
+
+def test_string_role_and_unknown_roles(caplog):
+    document = {"users": {"111": "operator", "222": {"roles": "viewer", "servers": "vpn"}, "333": ["admn"]}}
+
+    with caplog.at_level(logging.WARNING):
+        grants, _anywhere, servers = compile_acl("", document)
+
+    assert "toggle" in grants[111] and "list@vpn" in grants[222] and servers[222] == {"vpn"}
+    assert grants[333] == set()
+    assert "admn" in caplog.text and "operator" not in caplog.text
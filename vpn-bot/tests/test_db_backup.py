@@ -0,0 +1,60 @@
+"""Тесты онлайн-бэкапа и ротации снимков (db_backup.py)."""
+import os
+from datetime import datetime, timedelta, timezone
+
+import db_backup
+from database import get_all_clients, save_client
+
+
+def fake_snapshot(backup_dir, server_key, taken_at):
+    path = os.path.join(backup_dir, f"{server_key}-{taken_at.strftime(db_backup.STAMP_FORMAT)}.db.gz")
+    for p in (path, path + ".sha256"):
+        with open(p, "w") as f: f.write("x")
+    return path
+
+
+def test_backup_verify_and_restore(make_db, tmp_path):
+    db_path = make_db([("alice", "2031-01-01T00:00:00", "enabled")])
+    backup_dir = str(tmp_path / "backups")
+
+    snapshot = db_backup.backup_db(db_path, "srv", backup_dir)
+    assert snapshot and db_backup.verify_snapshot(snapshot)
+    assert [path for _, path in db_backup.list_snapshots("srv", backup_dir)] == [snapshot]
+    assert not [f for f in os.listdir(backup_dir) if f.startswith(".") or f.endswith(".part")]
+
+    save_client(db_path, "bob", None)
+    assert db_backup.restore_db(db_path, "srv", backup_dir=backup_dir) == snapshot
+    assert [row[0] for row in get_all_clients(db_path)] == ["alice"]
+
+
+def test_corrupted_snapshot_is_not_restored(make_db, tmp_path):
+    db_path = make_db([("alice", None, "enabled")])
+    backup_dir = str(tmp_path / "backups")
+    snapshot = db_backup.backup_db(db_path, "srv", backup_dir)
+    with open(snapshot, "ab") as f: f.write(b"garbage")
+    save_client(db_path, "bob", None)
+
+    assert db_backup.restore_db(db_path, "srv", backup_dir=backup_dir) is None
+    assert [row[0] for row in get_all_clients(db_path)] == ["alice", "bob"]
+
+
+def test_rotation_by_count_and_age(tmp_path):
+    backup_dir = str(tmp_path)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    paths = [fake_snapshot(backup_dir, "srv", now - timedelta(days=days)) for days in (40, 35, 3, 2, 1, 0)]
+    other = fake_snapshot(backup_dir, "srv2", now - timedelta(days=100))
+
+    assert db_backup.prune_snapshots("srv", backup_dir, keep=3, max_age_days=30) == 3
+    assert [path for _, path in db_backup.list_snapshots("srv", backup_dir)] == paths[3:]
+    assert not os.path.exists(paths[0] + ".sha256")
+    assert os.path.exists(other)  # другие серверы не трогаются
+
+
+def test_newest_snapshot_is_always_kept(tmp_path):
+    path = fake_snapshot(str(tmp_path), "srv", datetime.now(timezone.utc) - timedelta(days=365))
+    assert db_backup.prune_snapshots("srv", str(tmp_path), keep=1, max_age_days=30) == 0
+    assert os.path.exists(path)
+
+
+def test_backup_of_missing_db_is_skipped(tmp_path):
+    assert db_backup.backup_db(str(tmp_path / "nope.db"), "srv", str(tmp_path / "b")) is None
@@ -0,0 +1,40 @@
+"""Тесты массового экспорта конфигов (export.py)."""
+import json
+import zipfile
+
+import export
+
+
+def test_zip_has_configs_qr_and_manifest(make_db, tmp_path, monkeypatch):
+    db_path = make_db([("alice", "2031-01-01T00:00:00", "enabled"), ("ghost", None, "disabled")])
+    clients = [{"id": "1", "name": "alice"}, {"id": "2", "name": "bob/x"}, {"id": "3", "name": "bob_x"},
+               {"id": "4", "name": "broken", "enabled": False}]
+    sessions = []
+    monkeypatch.setattr(export, "create_session", lambda url, password: sessions.append(url) or {"sid": "1"})
+    monkeypatch.setattr(export, "get_api_clients", lambda cookies, url: clients)
+    monkeypatch.setattr(export, "get_api_client_configuration",
+                        lambda client_id, cookies, url: None if client_id == "4" else f"[Interface] {client_id}")
+    monkeypatch.setattr(export, "get_api_qr_code_svg", lambda client_id, cookies, url: b"<svg/>")
+    monkeypatch.setattr(export, "svg_to_png", lambda svg: b"PNG")
+
+    zip_path, summary = export.export_server_zip(db_path, "http://wg", "pw", "srv", include_qr=True,
+                                                 out_dir=str(tmp_path / "out"))
+
+    assert sessions == ["http://wg"]  # один логин на весь экспорт
+    assert (summary["total"], summary["configs"], summary["qr"], summary["failed"]) == (4, 3, 4, ["broken"])
+    with zipfile.ZipFile(zip_path) as zf:
+        names = set(zf.namelist())
+        manifest = json.loads(zf.read("manifest.json"))
+    assert {"configs/alice.conf", "configs/bob_x.conf", "qr/broken.png"} <= names
+    assert len([n for n in names if n.startswith("configs/bob_x")]) == 2  # совпавшие безопасные имена не затираются
+    assert manifest["db_only"] == ["ghost"] and manifest["failed"] == ["broken"]
+    alice = next(c for c in manifest["clients"] if c["name"] == "alice")
+    assert alice["db"] == {"expiry_date": "2031-01-01T00:00:00", "status": "enabled"}
+    assert "⚠️ Без конфига: broken" in export.format_summary(summary)
+
+
+def test_api_errors_produce_no_archive(db_path, monkeypatch):
+    monkeypatch.setattr(export, "create_session", lambda url, password: None)
+    zip_path, summary = export.export_server_zip(db_path, "http://wg", "pw", "srv")
+    assert zip_path is None and summary["error"]
+    assert export.format_summary(summary).startswith("Ошибка экспорта")
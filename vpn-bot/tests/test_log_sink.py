@@ -0,0 +1,69 @@
+"""Тесты неблокирующего вывода логов (log_sink.py)."""
+import io
+import json
+import logging
+import threading
+
+import log_sink
+from metrics import LOG_RECORDS_DROPPED
+
+
+class BlockingStream(io.StringIO):
+    """Запись ждет release: писатель висит на первой пачке, очередь можно переполнить."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered, self.release = threading.Event(), threading.Event()
+
+    def write(self, text):
+        self.entered.set()
+        self.release.wait(5)
+        return super().write(text)
+
+
+def make_logger(handler):
+    logger = logging.getLogger(f"test_log_sink.{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    return logger
+
+
+def test_full_queue_drops_and_reports():
+    stream = BlockingStream()
+    handler = log_sink.QueueLogHandler(log_sink.JsonFormatter(), stream=stream, max_queue=2, batch_size=1, flush_interval=0.01)
+    logger = make_logger(handler)
+    dropped_before = LOG_RECORDS_DROPPED._value.get()
+
+    logger.info("first")
+    assert stream.entered.wait(5)
+    for i in range(5): logger.info("queued %s", i)
+    stream.release.set()
+    handler.close()
+
+    assert handler.dropped == 3 and LOG_RECORDS_DROPPED._value.get() == dropped_before + 3
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["msg"] for line in lines if line["logger"] != "log_sink"] == ["first", "queued 0", "queued 1"]
+    assert [(line["level"], line["msg"]) for line in lines if line["logger"] == "log_sink"] == [
+        ("WARNING", "Отброшено записей лога: 3 (всего 3)")]
+
+
+def test_sampling_counts_and_keeps_warnings():
+    stream = io.StringIO()
+    handler = log_sink.QueueLogHandler(log_sink.JsonFormatter(), stream=stream, sample_rates={logging.INFO: 0.0}, flush_interval=0.01)
+    logger = make_logger(handler)
+
+    for _ in range(5): logger.info("sampled")
+    logger.warning("kept")
+    handler.close()
+
+    assert handler.sampled_out == 5 and handler.dropped == 0
+    assert [json.loads(line)["msg"] for line in stream.getvalue().splitlines()] == ["kept"]
+
+
+def test_parse_sample_rates_warns_on_bad_items(caplog):
+    with caplog.at_level(logging.WARNING):
+        rates = log_sink.parse_sample_rates("DEBUG=0.1, info=abc, NOPE=0.5, WARNING=2")
+
+    assert rates == {logging.DEBUG: 0.1, logging.WARNING: 1.0}
+    assert [r.getMessage().split("'")[1] for r in caplog.records] == ["info=abc", "NOPE=0.5"]
@@ -0,0 +1,36 @@
+"""Тесты замеров: database.py без prometheus_client, наблюдатель SQLite, метки wg-easy (metrics.py)."""
+import os
+import subprocess
+import sys
+
+import database
+import metrics
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def test_database_imports_without_prometheus_client():
+    code = "import sys; sys.modules['prometheus_client'] = None; import database; assert 'metrics' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd=SRC, check=True)
+
+
+def test_sqlite_observer(db_path):
+    seen = []
+    database.set_sqlite_observer(lambda operation, seconds: seen.append((operation, seconds)))
+    try: database.get_all_clients(db_path)
+    finally: database.set_sqlite_observer(None)
+    database.get_all_clients(db_path)
+
+    assert [operation for operation, _seconds in seen] == ["get_all_clients"] and seen[0][1] >= 0
+
+
+def test_observe_sqlite_feeds_histogram():
+    before = metrics.SQLITE_DURATION.labels("test_op")._sum.get()
+    metrics.observe_sqlite("test_op", 0.25)
+    assert metrics.SQLITE_DURATION.labels("test_op")._sum.get() == before + 0.25
+
+
+def test_endpoint_label_hides_client_id():
+    assert metrics.endpoint_label("http://wg:51821/api/wireguard/client/abc-123/enable?x=1") == \
+        "/api/wireguard/client/{id}/enable"
+    assert metrics.endpoint_label("http://wg:51821") == "/"
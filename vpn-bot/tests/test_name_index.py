@@ -0,0 +1,77 @@
+"""Тесты индекса имен клиентов (name_index.py)."""
+import asyncio
+import threading
+
+import pytest
+
+import name_index
+from name_index import NameIndex
+
+
+@pytest.fixture(autouse=True)
+def clean_indexes():
+    name_index._INDEXES.clear(); name_index._GENERATIONS.clear()
+    yield
+    name_index._INDEXES.clear(); name_index._GENERATIONS.clear()
+
+
+def test_prefix_is_case_insensitive_sorted_and_limited():
+    index = NameIndex(["bob", "Alice", "alina", "al", "carol", "", "alice"])
+    assert index.prefix("AL") == ["al", "Alice", "alice", "alina"]
+    assert index.prefix("al", limit=2) == ["al", "Alice"]
+    assert index.prefix("") == ["al", "Alice", "alice", "alina", "bob", "carol"]
+    assert index.prefix("z") == []
+    assert index.contains("Alice") and not index.contains("ALICE")
+
+
+def test_prefix_includes_names_beyond_bmp():
+    index = NameIndex(["вася", "вася\U0001F600", "вася\uffff", "васяz", "васю"])
+    assert index.prefix("вася") == ["вася", "васяz", "вася\uffff", "вася\U0001F600"]
+    assert index.prefix("вася\U0001F600") == ["вася\U0001F600"]
+
+
+def test_add_remove_and_suggest():
+    index = NameIndex(["client_one", "client_two"])
+    index.add("client_three"); index.add("client_three")
+    index.remove("client_one"); index.remove("missing")
+    assert len(index) == 2 and index.prefix("client") == ["client_three", "client_two"]
+    assert index.suggest("client_tw")[0] == "client_two"  # сначала по префиксу
+    assert "client_two" in index.suggest("clinet_two")
+
+
+def test_get_index_builds_once_and_invalidates(make_db, monkeypatch):
+    db_path = make_db([("alice", None, "enabled")])
+    calls = []
+    real = name_index.get_all_clients
+    monkeypatch.setattr(name_index, "get_all_clients", lambda path: calls.append(path) or real(path))
+
+    index = name_index.get_index("srv", db_path)
+    assert name_index.get_index("srv", db_path) is index and calls == [db_path]
+
+    name_index.invalidate("srv")
+    assert name_index.get_index("srv", db_path) is not index and len(calls) == 2
+
+
+def test_generation_from_other_replica_resets_index(make_db):
+    db_path = make_db([("alice", None, "enabled")])
+    name_index.sync_generation("srv", 1)
+    index = name_index.get_index("srv", db_path)
+    name_index.mark_generation("srv", 2)  # свое изменение: индекс уже актуален
+    name_index.sync_generation("srv", 2)
+    assert name_index.get_index("srv", db_path) is index
+    name_index.sync_generation("srv", 3)  # чужое изменение
+    assert name_index.get_index("srv", db_path) is not index
+
+
+def test_async_build_runs_off_the_event_loop(make_db, monkeypatch):
+    db_path = make_db([("alice", None, "enabled")])
+    threads = []
+    real = name_index.get_all_clients
+    monkeypatch.setattr(name_index, "get_all_clients",
+                        lambda path: threads.append(threading.current_thread().name) or real(path))
+
+    async def main():
+        return await name_index.get_index_async("srv", db_path), threading.current_thread().name
+
+    index, loop_thread = asyncio.run(main())
+    assert index.contains("alice") and threads and threads[0] != loop_thread
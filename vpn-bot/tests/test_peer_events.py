@@ -0,0 +1,70 @@
+"""Тесты потока событий по пирам (peer_events.py)."""
+import json
+from datetime import datetime, timezone
+
+import peer_events
+
+T0 = 1_700_000_000.0
+IDLE = 3600
+
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def peer(id_, name=None, enabled=True, handshake=None):
+    client = {"id": id_, "name": name or f"peer-{id_}", "latestHandshakeAt": iso(handshake) if handshake else None}
+    if enabled is not None: client["enabled"] = enabled
+    return client
+
+
+def kinds(events):
+    return [(e["type"], e["name"]) for e in events]
+
+
+def test_first_listing_is_baseline_then_only_changes():
+    watcher = peer_events.PeerWatcher("srv", idle_seconds=IDLE)
+    assert watcher.diff([peer(1), peer(2, enabled=False)], T0) == []
+
+    assert watcher.diff([peer(1), peer(2, enabled=False)], T0 + 60) == []
+    events = watcher.diff([peer(1, enabled=False), peer(2, enabled=True, handshake=T0 + 100), peer(3)], T0 + 120)
+    assert kinds(events) == [("disabled", "peer-1"), ("enabled", "peer-2"), ("first_handshake", "peer-2"),
+                             ("added", "peer-3")]
+    assert all(e["server"] == "srv" for e in events)
+
+    assert kinds(watcher.diff([peer(1, name="renamed", enabled=False), peer(2, handshake=T0 + 100)], T0 + 180)) == [
+        ("removed", "peer-1"), ("added", "renamed"), ("removed", "peer-3")]
+
+
+def test_missing_enabled_field_counts_as_enabled():
+    watcher = peer_events.PeerWatcher("srv", idle_seconds=IDLE)
+    watcher.diff([peer(1, enabled=True)], T0)
+    assert watcher.diff([peer(1, enabled=None)], T0 + 60) == []
+    assert kinds(watcher.diff([peer(1, enabled=False)], T0 + 120)) == [("disabled", "peer-1")]
+
+
+def test_idle_reported_once_and_reset_by_new_handshake():
+    watcher = peer_events.PeerWatcher("srv", idle_seconds=IDLE)
+    watcher.diff([peer(1, handshake=T0)], T0)
+    assert watcher.diff([peer(1, handshake=T0)], T0 + IDLE - 1) == []
+    assert kinds(watcher.diff([peer(1, handshake=T0)], T0 + IDLE)) == [("idle", "peer-1")]
+    assert watcher.diff([peer(1, handshake=T0)], T0 + 2 * IDLE) == []
+
+    later = T0 + 2 * IDLE
+    assert watcher.diff([peer(1, handshake=later)], later + 1) == []
+    assert kinds(watcher.diff([peer(1, handshake=later)], later + IDLE)) == [("idle", "peer-1")]
+
+
+def test_event_log_rotation_and_subscribers(tmp_path):
+    log = str(tmp_path / "events.jsonl")
+    peer_events.append_event_log(log, [{"type": "added", "name": "a"}], max_bytes=10)
+    peer_events.append_event_log(log, [{"type": "removed", "name": "a"}], max_bytes=10)
+    assert [json.loads(line)["type"] for line in open(log, encoding="utf-8")] == ["removed"]
+    assert json.loads(open(log + ".1", encoding="utf-8").read())["type"] == "added"
+
+    subscribers = str(tmp_path / "subscribers.json")
+    assert peer_events.load_subscribers(subscribers) == set()
+    peer_events.set_subscribed(subscribers, 1, True)
+    peer_events.set_subscribed(subscribers, 2, True)
+    assert peer_events.set_subscribed(subscribers, 1, False) == {2}
+    assert peer_events.load_subscribers(subscribers) == {2}
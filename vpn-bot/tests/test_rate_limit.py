@@ -0,0 +1,69 @@
+"""Тесты лимитера изменяющих запросов к wg-easy (rate_limit.py)."""
+import asyncio
+import time
+
+import pytest
+
+from metrics import WG_MUTATIONS_REJECTED
+from rate_limit import MutationLimiter, QueueFull, TokenBucket
+
+
+def test_token_bucket_refill_and_delay():
+    bucket = TokenBucket(rate=2, burst=2, now=0.0)
+    bucket.take(0.0); bucket.take(0.0)
+    assert bucket.delay(0.0) == pytest.approx(0.5)
+    assert bucket.delay(0.25) == pytest.approx(0.25)
+    assert bucket.delay(10.0) == 0 and bucket.tokens == 2
+
+
+def test_throttled_user_does_not_delay_others():
+    limiter = MutationLimiter(user_rate=1, user_burst=1, server_rate=100, server_burst=100)
+    positions = []
+
+    async def main():
+        await limiter.acquire("alice", "vpn")
+        async def queued(position): positions.append(position)
+        waiting = asyncio.create_task(limiter.acquire("alice", "vpn", on_queued=queued))
+        await asyncio.sleep(0.01)
+        assert limiter.queued("vpn") == 1
+
+        started = time.monotonic()
+        await limiter.acquire("bob", "vpn")
+        bob_wait = time.monotonic() - started
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError): await waiting
+        return bob_wait
+
+    assert asyncio.run(main()) < 0.2
+    assert positions == [1] and limiter.queued("vpn") == 0
+
+
+def test_server_bucket_is_fifo():
+    limiter = MutationLimiter(user_rate=100, user_burst=100, server_rate=20, server_burst=1)
+    order = []
+
+    async def run(user):
+        await limiter.acquire(user, "vpn"); order.append(user)
+
+    async def main():
+        await asyncio.gather(*(run(user) for user in ("a", "b", "c", "d")))
+
+    asyncio.run(main())
+    assert order == ["a", "b", "c", "d"]
+
+
+def test_full_queue_rejects():
+    limiter = MutationLimiter(user_rate=0.1, user_burst=1, server_rate=100, server_burst=100, queue_limit=1)
+    rejected_before = WG_MUTATIONS_REJECTED.labels("full")._value.get()
+
+    async def main():
+        await limiter.acquire("alice", "full")
+        waiting = asyncio.create_task(limiter.acquire("alice", "full"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFull): await limiter.acquire("bob", "full")
+        assert limiter.queued("other") == 0 and await asyncio.wait_for(limiter.acquire("bob", "other"), 1) is None
+        waiting.cancel()
+
+    asyncio.run(main())
+    assert WG_MUTATIONS_REJECTED.labels("full")._value.get() == rejected_before + 1
@@ -0,0 +1,77 @@
+"""Тесты сверки БД <-> wg-easy (reconcile.py)."""
+from database import get_all_clients
+
+import reconcile
+
+
+def api(name, enabled=True, id_=None):
+    return {"id": id_ or f"id-{name}", "name": name, "enabled": enabled}
+
+
+def test_plan_default_policy_only_reports_clients_missing_on_api():
+    db = [("alice", "2030-01-01T00:00:00", "enabled"), ("bob", "2030-01-01T00:00:00", "enabled"),
+          ("carol", None, "enabled")]
+    plan = reconcile.build_plan(db, [api("alice"), api("carol", enabled=False), api("dave")],
+                                missing_on_api_policy="ignore", status_source="api", import_missing=True)
+
+    assert plan.missing_on_api == ["bob"]
+    assert plan.missing_in_db == [("dave", "enabled")]
+    assert plan.status_mismatch == [("carol", "enabled", "disabled", "id-carol")]
+    assert plan.db_deletes == [] and plan.api_creates == []
+    assert plan.db_inserts == [("dave", None, "enabled")]
+    assert plan.db_status_updates == [("disabled", "carol")]
+
+
+def test_plan_policies():
+    db = [("bob", None, "enabled"), ("carol", None, "disabled")]
+    api_clients = [api("carol", enabled=True), api("dave")]
+
+    plan = reconcile.build_plan(db, api_clients, "delete_db", "db", import_missing=False)
+    assert plan.db_deletes == ["bob"] and plan.db_inserts == []
+    assert plan.api_status_updates == [("id-carol", "carol", False)] and plan.db_status_updates == []
+
+    plan = reconcile.build_plan(db, api_clients, "create_api", "api", import_missing=True)
+    assert plan.api_creates == ["bob"] and plan.db_deletes == []
+
+
+def test_module_default_never_deletes_db_rows():
+    assert reconcile.RECONCILE_MISSING_ON_API == "ignore"
+
+
+def test_apply_plan_in_batches(make_db, monkeypatch):
+    db_path = make_db([("bob", "2031-01-01T00:00:00", "enabled"), ("carol", None, "enabled")])
+    created, toggled = [], []
+    monkeypatch.setattr(reconcile, "create_client_by_name", lambda name, cookies, url: created.append(name) or True)
+    monkeypatch.setattr(reconcile, "set_client_enabled_by_id", lambda *args: toggled.append(args) or True)
+
+    plan = reconcile.build_plan(get_all_clients(db_path), [api("carol", False), api("dave")], "create_api", "api", True)
+    result = reconcile.apply_plan(plan, db_path, "http://wg", {"sid": "1"})
+
+    assert created == ["bob"] and toggled == []
+    assert (result.api_created, result.db_inserted, result.db_status_updated, result.db_deleted) == (1, 1, 1, 0)
+    assert get_all_clients(db_path) == [("bob", "2031-01-01T00:00:00", "enabled"), ("carol", None, "disabled"),
+                                        ("dave", None, "enabled")]
+
+
+def test_unreadable_db_aborts_plan(tmp_path, monkeypatch):
+    broken = tmp_path / "broken.db"
+    broken.write_bytes(b"this is not an sqlite database" * 100)
+    monkeypatch.setattr(reconcile, "create_session", lambda url, password: {"sid": "1"})
+    monkeypatch.setattr(reconcile, "get_api_clients", lambda cookies, url: [api("alice"), api("bob")])
+
+    plan, result = reconcile.reconcile_server(str(broken), "http://wg", "pw", apply=True)
+
+    assert plan.db_error and plan.error == plan.db_error
+    assert plan.missing_in_db == [] and plan.db_inserts == []
+    assert result is not None and result.db_inserted == 0
+    assert "невозможна" in reconcile.format_plan(plan, "srv")
+
+
+def test_unreadable_api_aborts_plan(make_db, monkeypatch):
+    db_path = make_db([("alice", "2031-01-01T00:00:00", "enabled")])
+    monkeypatch.setattr(reconcile, "create_session", lambda url, password: {"sid": "1"})
+    for answer in (None, {"error": "Unauthorized"}):
+        monkeypatch.setattr(reconcile, "get_api_clients", lambda cookies, url: answer)
+        plan, _result = reconcile.reconcile_server(db_path, "http://wg", "pw", apply=True)
+        assert plan.api_error and plan.is_empty()
+    assert get_all_clients(db_path) == [("alice", "2031-01-01T00:00:00", "enabled")]
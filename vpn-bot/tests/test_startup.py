@@ -0,0 +1,41 @@
+"""Тесты холодного старта: трассировка этапов (startup.py), ленивые импорты и инициализация БД в bot.py."""
+import os
+import subprocess
+import sys
+
+import startup
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def test_stages_and_report(monkeypatch):
+    clock = iter([1.0, 1.25, 1.75, 2.0])
+    monkeypatch.setattr(startup.time, "perf_counter", lambda: next(clock))
+    monkeypatch.setattr(startup, "_STARTED", 1.0)
+    monkeypatch.setattr(startup, "_last", 1.0)
+    monkeypatch.setattr(startup, "_stages", [])
+
+    startup.mark("env")
+    startup.mark("импорт bot")
+    startup.mark("сборка приложения")
+
+    assert startup.report() == "Старт за 1000 мс: env 0 мс, импорт bot 250 мс, сборка приложения 500 мс"
+
+
+def test_bot_import_is_lazy_and_inits_every_db(tmp_path):
+    code = (
+        "import sys, os; sys.path.insert(0, sys.argv[1]); import bot\n"
+        "assert 'cairosvg' not in sys.modules\n"
+        "bot.init_all_dbs()\n"
+        "print(sorted(f for f in os.listdir(bot.DB_DIR) if f.endswith('.db')))\n"
+    )
+    env = {**os.environ, "TELEGRAM_TOKEN": "1:test", "DB_DIR": str(tmp_path / "db"), "METRICS_PORT": "0",
+           "SERVER1_KEY": "a", "SERVER1_NAME": "A", "SERVER1_URL": "http://127.0.0.1:9",
+           "SERVER2_KEY": "b", "SERVER2_NAME": "B", "SERVER2_URL": "http://127.0.0.1:9"}
+    env.pop("SERVER3_KEY", None)
+    (tmp_path / "db").mkdir()
+
+    result = subprocess.run([sys.executable, "-c", code, SRC], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "['a.db', 'b.db']"
@@ -0,0 +1,74 @@
+"""Тесты общего состояния реплик (state.py)."""
+import asyncio
+from types import SimpleNamespace
+
+import state
+
+
+def make_update(user_id):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id))
+
+
+def test_handlers_of_one_user_run_in_order():
+    decorate = state.shared_user_data(state.MemoryState())
+    log = []
+
+    @decorate
+    async def handler(update, context, step, pause):
+        log.append(("start", update.effective_user.id, step))
+        await asyncio.sleep(pause)
+        log.append(("end", update.effective_user.id, step))
+
+    async def main():
+        context = SimpleNamespace(user_data={})
+        await asyncio.gather(handler(make_update(1), context, 1, 0.05), handler(make_update(1), context, 2, 0),
+                             handler(make_update(2), context, 1, 0))
+
+    asyncio.run(main())
+    # Второй шаг пользователя 1 ждет первый; пользователь 2 не ждет никого
+    assert log == [("start", 1, 1), ("start", 2, 1), ("end", 2, 1), ("end", 1, 1), ("start", 1, 2), ("end", 1, 2)]
+
+
+class FakeSharedState:
+    """Ключ лидера с TTL по ручным часам - как скрипт _ACQUIRE_LEADER в Redis."""
+
+    shared = True
+
+    def __init__(self):
+        self.now, self.leaders, self.fail = 0.0, {}, False
+
+    async def acquire_leader(self, name, owner, ttl):
+        if self.fail: raise ConnectionError("redis down")
+        holder, expires = self.leaders.get(name, (None, 0.0))
+        if holder == owner or expires <= self.now:
+            self.leaders[name] = (owner, self.now + ttl)
+            return True
+        return False
+
+
+def test_leader_expires_and_moves_to_another_replica():
+    shared = FakeSharedState()
+    first, second = state.Leader(shared, ttl=30), state.Leader(shared, ttl=30)
+    ran = []
+
+    async def job(context): ran.append(context)
+
+    async def main():
+        assert not first.is_leader  # общее хранилище: до первого tick никто не лидер
+        await first.tick(); await second.tick()
+        assert first.is_leader and not second.is_leader
+        await first.only(job)("first"); await second.only(job)("second")
+
+        shared.now = 20; await first.tick()        # продление
+        shared.now = 45; await second.tick()
+        assert not second.is_leader
+
+        shared.now = 51; await second.tick()        # первый перестал продлевать - ключ истек
+        await first.tick()
+        assert second.is_leader and not first.is_leader
+
+        shared.fail = True; await second.tick()     # ошибка хранилища - задачи приостановлены
+        assert not second.is_leader
+
+    asyncio.run(main())
+    assert ran == ["first"]
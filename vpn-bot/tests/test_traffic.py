@@ -0,0 +1,43 @@
+"""Тесты сборщика трафика и handshake (traffic.py)."""
+import pytest
+
+import traffic
+
+HOUR = 3600
+T0 = 1_700_000_000 // HOUR * HOUR  # начало часа
+
+
+def peer(name, rx=0, tx=0, handshake=None):
+    return {"name": name, "transferRx": rx, "transferTx": tx, "latestHandshakeAt": handshake}
+
+
+@pytest.fixture
+def stats_path(tmp_path):
+    path = traffic.stats_db_path(str(tmp_path), "srv")
+    traffic.init_stats_db(path)
+    return path
+
+
+def test_deltas_counter_reset_and_rollup(stats_path):
+    traffic.record_sample(stats_path, [peer("a", 1000, 100)], now=T0)              # точка отсчета
+    traffic.record_sample(stats_path, [peer("a", 1500, 300)], now=T0 + 60)
+    traffic.record_sample(stats_path, [peer("a", 200, 50)], now=T0 + 120)          # перезапуск wg-easy
+    traffic.rollup(stats_path, now=T0 + HOUR + 1)
+    traffic.rollup(stats_path, now=T0 + HOUR + 2)                                  # повторная свертка ничего не удваивает
+
+    assert traffic.top_talkers(stats_path, hours=2, now=T0 + HOUR + 2) == [("a", 700, 250)]
+
+
+def test_idle_peers_ignore_peers_deleted_on_api(stats_path):
+    old_hs = "2023-01-01T00:00:00.000Z"
+    traffic.record_sample(stats_path, [peer("idle", handshake=old_hs), peer("gone"), peer("fresh", handshake="2099-01-01T00:00:00Z")], now=T0)
+    traffic.rollup(stats_path, now=T0 + HOUR)
+    assert [name for name, _hs in traffic.idle_peers(stats_path, now=T0 + HOUR)] == ["gone", "idle"]
+
+    traffic.record_sample(stats_path, [peer("idle", handshake=old_hs), peer("fresh", handshake="2099-01-01T00:00:00Z")], now=T0 + HOUR + 60)
+    assert [name for name, _hs in traffic.idle_peers(stats_path, now=T0 + HOUR + 60)] == ["idle"]
+    assert "gone" not in traffic.format_report(stats_path, "srv")
+
+
+def test_report_without_data(tmp_path):
+    assert "еще не собрана" in traffic.format_report(str(tmp_path / "none.stats.db"), "srv")
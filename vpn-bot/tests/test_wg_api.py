@@ -0,0 +1,28 @@
+"""Тесты HTTP-клиента wg-easy (wg_api.py)."""
+from types import SimpleNamespace
+
+import wg_api
+
+
+class FakeWgEasy:
+    """Записывает запросы; вкл/выкл меняет флаг клиента как настоящий wg-easy."""
+
+    def __init__(self):
+        self.calls, self.clients = [], [{"id": "id-alice", "name": "alice", "enabled": True}]
+
+    def request(self, method, url, **kwargs):
+        path = url.split("/api/", 1)[1]; self.calls.append((method, path))
+        if path.endswith("/disable"): self.clients[0]["enabled"] = False
+        body = [dict(c) for c in self.clients]
+        return SimpleNamespace(status_code=200, cookies={"sid": "1"}, raise_for_status=lambda: None, json=lambda: body)
+
+
+def test_toggle_returns_refreshed_clients_from_the_same_session(monkeypatch):
+    server = FakeWgEasy()
+    monkeypatch.setattr(wg_api.requests, "request", server.request)
+
+    ok, _message, clients = wg_api.toggle_client_status_api("alice", False, "http://wg", "secret")
+
+    assert ok and clients == [{"id": "id-alice", "name": "alice", "enabled": False}]
+    assert server.calls == [("POST", "session"), ("GET", "wireguard/client"),
+                            ("POST", "wireguard/client/id-alice/disable"), ("GET", "wireguard/client")]